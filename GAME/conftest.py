@@ -0,0 +1 @@
+# makes GAME/ importable (supplementary, AGENTS, the self_play modules) when pytest runs from anywhere
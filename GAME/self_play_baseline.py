@@ -1,13 +1,17 @@
-from random import randrange, choices, randint
+from random import Random
 import re
 import os
 import ast
-from openai import OpenAI
+import supplementary.board_store as board_store
+import supplementary.game_runner as game_runner
+import supplementary.history as history
+import supplementary.llm_client as llm_client
+import supplementary.prompt_layout as prompt_layout
+from supplementary.board import Board
 from supplementary.config import *
 from AGENTS.prompts_baseline import *
 from datetime import datetime
-import json
-from itertools import combinations
+from functools import partial
 
 
 class GAME:
@@ -48,11 +52,17 @@ class GAME:
 
          # Graph contents - read from json outside of class
         self.boards = {"BOT":BOARD["BOT"], "USER":BOARD["USER"]}  # the boards given to the players
+        self.matrices = {
+            role: Board.from_triples(self.boards[role]) for role in ("BOT", "USER")
+        }  # the same boards as matrices, for O(1) hallway lookups
+        self.joint_board = self.matrices["BOT"] + self.matrices["USER"]  # the coins both players collect together
         self.solutions = {"BOT":[], "USER":[], "OPTIMAL":BOARD["OPTIMAL"]} # storing the produced solutions for evaluation; OPTIMAL is the path that returns the most joint coins
         self.BOARD_ID = BOARD_ID
 
         # Flags
         self.playing = True # True = the game is ongoing
+        self.turn = 0  # turns started so far
+        self.failure = None  # what ended the game early, if it raised (e.g. GameTimeout)
 
         # DATA STRUCTURES
         self.actions_history = {"BOT":[], "USER":[]} #list of  not used in this version
@@ -84,31 +94,13 @@ class GAME:
         :return params: dict
         '''
 
-        unique_nodes = set(node for pair in self.boards[entity] for node in pair[:2])
-        pairs = combinations(unique_nodes, 2) # Generate all possible pairs using combinations
-
-        # Create dictionary with keys like "LB", "LE", etc., and lookup values in entity data
-        params = {
-            f"{x}{y}": next(
-                (v for (p1, p2, v) in self.boards[entity] if {p1, p2} == {x, y}), None
-            )
-            for x, y in pairs
-        }
-        return params
+        return self.matrices[entity].params()  # one O(1) matrix read per room pair
     
     def get_score(self):
         '''The function for calculating the score of the (identical) path the players agreed upon by using their given boards.'''
 
-        score = 0
-        path = self.solutions["BOT"] # the solution is identical 
-        pairs = [(path[i], path[i+1]) for i in range(len(path)-1)]
-
-        sum_board = [(a, b, el1 + el2) for [a, b, el1] in self.boards["BOT"] for [a2, b2, el2] in self.boards["USER"] if a == a2 and b == b2]
-
-        for pair in pairs:
-            score += [value[2] for value in sum_board if (pair[0] == value[0] and pair[1] == value[1]) or (pair[0] == value[1] and pair[1] == value[0])][0]
-
-        self.results["SCORE"] = score
+        path = self.solutions["BOT"]  # the solution is identical, using BOT path as a proxy
+        self.results["SCORE"] = self.joint_board.path_coins(path)
     
     def solution_verification(self):
         '''A function for evaluating the models' performance - checks if the generated solutions are:
@@ -204,7 +196,7 @@ class GAME:
                 ------------------------------------------------\n''')
                     
         elif MODE == "eval":
-            with open(self.logging_eval, "a") as log_file:
+            with game_runner.EVAL_LOG_LOCK, open(self.logging_eval, "a") as log_file:  # one breakdown at a time
                 log_file.write(f'''
         ------------------------------------------------
                         EVALUATION BREAKDOWN {self.id}
@@ -237,7 +229,7 @@ class GAME:
         ------------------------------------------------
 ''')
         elif MODE == "eval-terminated":
-            with open(self.logging_eval, "a") as log_file:
+            with game_runner.EVAL_LOG_LOCK, open(self.logging_eval, "a") as log_file:
                 log_file.write(f'''
         ------------------------------------------------
                         EVALUATION BREAKDOWN {self.id}
@@ -258,6 +250,9 @@ class GAME:
         BOT:\t{self.solutions["BOT"]}
         USER:\t{self.solutions["USER"]}
         OPTIMAL:\t{self.solutions["OPTIMAL"]}
+        ------------------------------------------------
+        Ended by:\t{self.failure or 'turn limit'}
+        Turn reached:\t{self.turn}
         ------------------------------------------------''')
     
     def parse_message(self, MESSAGE):
@@ -313,71 +308,76 @@ class GAME:
         self.log(SUMMARY=[self.prompt_type, self.run_start, self.model, self.seed, self.boards, self.solutions])
         self.user_proxy.update_message_history(start)
 
-        while self.playing:
-            # terminate the program in case the agents get stuck in a loop
-            TURNS -= 1
-            if TURNS == 0:
-                break
+        try:
+            while self.playing:
+                # terminate the program in case the agents get stuck in a loop
+                TURNS -= 1
+                if TURNS == 0:
+                    break
+                self.turn += 1
 
-            # adjusting the message containers:
+                # adjusting the message containers:
 
-            self.check_end()
+                self.check_end()
 
-            if self.end["USER"] and self.end["BOT"]:
-                self.solution_verification()
-                self.playing = False
-                break
+                if self.end["USER"] and self.end["BOT"]:
+                    self.solution_verification()
+                    self.playing = False
+                    break
 
-            user_message = self.user_proxy.get_inference() # messages generated by the user proxy:
-            self.log(MSG=user_message, ROLE="USER") # log user message
-            user_message_PARSED = self.parse_message(user_message)
-            
-            try:
-                new_string = f"[World-state-own] {self.boards["BOT"]}\n[History] {self.actions_history["BOT"]}\n[Observation] {user_message_PARSED["Message"]}" # format input for bot
-            except:
-                new_string = f"[World-state-own] {self.boards["BOT"]}\n[History] {self.actions_history["BOT"]}\n[Observation] <USER MESSAGE IN WRONG FORMAT>" # format input for bot
-            self.bot.update_message_history(new_string)
-            self.log(MSG=new_string, ROLE="BOT-input")
-
-            # update corresponding actions_history list
-            try:
-                self.parse_actions(user_message_PARSED["Action"], "USER")
-            except:
-                pass
-
-            if self.end["USER"] and self.end["BOT"]:
-                self.solution_verification()
-                self.playing = False
-                break
+                user_message = self.user_proxy.get_inference() # messages generated by the user proxy:
+                self.log(MSG=user_message, ROLE="USER") # log user message
+                user_message_PARSED = self.parse_message(user_message)
 
-            else:
-                bot_message = self.bot.get_inference()
-                self.log(MSG=bot_message, ROLE="BOT") # log bot message
-                bot_message_PARSED = self.parse_message(bot_message) # extract bot actions
                 try:
-                    self.parse_actions(bot_message_PARSED["Action"], "BOT")
+                    new_string = f"[World-state-own] {self.boards["BOT"]}\n[History] {self.actions_history["BOT"]}\n[Observation] {user_message_PARSED["Message"]}" # format input for bot
                 except:
-                    pass
+                    new_string = f"[World-state-own] {self.boards["BOT"]}\n[History] {self.actions_history["BOT"]}\n[Observation] <USER MESSAGE IN WRONG FORMAT>" # format input for bot
+                self.bot.update_message_history(new_string)
+                self.log(MSG=new_string, ROLE="BOT-input")
 
-            
+                # update corresponding actions_history list
                 try:
-
-                    new_string = f"[World-state-own] {self.boards["USER"]}\n[History] {self.actions_history["USER"]}\n[Observation] {bot_message_PARSED["Message"]}" # format input for bot
+                    self.parse_actions(user_message_PARSED["Action"], "USER")
                 except:
-                    new_string = f"[World-state-own] {self.boards["USER"]}\n[History] {self.actions_history["USER"]}\n[Observation] <USER MESSAGE IN WRONG FORMAT>" # format input for bot
-                self.user_proxy.update_message_history(new_string)
-                self.log(MSG=new_string, ROLE="USER-input")
+                    pass
 
                 if self.end["USER"] and self.end["BOT"]:
                     self.solution_verification()
                     self.playing = False
                     break
 
-        # Log the eval results to a separate eval file
-        if not (self.end["USER"] and self.end["BOT"]):
-            self.log(MODE='eval-terminated')
-        else:
-            self.log(MODE="eval")
+                else:
+                    bot_message = self.bot.get_inference()
+                    self.log(MSG=bot_message, ROLE="BOT") # log bot message
+                    bot_message_PARSED = self.parse_message(bot_message) # extract bot actions
+                    try:
+                        self.parse_actions(bot_message_PARSED["Action"], "BOT")
+                    except:
+                        pass
+
+
+                    try:
+
+                        new_string = f"[World-state-own] {self.boards["USER"]}\n[History] {self.actions_history["USER"]}\n[Observation] {bot_message_PARSED["Message"]}" # format input for bot
+                    except:
+                        new_string = f"[World-state-own] {self.boards["USER"]}\n[History] {self.actions_history["USER"]}\n[Observation] <USER MESSAGE IN WRONG FORMAT>" # format input for bot
+                    self.user_proxy.update_message_history(new_string)
+                    self.log(MSG=new_string, ROLE="USER-input")
+
+                    if self.end["USER"] and self.end["BOT"]:
+                        self.solution_verification()
+                        self.playing = False
+                        break
+        except Exception as error:  # GameTimeout, or an LLM error that used up its retries
+            self.failure = f"{type(error).__name__}: {error}"
+            raise
+        finally:  # every game gets an eval record, so batch rates also count the failed ones
+            # Log the eval results to a separate eval file
+            if self.failure or not (self.end["USER"] and self.end["BOT"]):
+                self.log(MODE='eval-terminated')
+            else:
+                self.log(MODE="eval")
 
 class BotInstance:
      
@@ -402,15 +402,13 @@ class BotInstance:
 
         :return output: str; model output
         '''
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        completion = client.chat.completions.create(
-        model=self.model,
-        messages=self.msg_history,
-        max_tokens=self.MAXTOKENS,
-        temperature=1,
-        seed=self.seed
-        )
-        output = completion.choices[0].message.content        
+        output = llm_client.chat(
+            self.model,
+            prompt_layout.arrange(history.bounded(self.msg_history)),  # last HISTORY_TURNS exchanges, PROMPT_LAYOUT order
+            self.MAXTOKENS,
+            temperature=1,
+            seed=self.seed,
+        )  # shared, pooled client
         return output
 
     def get_inference(self):
@@ -424,6 +422,13 @@ class BotInstance:
     def update_message_history(self,new_message):
         self.msg_history.append({"role":"user", "content":new_message})
                 
+def play_game(NODES, board, seed, logging_didalogues, logging_eval, logging_GSM, board_index, ID):
+    """Plays one game; called by game_runner, possibly next to other games."""
+    game = GAME(NODES, board, seed, logging_didalogues, logging_eval, logging_GSM, board_index, ID) # start a game instance
+    start = f"[World-state-own] {game.boards["USER"]}\n[History] {game.actions_history["USER"]}\n[Observation] <START>"
+    game.run(start, TURNS=16)
+
+
 def main():
 
     NODES = 6
@@ -432,9 +437,18 @@ def main():
     n = 5
     version = "full-v3-new-actions-redo"
     setup = f"{NODES}nodes"
+    CONCURRENCY = 8  # games played at the same time
+    # draw weights of boards 1-6 in the default boards_6.json (the baseline condition of the earlier runs);
+    # any other board file is drawn uniformly
+    BOARD_WEIGHTS = [0.1, 0.1, 0.2, 0.2, 0.2, 0.2]
+
+    boards = board_store.open_boards(BOARDS_PATH)  # a boards_N.json file or a memory-mapped .boards store
+    weights = BOARD_WEIGHTS if os.path.basename(BOARDS_PATH) == "boards_6.json" else None
+    jobs = []  # one per game, all played by game_runner once the batches are drawn
 
     for seed in [1011, 143, 9999, 8060]:
         run_start = datetime.now()
+        draw = Random(seed)  # the same boards for a batch seed on every run, so a recorded batch replays (LLM_CACHE_MODE)
         path = f"logs/{version}/{setup}"
         if not os.path.exists(path):
             os.makedirs(path)
@@ -443,18 +457,26 @@ def main():
         logging_eval = f"{path}/{seed}-{run_start}-eval.txt"
         logging_GSM = f"{path}/{seed}-{run_start}-GSM.txt"
 
-        with open(BOARDS_PATH, "r") as file:
-            boards = json.load(file)
-        
         for i in range(n):
         # send a random board from json file
             ID = f"{seed}-{i+20}"
-            # board_index = str(randint(1,6))
-            board_index = str(choices(list(range(1,7)), [0.1, 0.1, 0.2, 0.2, 0.2, 0.2])[0])
+            board_index = str(draw.choices(range(1, len(boards) + 1), weights)[0])
             board = boards[board_index]
-            game = GAME(NODES, board, seed, logging_didalogues, logging_eval, logging_GSM, board_index, ID) # start a game instance
-            start = f"[World-state-own] {game.boards["USER"]}\n[History] {game.actions_history["USER"]}\n[Observation] <START>"
-            game.run(start, TURNS=16)
+            game_logs = (
+                (f"{path}/{seed}-{run_start}-{ID}-dialogues.txt", logging_eval, f"{path}/{seed}-{run_start}-{ID}-GSM.txt")
+                if CONCURRENCY > 1  # games played side by side get their own dialogue and GSM logs
+                else (logging_didalogues, logging_eval, logging_GSM)
+            )
+            jobs.append(partial(play_game, NODES, board, seed, *game_logs, board_index, ID))
+
+    game_runner.run_games(jobs, CONCURRENCY)
+
+    print(f"LLM calls: {llm_client.calls.summary()}")  # connect / total seconds per call over the whole run
+    print(f"LLM context: {history.context.summary()}")  # agent input tokens with the whole history vs. sent
+    if llm_client.RPM_LIMIT or llm_client.TPM_LIMIT:
+        print(f"LLM scheduler: {llm_client.get_scheduler().summary()}")  # queue depth / wait under LLM_RPM, LLM_TPM
+    if llm_client.CACHE_MODE != "off":
+        print(f"LLM cache: {llm_client.cache_stats()}")  # responses recorded / replayed (LLM_CACHE_MODE)
 
 
 if __name__ == "__main__":
@@ -1,16 +1,22 @@
 import ast
-import json
 import os
 import re
 from datetime import datetime
-from itertools import combinations
-from random import randint
-
-from openai import OpenAI
-
-import supplementary.ilp_solver as ilp_solver
+from functools import partial
+from random import Random
+
+import supplementary.board_store as board_store
+import supplementary.game_runner as game_runner
+import supplementary.gsm_fastpath as gsm_fastpath
+import supplementary.history as history
+import supplementary.llm_client as llm_client
+import supplementary.prompt_layout as prompt_layout
+import supplementary.solver_cache as solver_cache
+import supplementary.solvers as solvers
 import supplementary.tsp_utils as tsp_utils
+from supplementary.board import Board
 from supplementary.config import *
+from supplementary.knowledge import PartnerKnowledge
 from AGENTS.prompts_problem_solving import *
 
 
@@ -72,6 +78,10 @@ class GAME:
             "BOT": BOARD["BOT"],
             "USER": BOARD["USER"],
         }  # the boards given to the players
+        self.matrices = {
+            role: Board.from_triples(self.boards[role]) for role in ("BOT", "USER")
+        }  # the same boards as matrices, for O(1) hallway lookups
+        self.joint_board = self.matrices["BOT"] + self.matrices["USER"]  # the coins both players collect together
         self.solutions = {
             "BOT": [],
             "USER": [],
@@ -81,6 +91,8 @@ class GAME:
 
         # Flags
         self.playing = True  # True = the game is ongoing
+        self.turn = 0  # turns started so far
+        self.failure = None  # what ended the game early, if it raised (e.g. GameTimeout)
 
         # DATA STRUCTURES
         self.actions_history = {
@@ -124,6 +136,7 @@ class GAME:
             MODEL=self.model,
             SEED=self.seed,
             MAXTOKENS=600,
+            TRUTH={"LIGHT": self.matrices["USER"], "GHOST": self.matrices["BOT"]},  # the speaker's board per world
         )
 
         self.PLAYERS = {"BOT":self.bot, "USER":self.user_proxy}
@@ -150,45 +163,13 @@ class GAME:
         :return params: dict; {"node1node2": val, ...}
         """
 
-        unique_nodes = set(node for pair in self.boards[player] for node in pair[:2])
-        pairs = combinations(
-            unique_nodes, 2
-        )  # generate all possible pairs using combinations
-
-        # create dictionary with keys like "LB", "LE", etc., and lookup values in entity data
-        params = {
-            f"{x}{y}": next(
-                (v for (p1, p2, v) in self.boards[player] if {p1, p2} == {x, y}), None
-            )
-            for x, y in pairs
-        }
-        return params
+        return self.matrices[player].params()  # one O(1) matrix read per room pair
 
     def get_score(self):
         """A function for calculating the score of the (identical) path the players agreed upon by using their given boards. Updates the self.results["SCORE"] variable"""
 
-        score = 0
-        path = self.solutions[
-            "BOT"
-        ]  # the solution is identical, using BOT path as a proxy
-        pairs = [(path[i], path[i + 1]) for i in range(len(path) - 1)]
-
-        sum_board = [
-            (a, b, el1 + el2)
-            for [a, b, el1] in self.boards["BOT"]
-            for [a2, b2, el2] in self.boards["USER"]
-            if a == a2 and b == b2
-        ]
-
-        for pair in pairs:
-            score += [
-                value[2]
-                for value in sum_board
-                if (pair[0] == value[0] and pair[1] == value[1])
-                or (pair[0] == value[1] and pair[1] == value[0])
-            ][0]
-
-        self.results["SCORE"] = score
+        path = self.solutions["BOT"]  # the solution is identical, using BOT path as a proxy
+        self.results["SCORE"] = self.joint_board.path_coins(path)
 
     def solution_verification(self):
         """A function for evaluating the models' performance - checks if the generated solutions are:
@@ -300,7 +281,7 @@ class GAME:
                     )
 
         elif MODE == "eval":
-            with open(self.logging_eval, "a") as log_file:
+            with game_runner.EVAL_LOG_LOCK, open(self.logging_eval, "a") as log_file:  # one breakdown at a time
                 log_file.write(
                     f"""
         ------------------------------------------------
@@ -337,7 +318,7 @@ class GAME:
 """
                 )
         elif MODE == "eval-terminated":
-            with open(self.logging_eval, "a") as log_file:
+            with game_runner.EVAL_LOG_LOCK, open(self.logging_eval, "a") as log_file:
                 log_file.write(
                     f"""
         ------------------------------------------------
@@ -359,6 +340,9 @@ class GAME:
         BOT:\t{self.solutions["BOT"]}
         USER:\t{self.solutions['USER']}
         OPTIMAL:\t{self.solutions["OPTIMAL"]}
+        ------------------------------------------------
+        Ended by:\t{self.failure or 'turn limit'}
+        Turn reached:\t{self.turn}
         ------------------------------------------------"""
                 )
 
@@ -448,126 +432,123 @@ class GAME:
         # logging the basics into the dialogue file
         self.user_proxy.update_message_history(start)
 
-        while self.playing:
-            # terminate the program in case the agents get stuck in a loop
-            TURNS -= 1
-            if TURNS == 0:
-                break
-
-            if self.end["USER"] and self.end["BOT"]:
-                self.solution_verification()
-                self.playing = False
-                break
-
-            #################### USER BLOCK ####################
-            user_message = (
-                self.user_proxy.get_inference()
-            )  # messages generated by the user proxy
-            self.log(MSG=user_message, ROLE="USER")  # log user message
-            user_message_PARSED = self.parse_message(
-                user_message
-            )  # separate [Thought] [Action] and [Message]
-            try:
-                self.parse_actions(user_message_PARSED["Action"], "USER")
-            except:
-                pass
-
-            # GROUND STATE MANAGER BLOCK: update the BOT's "other state" (after USER's turn)
-            try:
-                gsm_output_raw = self.MANAGER.get_inference(
-                    user_message_PARSED["Message"], self.bot.other_user_WS, self.user_proxy.visited[-1], "LIGHT"
-                )
-                gsm_output_parsed = self.parse_message(gsm_output_raw)
-                self.log(ROLE="GSM")
-                NWS = re.sub(
-                    r"[^a-zA-Z0-9\s\[\]\(\)\"',]", "", gsm_output_parsed["NWS"].strip()
-                )  # NWS = new world state
-
-                self.bot.other_user_WS += ast.literal_eval(
-                    NWS
-                )  # update in bot's history
-                if len(ast.literal_eval(NWS)) > 0:
-                    self.bot.update_total_board(ast.literal_eval(NWS))
-                    
-            except:  # formatting issue
-                pass
-
-            self.bot.intermediate_best_path()  # update the IBP based on the new info
-
-            try:
-                new_string = f"[World-state-own]: {self.boards['BOT']}\n[World-state-user]: {self.bot.other_user_WS}\n[Remaining]: {self.rooms["BOT"]}\n[Visited]: {self.bot.visited}\n[IBP]: {self.bot.IBP}\n[Observation]: {user_message_PARSED['Message']}"
-
-            except:  # if there is an error is user message formatting (cannot access [user_message_PARSED['Message']])
-                new_string = f"[World-state-own]: {self.boards['BOT']}\n[World-state-user]: {self.bot.other_user_WS}\n[Remaining]: {self.rooms["BOT"]}\n[Visited]: {self.bot.visited}\n[IBP]: {self.bot.IBP}\n[Observation]: <USER MESSAGE IN WRONG FORMAT>"
-
-            print(f'INPUT - BOT: {new_string}\n')
-            self.log(MSG=new_string, ROLE="BOT-input")
-            self.bot.update_message_history(
-                new_string
-            )  # add new input (based on the USER's output) to BOT's msg history
-
-            if self.end["USER"] and self.end["BOT"]:
-                self.solution_verification()
-                self.playing = False
-                continue
-
-            #################### BOT BLOCK ####################
-            else:
-                bot_message = self.bot.get_inference()
-                self.log(MSG=bot_message, ROLE="BOT")  # log bot message
-                bot_message_PARSED = self.parse_message(
-                    bot_message
-                )  # extract bot actions
+        try:
+            while self.playing:
+                # terminate the program in case the agents get stuck in a loop
+                TURNS -= 1
+                if TURNS == 0:
+                    break
+                self.turn += 1
 
+                if self.end["USER"] and self.end["BOT"]:
+                    self.solution_verification()
+                    self.playing = False
+                    break
+
+                #################### USER BLOCK ####################
+                user_message = (
+                    self.user_proxy.get_inference()
+                )  # messages generated by the user proxy
+                self.log(MSG=user_message, ROLE="USER")  # log user message
+                user_message_PARSED = self.parse_message(
+                    user_message
+                )  # separate [Thought] [Action] and [Message]
                 try:
-                    self.parse_actions(bot_message_PARSED["Action"], "BOT")
+                    self.parse_actions(user_message_PARSED["Action"], "USER")
                 except:
                     pass
 
-                # GROUND STATE MANAGER block: update the state based on message and old state
+                # GROUND STATE MANAGER BLOCK: update the BOT's "other state" (after USER's turn)
                 try:
                     gsm_output_raw = self.MANAGER.get_inference(
-                        bot_message_PARSED["Message"], self.user_proxy.other_user_WS, self.bot.visited[-1], "GHOST"
+                        user_message_PARSED["Message"], self.bot.other_user_WS, self.user_proxy.visited[-1], "LIGHT"
                     )
                     gsm_output_parsed = self.parse_message(gsm_output_raw)
                     self.log(ROLE="GSM")
                     NWS = re.sub(
-                        r"[^a-zA-Z0-9\s\[\]\(\)\"',]",
-                        "",
-                        gsm_output_parsed["NWS"].strip(),
-                    )
-                    self.user_proxy.other_user_WS += ast.literal_eval(
-                        NWS
-                    )  # update in user proxy's history
-                    if len(ast.literal_eval(NWS)) > 0:
-                        self.user_proxy.update_total_board(
-                            ast.literal_eval(NWS)
-                        )  # update user proxy's total_board
-            
-                    # else continue without updating
-                except:  # formatting issue in parsing GSM's message OR extracting NWS
+                        r"[^a-zA-Z0-9\s\[\]\(\)\"',]", "", gsm_output_parsed["NWS"].strip()
+                    )  # NWS = new world state
+
+                    self.bot.update_total_board(
+                        ast.literal_eval(NWS)
+                    )  # one value per hallway: repeated or flipped reports change nothing
+                except (KeyError, ValueError, SyntaxError, TypeError):  # unformatted message or NWS; LLM errors and GameTimeout propagate
                     pass
-                
-                self.user_proxy.intermediate_best_path()  # update the IBP based on the new info
+
+                self.bot.intermediate_best_path()  # update the IBP based on the new info
 
                 try:
-                    new_string = f"[World-state-own]: {self.boards['USER']}\n[World-state-user]: {self.user_proxy.other_user_WS}\n[Remaining]: {self.rooms["USER"]}\n[Visited]: {self.user_proxy.visited}\n[IBP]: {self.user_proxy.IBP}\n[Observation]: {bot_message_PARSED['Message']}"
-                except:
-                    new_string = f"[World-state-own]: {self.boards['USER']}\n[World-state-user]: {self.user_proxy.other_user_WS}\n[Remaining]: {self.rooms["USER"]}\n[Visited]: {self.user_proxy.visited}\n[IBP]: {self.user_proxy.IBP}\n[Observation]: <USER MESSAGE IN WRONG FORMAT>"
+                    new_string = f"[World-state-own]: {self.boards['BOT']}\n[World-state-user]: {self.bot.other_user_WS}\n[Remaining]: {self.rooms["BOT"]}\n[Visited]: {self.bot.visited}\n[IBP]: {self.bot.IBP}\n[Observation]: {user_message_PARSED['Message']}"
+
+                except:  # if there is an error is user message formatting (cannot access [user_message_PARSED['Message']])
+                    new_string = f"[World-state-own]: {self.boards['BOT']}\n[World-state-user]: {self.bot.other_user_WS}\n[Remaining]: {self.rooms["BOT"]}\n[Visited]: {self.bot.visited}\n[IBP]: {self.bot.IBP}\n[Observation]: <USER MESSAGE IN WRONG FORMAT>"
+
+                print(f'INPUT - BOT: {new_string}\n')
+                self.log(MSG=new_string, ROLE="BOT-input")
+                self.bot.update_message_history(
+                    new_string
+                )  # add new input (based on the USER's output) to BOT's msg history
 
-                self.user_proxy.update_message_history(new_string)
-                print(f'INPUT - USER: {new_string}\n')
-                self.log(MSG=new_string, ROLE="USER-input")
                 if self.end["USER"] and self.end["BOT"]:
                     self.solution_verification()
                     self.playing = False
-                    break
+                    continue
 
-        # Log the eval results to a separate eval file
-        if not (self.end["USER"] and self.end["BOT"]):
-            self.log(MODE="eval-terminated")
-        else:
-            self.log(MODE="eval")
+                #################### BOT BLOCK ####################
+                else:
+                    bot_message = self.bot.get_inference()
+                    self.log(MSG=bot_message, ROLE="BOT")  # log bot message
+                    bot_message_PARSED = self.parse_message(
+                        bot_message
+                    )  # extract bot actions
+
+                    try:
+                        self.parse_actions(bot_message_PARSED["Action"], "BOT")
+                    except:
+                        pass
+
+                    # GROUND STATE MANAGER block: update the state based on message and old state
+                    try:
+                        gsm_output_raw = self.MANAGER.get_inference(
+                            bot_message_PARSED["Message"], self.user_proxy.other_user_WS, self.bot.visited[-1], "GHOST"
+                        )
+                        gsm_output_parsed = self.parse_message(gsm_output_raw)
+                        self.log(ROLE="GSM")
+                        NWS = re.sub(
+                            r"[^a-zA-Z0-9\s\[\]\(\)\"',]",
+                            "",
+                            gsm_output_parsed["NWS"].strip(),
+                        )
+                        self.user_proxy.update_total_board(
+                            ast.literal_eval(NWS)
+                        )  # update user proxy's known board
+                        # else continue without updating
+                    except (KeyError, ValueError, SyntaxError, TypeError):  # unformatted message or NWS; LLM errors and GameTimeout propagate
+                        pass
+
+                    self.user_proxy.intermediate_best_path()  # update the IBP based on the new info
+
+                    try:
+                        new_string = f"[World-state-own]: {self.boards['USER']}\n[World-state-user]: {self.user_proxy.other_user_WS}\n[Remaining]: {self.rooms["USER"]}\n[Visited]: {self.user_proxy.visited}\n[IBP]: {self.user_proxy.IBP}\n[Observation]: {bot_message_PARSED['Message']}"
+                    except:
+                        new_string = f"[World-state-own]: {self.boards['USER']}\n[World-state-user]: {self.user_proxy.other_user_WS}\n[Remaining]: {self.rooms["USER"]}\n[Visited]: {self.user_proxy.visited}\n[IBP]: {self.user_proxy.IBP}\n[Observation]: <USER MESSAGE IN WRONG FORMAT>"
+
+                    self.user_proxy.update_message_history(new_string)
+                    print(f'INPUT - USER: {new_string}\n')
+                    self.log(MSG=new_string, ROLE="USER-input")
+                    if self.end["USER"] and self.end["BOT"]:
+                        self.solution_verification()
+                        self.playing = False
+                        break
+        except Exception as error:  # GameTimeout, or an LLM error that used up its retries
+            self.failure = f"{type(error).__name__}: {error}"
+            raise
+        finally:  # every game gets an eval record, so batch rates also count the failed ones
+            # Log the eval results to a separate eval file
+            if self.failure or not (self.end["USER"] and self.end["BOT"]):
+                self.log(MODE="eval-terminated")
+            else:
+                self.log(MODE="eval")
 
 
 class BotInstance:
@@ -588,29 +569,30 @@ class BotInstance:
         self.model = MODEL  # gpt-4o-2024-08-06
         self.seed = SEED
         self.MAXTOKENS = MAXTOKENS
-        self.other_user_WS = []  # the other user's world state
         self.BOARD = BOARD  # own board
-        self.total_board = list(
-            BOARD
-        )  # own board + what is known from the user's board
+        self.knowledge = PartnerKnowledge(
+            Board.from_triples(BOARD)
+        )  # the other user's world state, one value per hallway
         self.IBP = []  # "intermediate best path"
         self.IBC = 0  # "intermediate best coins"
+        self.solved_for = None  # (knowledge version, partial path) of the current IBP
         self.visited = ["L"] # list of rooms the users have agreed to visit 
+        self.solver = solvers.SolverSession(
+            cache=solver_cache.shared_cache()
+        )  # picks the fastest backend for the board size; reuses results cached by earlier games
 
     def inference(self):
         """A function that calls the OpenAI API using the previously set parameters
 
         :return output: str; model output
         """
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        completion = client.chat.completions.create(
-            model=self.model,
-            messages=self.msg_history,
-            max_tokens=self.MAXTOKENS,
+        output = llm_client.chat(
+            self.model,
+            prompt_layout.arrange(history.bounded(self.msg_history)),  # last HISTORY_TURNS exchanges, PROMPT_LAYOUT order
+            self.MAXTOKENS,
             temperature=1,
             seed=self.seed,
-        )
-        output = completion.choices[0].message.content
+        )  # shared, pooled client
         return output
 
     def get_inference(self):
@@ -629,23 +611,24 @@ class BotInstance:
         """
         self.msg_history.append({"role": "user", "content": new_message})
 
-    def update_total_board(self, addition: list):
+    @property
+    def other_user_WS(self) -> list:
+        """The other user's world state: the known hallways of their board."""
+        return self.knowledge.world_state()
+
+    @property
+    def total_board(self) -> Board:
+        """Own board + what is known from the user's board."""
+        return self.knowledge.total
+
+    def update_total_board(self, addition: list) -> list:
         """
-        A function that iteratively updates a complete internal board with new information from the user. When the user gives info about an edge, the new value gets added to the agent's own value of the same edge. Other (known) edges currently +0.
+        A function that updates the known board with new information from the user. The user's value of an edge gets added to the agent's own value of the same edge; an edge reported again (in either orientation) is only updated if its value changed.
 
         :param addition: list; format [("node1", "node2", int-value), ...]
+        :return changed: list; the edges whose value was added or changed
         """
-        for el in addition:
-            right_el = [
-                element
-                for element in self.total_board
-                if element[0] == el[0] and element[1] == el[1]
-            ][0]
-            # right_el_idx = self.total_board.index(right_el)
-            self.total_board.remove(right_el)
-            self.total_board.append(
-                tuple([right_el[0], right_el[1], int(el[2]) + int(right_el[2])])
-            )  # (str, str, int)
+        return self.knowledge.update(addition)
 
     def intermediate_best_path(self, partial_path=["L"]) -> list[str]:
         """A function that calculates the best path for the agent's graph. The path is calculated based on the partial path (default: ["L"]) and the agent's total board.
@@ -654,16 +637,22 @@ class BotInstance:
         :return best_tour: list[str]; the calculated best path
         """
 
-        g = tsp_utils.board_to_graph(self.total_board)
-        tsp_utils.validate_graph(g)
         pp = self.visited if self.visited[-1] != "L" or len(self.visited) == 1 else self.visited[:-1]
-        self.IBP, self.IBC = ilp_solver.solve(g, pp) # use self.visited as partial path
+        if self.solved_for == (self.knowledge.version, tuple(pp)):
+            return self.IBP  # nothing new since the last solve
+        tsp_utils.validate_graph(self.total_board)  # the solvers read the board matrix directly
+        self.IBP, self.IBC = self.solver.solve(self.total_board, pp) # use self.visited as partial path
         self.IBP.append("L")
+        self.solved_for = (self.knowledge.version, tuple(pp))
         return self.IBP
 
+    def close(self):
+        """Frees the agent's solver session (a persistent Gurobi model holds a license token until closed)."""
+        self.solver.close()
+
 
 class GroundStateManager:
-    def __init__(self, BASE_PROMPT: str, MODEL: str, SEED: int, MAXTOKENS: int):
+    def __init__(self, BASE_PROMPT: str, MODEL: str, SEED: int, MAXTOKENS: int, TRUTH: dict | None = None):
         """
         A class for the LLM-based Ground State Manager (GSM), whose main job is to extract new information about the graph of "the other player".
 
@@ -671,27 +660,23 @@ class GroundStateManager:
         :param MODEL: str; the OpenAI model to be called
         :param SEED: int;
         :param MAXTOKENS:int;
+        :param TRUTH: dict; {WORLD: the board of the player in that world}, to score the extracted values (optional)
         """
         self.msg_history = [{"role": "system", "content": BASE_PROMPT}]
         self.model = MODEL  # "gpt-4o-2024-08-06"
         self.seed = SEED
         self.MAXTOKENS = MAXTOKENS
         self.previous_input = None  # the last recorded input str; for logging purposes
+        self.truth = TRUTH or {}
 
     def inference(self, input: list):
         """A function that calls the OpenAI API using the previously set parameters
 
         :return output: str; model output
         """
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        completion = client.chat.completions.create(
-            model=self.model,
-            messages=input,
-            max_tokens=self.MAXTOKENS,
-            temperature=1,
-            seed=self.seed,
-        )
-        output = completion.choices[0].message.content
+        output = llm_client.chat(
+            self.model, input, self.MAXTOKENS, temperature=1, seed=self.seed
+        )  # shared, pooled client
         return output
 
     def make_input(self, message: str, old_ws: list, loc: str, world: str):
@@ -714,13 +699,46 @@ class GroundStateManager:
         :return raw_output: str; the complete output of the LLM. format: [Thought]: ... \n [NWS]: ...\n
         """
         input = self.make_input(MESSAGE, OWS, LOC, WORLD)
-        raw_output = self.inference(input)
+        raw_output = gsm_fastpath.infer(
+            MESSAGE, OWS, LOC, WORLD, self.msg_history[0]["content"], lambda: self.inference(input), self.truth.get(WORLD)
+        )  # the LLM only reads messages the symbolic reader is not confident about (GSM_FASTPATH)
         self.previous_input = input
         self.previous_message = raw_output
 
         return raw_output
 
 
+def play_game(NODES, board, seed, logging_didalogues, logging_eval, logging_GSM, board_index, ID):
+    """Plays one game; called by game_runner, possibly next to other games."""
+    game = GAME(
+        NODES,
+        board,
+        seed,
+        logging_didalogues,
+        logging_eval,
+        logging_GSM,
+        board_index,
+        ID,
+    )  # start a game instance
+    start = f"[World-state-own]: {game.boards['USER']}\n[World-state-user]: {game.user_proxy.other_user_WS}\n[Remaining]: {game.rooms["USER"]}\n[Visited]: {game.user_proxy.visited}\n[IBP]: {game.user_proxy.IBP}\n[Observation]: <START>"  # starting prompt for USER agent (hard-coded to go first)
+    game.log(
+        SUMMARY=[
+            game.prompt_type,
+            game.run_start,
+            game.model,
+            game.seed,
+            game.boards,
+            game.solutions,
+        ]
+    )
+    game.log(MSG=start, ROLE="USER-input")
+    try:
+        game.run(start=start, TURNS=16)
+    finally:  # also when the game fails or runs out of its budget
+        for player in game.PLAYERS.values():
+            player.close()
+
+
 def main():
     """A function controling the flow of the experiment; includes meta-params, such as how many games are played per batch, seeds,"""
 
@@ -729,9 +747,14 @@ def main():
     n = 25  # how many games are played per batch
     version = "v14"  # CHANGE
     setup = f"{NODES}nodes"
+    CONCURRENCY = 8  # games played at the same time
+
+    boards = board_store.open_boards(BOARDS_PATH)  # a boards_N.json file or a memory-mapped .boards store
+    jobs = []  # one per game, all played by game_runner once the batches are drawn
 
     for seed in [1011, 143, 9999, 8060]:  # 1 seed = 1 batch
         run_start = datetime.now()
+        draw = Random(seed)  # the same boards for a batch seed on every run, so a recorded batch replays (LLM_CACHE_MODE)
         path = f"logs/{version}/{setup}"
         if not os.path.exists(path):
             os.makedirs(path)
@@ -740,37 +763,28 @@ def main():
         logging_eval = f"{path}/{seed}-{run_start}-eval.txt"
         logging_GSM = f"{path}/{seed}-{run_start}-GSM.txt"
 
-        with open(BOARDS_PATH, "r") as file:
-            boards = json.load(file)
-
         for i in range(n):
             # send a random board from json file
             ID = f"{seed}-{i}"
-            board_index = str(randint(1, 6))
+            board_index = str(draw.randint(1, len(boards)))
             board = boards[board_index]
-            game = GAME(
-                NODES,
-                board,
-                seed,
-                logging_didalogues,
-                logging_eval,
-                logging_GSM,
-                board_index,
-                ID,
-            )  # start a game instance
-            start = f"[World-state-own]: {game.boards['USER']}\n[World-state-user]: {game.user_proxy.other_user_WS}\n[Remaining]: {game.rooms["USER"]}\n[Visited]: {game.user_proxy.visited}\n[IBP]: {game.user_proxy.IBP}\n[Observation]: <START>"  # starting prompt for USER agent (hard-coded to go first)
-            game.log(
-            SUMMARY=[
-                game.prompt_type,
-                game.run_start,
-                game.model,
-                game.seed,
-                game.boards,
-                game.solutions,
-            ]
-        )
-            game.log(MSG=start, ROLE="USER-input")
-            game.run(start=start, TURNS=16)
+            game_logs = (
+                (f"{path}/{seed}-{run_start}-{ID}-dialogues.txt", logging_eval, f"{path}/{seed}-{run_start}-{ID}-GSM.txt")
+                if CONCURRENCY > 1  # games played side by side get their own dialogue and GSM logs
+                else (logging_didalogues, logging_eval, logging_GSM)
+            )
+            jobs.append(partial(play_game, NODES, board, seed, *game_logs, board_index, ID))
+
+    game_runner.run_games(jobs, CONCURRENCY)
+
+    print(f"LLM calls: {llm_client.calls.summary()}")  # connect / total seconds per call over the whole run
+    print(f"LLM context: {history.context.summary()}")  # agent input tokens with the whole history vs. sent
+    if gsm_fastpath.FASTPATH:
+        print(f"GSM fast path: {gsm_fastpath.stats.summary()}")  # messages read without the LLM, accuracy by source
+    if llm_client.RPM_LIMIT or llm_client.TPM_LIMIT:
+        print(f"LLM scheduler: {llm_client.get_scheduler().summary()}")  # queue depth / wait under LLM_RPM, LLM_TPM
+    if llm_client.CACHE_MODE != "off":
+        print(f"LLM cache: {llm_client.cache_stats()}")  # responses recorded / replayed (LLM_CACHE_MODE)
 
 
 if __name__ == "__main__":
@@ -1,13 +1,19 @@
-from random import randint
+from random import Random
 import os
 import re
 import ast
-from openai import OpenAI
+import supplementary.board_store as board_store
+import supplementary.game_runner as game_runner
+import supplementary.gsm_fastpath as gsm_fastpath
+import supplementary.history as history
+import supplementary.llm_client as llm_client
+import supplementary.prompt_layout as prompt_layout
+from supplementary.board import Board
 from supplementary.config import *
+from supplementary.knowledge import PartnerKnowledge
 from AGENTS.prompts_state_tracking import *
 from datetime import datetime
-import json
-from itertools import combinations
+from functools import partial
 
 
 class GAME:
@@ -47,6 +53,10 @@ class GAME:
             "BOT": BOARD["BOT"],
             "USER": BOARD["USER"],
         }  # the boards given to the players
+        self.matrices = {
+            role: Board.from_triples(self.boards[role]) for role in ("BOT", "USER")
+        }  # the same boards as matrices, for O(1) hallway lookups
+        self.joint_board = self.matrices["BOT"] + self.matrices["USER"]  # the coins both players collect together
         self.solutions = {
             "BOT": [],
             "USER": [],
@@ -56,6 +66,8 @@ class GAME:
 
         # Flags
         self.playing = True  # True = the game is ongoing
+        self.turn = 0  # turns started so far
+        self.failure = None  # what ended the game early, if it raised (e.g. GameTimeout)
 
         # DATA STRUCTURES
         self.actions_history = {
@@ -97,6 +109,7 @@ class GAME:
             MODEL=self.model,
             SEED=self.seed,
             MAXTOKENS=600,
+            TRUTH={"LIGHT": self.matrices["USER"], "GHOST": self.matrices["BOT"]},  # the speaker's board per world
         )
 
         self.PLAYERS = {"BOT":self.bot, "USER":self.user_proxy}
@@ -123,31 +136,13 @@ class GAME:
         :return params: dict
         '''
 
-        unique_nodes = set(node for pair in self.boards[entity] for node in pair[:2])
-        pairs = combinations(unique_nodes, 2) # Generate all possible pairs using combinations
-
-        # Create dictionary with keys like "LB", "LE", etc., and lookup values in entity data
-        params = {
-            f"{x}{y}": next(
-                (v for (p1, p2, v) in self.boards[entity] if {p1, p2} == {x, y}), None
-            )
-            for x, y in pairs
-        }
-        return params
+        return self.matrices[entity].params()  # one O(1) matrix read per room pair
     
     def get_score(self):
         '''The function for calculating the score of the (identical) path the players agreed upon by using their given boards.'''
 
-        score = 0
-        path = self.solutions["BOT"] # the solution is identical 
-        pairs = [(path[i], path[i+1]) for i in range(len(path)-1)]
-
-        sum_board = [(a, b, el1 + el2) for [a, b, el1] in self.boards["BOT"] for [a2, b2, el2] in self.boards["USER"] if a == a2 and b == b2]
-
-        for pair in pairs:
-            score += [value[2] for value in sum_board if (pair[0] == value[0] and pair[1] == value[1]) or (pair[0] == value[1] and pair[1] == value[0])][0]
-
-        self.results["SCORE"] = score
+        path = self.solutions["BOT"]  # the solution is identical, using BOT path as a proxy
+        self.results["SCORE"] = self.joint_board.path_coins(path)
     
     def solution_verification(self):
         '''A function for evaluating the models' performance - checks if the generated solutions are:
@@ -256,7 +251,7 @@ class GAME:
                     )
 
         elif MODE == "eval":
-            with open(self.logging_eval, "a") as log_file:
+            with game_runner.EVAL_LOG_LOCK, open(self.logging_eval, "a") as log_file:  # one breakdown at a time
                 log_file.write(
                     f"""
         ------------------------------------------------
@@ -293,7 +288,7 @@ class GAME:
 """
                 )
         elif MODE == "eval-terminated":
-            with open(self.logging_eval, "a") as log_file:
+            with game_runner.EVAL_LOG_LOCK, open(self.logging_eval, "a") as log_file:
                 log_file.write(
                     f"""
         ------------------------------------------------
@@ -315,6 +310,9 @@ class GAME:
         BOT:\t{self.solutions["BOT"]}
         USER:\t{self.solutions['USER']}
         OPTIMAL:\t{self.solutions["OPTIMAL"]}
+        ------------------------------------------------
+        Ended by:\t{self.failure or 'turn limit'}
+        Turn reached:\t{self.turn}
         ------------------------------------------------"""
                 )
 
@@ -394,120 +392,115 @@ class GAME:
         # logging the basics into the dialogue file 
         self.user_proxy.update_message_history(start)
 
-        while self.playing:
-            # terminate the program in case the agents get stuck in a loop
-            TURNS -= 1
-            if TURNS == 0:
-                break
-
-            if self.end["USER"] and self.end["BOT"]:
-                self.solution_verification()
-                self.playing = False
-                break
-
-            #################### USER BLOCK ####################
-            user_message = (
-                self.user_proxy.get_inference()
-            )  # messages generated by the user proxy
-            self.log(MSG=user_message, ROLE="USER")  # log user message
-            user_message_PARSED = self.parse_message(
-                user_message
-            )  # separate [Thought] [Action] and [Message]
-
-            # GROUND STATE MANAGER BLOCK: update the BOT's "other state" (after USER's turn)
-            try:
-                gsm_output_raw = self.MANAGER.get_inference(user_message_PARSED["Message"], self.bot.other_user_WS, self.user_proxy.visited[-1], "LIGHT") # pass user's last "visited" node bc it's the user's message
-                gsm_output_parsed = self.parse_message(gsm_output_raw)
-                self.log(ROLE="GSM")
-                NWS = re.sub(
-                    r"[^a-zA-Z0-9\s\[\]\(\)\"',]", "", gsm_output_parsed["NWS"].strip()
-                )  # NWS = new world state
-
-                self.bot.other_user_WS += ast.literal_eval(
-                    NWS
-                )  # update in bot's history
-                if len(ast.literal_eval(NWS)) > 0:
-                    self.bot.update_total_board(ast.literal_eval(NWS))
-                    
-            except:  # formatting issue
-                pass
-
-            try: # upadate actions after GSM (take old Loc)
-                self.parse_actions(user_message_PARSED["Action"], "USER")
-            except:
-                pass
-
-            try:
-                new_string = f"[World-state-own]: {self.boards['BOT']}\n[World-state-user]: {self.bot.other_user_WS}\n[Visited]: {self.bot.visited}\n[Remaining]: {self.rooms["BOT"]}\n[Observation]: {user_message_PARSED['Message']}"
-
-            except:  # if there is an error is user message formatting (cannot access [user_message_PARSED['Message']])
-                new_string = f"[World-state-own]: {self.boards['BOT']}\n[World-state-user]: {self.bot.other_user_WS}\n[Visited]: {self.bot.visited}\n[Remaining]: {self.rooms["BOT"]}\n[Observation]: <USER MESSAGE IN WRONG FORMAT>"
-
-            print(f'INPUT - BOT: {new_string}\n')
-            self.log(MSG=new_string, ROLE="BOT-input")
-            self.bot.update_message_history(
-                new_string
-            )  # add new input (based on the USER's output) to BOT's msg history
-
-            if self.end["USER"] and self.end["BOT"]:
-                self.solution_verification()
-                self.playing = False
-                break
-
-            #################### BOT BLOCK ####################
-            else:
-                bot_message = self.bot.get_inference()
-                self.log(MSG=bot_message, ROLE="BOT")  # log bot message
-                bot_message_PARSED = self.parse_message(
-                    bot_message
-                )  # extract bot actions
+        try:
+            while self.playing:
+                # terminate the program in case the agents get stuck in a loop
+                TURNS -= 1
+                if TURNS == 0:
+                    break
+                self.turn += 1
 
+                if self.end["USER"] and self.end["BOT"]:
+                    self.solution_verification()
+                    self.playing = False
+                    break
+
+                #################### USER BLOCK ####################
+                user_message = (
+                    self.user_proxy.get_inference()
+                )  # messages generated by the user proxy
+                self.log(MSG=user_message, ROLE="USER")  # log user message
+                user_message_PARSED = self.parse_message(
+                    user_message
+                )  # separate [Thought] [Action] and [Message]
 
-                # GROUND STATE MANAGER block: update the state based on message and old state
+                # GROUND STATE MANAGER BLOCK: update the BOT's "other state" (after USER's turn)
                 try:
-                    gsm_output_raw = self.MANAGER.get_inference(bot_message_PARSED["Message"], self.user_proxy.other_user_WS, self.bot.visited[-1], "GHOST")
+                    gsm_output_raw = self.MANAGER.get_inference(user_message_PARSED["Message"], self.bot.other_user_WS, self.user_proxy.visited[-1], "LIGHT") # pass user's last "visited" node bc it's the user's message
                     gsm_output_parsed = self.parse_message(gsm_output_raw)
                     self.log(ROLE="GSM")
                     NWS = re.sub(
-                        r"[^a-zA-Z0-9\s\[\]\(\)\"',]",
-                        "",
-                        gsm_output_parsed["NWS"].strip(),
-                    )
-                    self.user_proxy.other_user_WS += ast.literal_eval(
-                        NWS
-                    )  # update in user proxy's history
-                    if len(ast.literal_eval(NWS)) > 0:
-                        self.user_proxy.update_total_board(
-                            ast.literal_eval(NWS)
-                        )  # update user proxy's total_board
-            
-                    # else continue without updating
-                except:  # formatting issue in parsing GSM's message OR extracting NWS
+                        r"[^a-zA-Z0-9\s\[\]\(\)\"',]", "", gsm_output_parsed["NWS"].strip()
+                    )  # NWS = new world state
+
+                    self.bot.update_total_board(ast.literal_eval(NWS))  # one value per hallway: repeated or flipped reports change nothing
+
+                except (KeyError, ValueError, SyntaxError, TypeError):  # unformatted message or NWS; LLM errors and GameTimeout propagate
                     pass
 
-                try:
-                    self.parse_actions(bot_message_PARSED["Action"], "BOT")
+                try: # upadate actions after GSM (take old Loc)
+                    self.parse_actions(user_message_PARSED["Action"], "USER")
                 except:
                     pass
-                
+
                 try:
-                    new_string = f"[World-state-own]: {self.boards['USER']}\n[World-state-user]: {self.user_proxy.other_user_WS}\n[Visited]: {self.user_proxy.visited}\n[Remaining]: {self.rooms["USER"]}\n[Observation]: {bot_message_PARSED['Message']}"
-                except:
-                    new_string = f"[World-state-own]: {self.boards['USER']}\n[World-state-user]: {self.user_proxy.other_user_WS}\n[Visited]: {self.user_proxy.visited}\n[Remaining]: {self.rooms["USER"]}\n[Observation]: <USER MESSAGE IN WRONG FORMAT>"
+                    new_string = f"[World-state-own]: {self.boards['BOT']}\n[World-state-user]: {self.bot.other_user_WS}\n[Visited]: {self.bot.visited}\n[Remaining]: {self.rooms["BOT"]}\n[Observation]: {user_message_PARSED['Message']}"
+
+                except:  # if there is an error is user message formatting (cannot access [user_message_PARSED['Message']])
+                    new_string = f"[World-state-own]: {self.boards['BOT']}\n[World-state-user]: {self.bot.other_user_WS}\n[Visited]: {self.bot.visited}\n[Remaining]: {self.rooms["BOT"]}\n[Observation]: <USER MESSAGE IN WRONG FORMAT>"
+
+                print(f'INPUT - BOT: {new_string}\n')
+                self.log(MSG=new_string, ROLE="BOT-input")
+                self.bot.update_message_history(
+                    new_string
+                )  # add new input (based on the USER's output) to BOT's msg history
 
-                self.user_proxy.update_message_history(new_string)
-                print(f'INPUT - USER: {new_string}\n')
-                self.log(MSG=new_string, ROLE="USER-input")
                 if self.end["USER"] and self.end["BOT"]:
                     self.solution_verification()
                     self.playing = False
                     break
 
-        # Log the eval results to a separate eval file
-        if not (self.end["USER"] and self.end["BOT"]):
-            self.log(MODE='eval-terminated')
-        else:
-            self.log(MODE="eval")
+                #################### BOT BLOCK ####################
+                else:
+                    bot_message = self.bot.get_inference()
+                    self.log(MSG=bot_message, ROLE="BOT")  # log bot message
+                    bot_message_PARSED = self.parse_message(
+                        bot_message
+                    )  # extract bot actions
+
+
+                    # GROUND STATE MANAGER block: update the state based on message and old state
+                    try:
+                        gsm_output_raw = self.MANAGER.get_inference(bot_message_PARSED["Message"], self.user_proxy.other_user_WS, self.bot.visited[-1], "GHOST")
+                        gsm_output_parsed = self.parse_message(gsm_output_raw)
+                        self.log(ROLE="GSM")
+                        NWS = re.sub(
+                            r"[^a-zA-Z0-9\s\[\]\(\)\"',]",
+                            "",
+                            gsm_output_parsed["NWS"].strip(),
+                        )
+                        self.user_proxy.update_total_board(ast.literal_eval(NWS))  # one value per hallway: repeated or flipped reports change nothing
+
+                        # else continue without updating
+                    except (KeyError, ValueError, SyntaxError, TypeError):  # unformatted message or NWS; LLM errors and GameTimeout propagate
+                        pass
+
+                    try:
+                        self.parse_actions(bot_message_PARSED["Action"], "BOT")
+                    except:
+                        pass
+
+                    try:
+                        new_string = f"[World-state-own]: {self.boards['USER']}\n[World-state-user]: {self.user_proxy.other_user_WS}\n[Visited]: {self.user_proxy.visited}\n[Remaining]: {self.rooms["USER"]}\n[Observation]: {bot_message_PARSED['Message']}"
+                    except:
+                        new_string = f"[World-state-own]: {self.boards['USER']}\n[World-state-user]: {self.user_proxy.other_user_WS}\n[Visited]: {self.user_proxy.visited}\n[Remaining]: {self.rooms["USER"]}\n[Observation]: <USER MESSAGE IN WRONG FORMAT>"
+
+                    self.user_proxy.update_message_history(new_string)
+                    print(f'INPUT - USER: {new_string}\n')
+                    self.log(MSG=new_string, ROLE="USER-input")
+                    if self.end["USER"] and self.end["BOT"]:
+                        self.solution_verification()
+                        self.playing = False
+                        break
+        except Exception as error:  # GameTimeout, or an LLM error that used up its retries
+            self.failure = f"{type(error).__name__}: {error}"
+            raise
+        finally:  # every game gets an eval record, so batch rates also count the failed ones
+            # Log the eval results to a separate eval file
+            if self.failure or not (self.end["USER"] and self.end["BOT"]):
+                self.log(MODE='eval-terminated')
+            else:
+                self.log(MODE="eval")
 
 class BotInstance:
      
@@ -517,25 +510,28 @@ class BotInstance:
         self.seed = SEED
         self.recent_message = None
         self.MAXTOKENS = MAXTOKENS
-        self.other_user_WS = []
+        self.knowledge = PartnerKnowledge(Board.from_triples(BOARD)) # the other user's world state, one value per hallway
         self.visited = ["L"]
 
+    @property
+    def other_user_WS(self):
+        return self.knowledge.world_state()
+
+    def update_total_board(self, addition: list) -> list:
+        ''' Merges the other user's reported edges [("node1", "node2", int-value), ...]; returns the edges whose value was added or changed. '''
+        return self.knowledge.update(addition)
+
     def inference(self, MSGS): 
-        client = OpenAI(api_key=OPENAI_API_KEY)
-    # seed to reproduce, should be put in the paper so the number should be normal lol
-        completion = client.chat.completions.create(
-        model=self.model,
-        messages=MSGS,
-        max_tokens=self.MAXTOKENS,
-        temperature=1,
-        seed=self.seed
-        )
-        output = completion.choices[0].message.content        
+        output = llm_client.chat(
+            self.model, MSGS, self.MAXTOKENS, temperature=1, seed=self.seed
+        )  # shared, pooled client
         return output
 
     def get_inference(self):
 
-        raw_output = self.inference(MSGS=self.msg_history)
+        raw_output = self.inference(
+            MSGS=prompt_layout.arrange(history.bounded(self.msg_history))
+        )  # last HISTORY_TURNS exchanges, PROMPT_LAYOUT order
         self.msg_history.append({"role":"assistant", "content":raw_output})
         self.recent_message = raw_output
         return raw_output
@@ -544,7 +540,7 @@ class BotInstance:
         self.msg_history.append({"role":"user", "content":new_message})
                 
 class GroundStateManager:
-    def __init__(self, BASE_PROMPT: str, MODEL: str, SEED: int, MAXTOKENS: int):
+    def __init__(self, BASE_PROMPT: str, MODEL: str, SEED: int, MAXTOKENS: int, TRUTH: dict | None = None):
         """
         A class for the LLM-based Ground State Manager (GSM), whose main job is to extract new information about the graph of "the other player".
 
@@ -552,27 +548,23 @@ class GroundStateManager:
         :param MODEL: str; the OpenAI model to be called
         :param SEED: int;
         :param MAXTOKENS:int;
+        :param TRUTH: dict; {WORLD: the board of the player in that world}, to score the extracted values (optional)
         """
         self.msg_history = [{"role": "system", "content": BASE_PROMPT}]
         self.model = MODEL  # "gpt-4o-2024-08-06"
         self.seed = SEED
         self.MAXTOKENS = MAXTOKENS
         self.previous_input = None  # the last recorded input str; for logging purposes
+        self.truth = TRUTH or {}
 
     def inference(self, input: list):
         """A function that calls the OpenAI API using the previously set parameters
 
         :return output: str; model output
         """
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        completion = client.chat.completions.create(
-            model=self.model,
-            messages=input,
-            max_tokens=self.MAXTOKENS,
-            temperature=1,
-            seed=self.seed,
-        )
-        output = completion.choices[0].message.content
+        output = llm_client.chat(
+            self.model, input, self.MAXTOKENS, temperature=1, seed=self.seed
+        )  # shared, pooled client
         return output
 
     def make_input(self, message: str, old_ws: list, loc: str, world: str):
@@ -595,13 +587,33 @@ class GroundStateManager:
         :return raw_output: str; the complete output of the LLM. format: [Thought]: ... \n [NWS]: ...\n
         """
         input = self.make_input(MESSAGE, OWS, LOC, WORLD)
-        raw_output = self.inference(input)
+        raw_output = gsm_fastpath.infer(
+            MESSAGE, OWS, LOC, WORLD, self.msg_history[0]["content"], lambda: self.inference(input), self.truth.get(WORLD)
+        )  # the LLM only reads messages the symbolic reader is not confident about (GSM_FASTPATH)
         self.previous_input = input
         self.previous_message = raw_output
 
         return raw_output
     
 
+def play_game(NODES, board, seed, logging_didalogues, logging_eval, logging_GSM, board_index, ID):
+    """Plays one game; called by game_runner, possibly next to other games."""
+    game = GAME(NODES, board, seed, logging_didalogues, logging_eval, logging_GSM, board_index, ID) # start a game instance
+    start = f"[World-state-own]: {game.boards["USER"]}\n[World-state-user]: {game.user_proxy.other_user_WS}\n[Visited]: {game.user_proxy.visited}\n[Remaining]: {game.rooms["USER"]}\n[Observation]: <START>"
+    game.log(
+        SUMMARY=[
+            game.prompt_type,
+            game.run_start,
+            game.model,
+            game.seed,
+            game.boards,
+            game.solutions,
+        ]
+    )
+    game.log(MSG=start, ROLE="USER-input")
+    game.run(start=start, TURNS=16)
+
+
 def main():
 
     NODES = 6
@@ -610,10 +622,15 @@ def main():
     n = 25
     version = "full-v10-visited-remaining-fix"
     setup = f"{NODES}nodes"
+    CONCURRENCY = 8  # games played at the same time
+
+    boards = board_store.open_boards(BOARDS_PATH)  # a boards_N.json file or a memory-mapped .boards store
+    jobs = []  # one per game, all played by game_runner once the batches are drawn
 
     for seed in [1011, 143, 9999, 8060]: # 1011 8060 9999
     # seed = 1011 # 9999 1234 8060
         run_start = datetime.now()
+        draw = Random(seed)  # the same boards for a batch seed on every run, so a recorded batch replays (LLM_CACHE_MODE)
         path = f"logs/{version}/{setup}"
         if not os.path.exists(path):
             os.makedirs(path)
@@ -622,28 +639,28 @@ def main():
         logging_eval = f"{path}/{seed}-{run_start}-eval.txt"
         logging_GSM = f"{path}/{seed}-{run_start}-GSM.txt"
 
-        with open(BOARDS_PATH, "r") as file:
-            boards = json.load(file)
-        
         for i in range(n):
         # send a random board from json file
             ID = f"{seed}-{i}"
-            board_index = str(randint(1,6))
+            board_index = str(draw.randint(1, len(boards)))
             board = boards[board_index]
-            game = GAME(NODES, board, seed, logging_didalogues, logging_eval, logging_GSM, board_index, ID) # start a game instance
-            start = f"[World-state-own]: {game.boards["USER"]}\n[World-state-user]: {game.user_proxy.other_user_WS}\n[Visited]: {game.user_proxy.visited}\n[Remaining]: {game.rooms["USER"]}\n[Observation]: <START>"
-            game.log(
-            SUMMARY=[
-                game.prompt_type,
-                game.run_start,
-                game.model,
-                game.seed,
-                game.boards,
-                game.solutions,
-            ]
-        )
-            game.log(MSG=start, ROLE="USER-input")
-            game.run(start=start, TURNS=16)
+            game_logs = (
+                (f"{path}/{seed}-{run_start}-{ID}-dialogues.txt", logging_eval, f"{path}/{seed}-{run_start}-{ID}-GSM.txt")
+                if CONCURRENCY > 1  # games played side by side get their own dialogue and GSM logs
+                else (logging_didalogues, logging_eval, logging_GSM)
+            )
+            jobs.append(partial(play_game, NODES, board, seed, *game_logs, board_index, ID))
+
+    game_runner.run_games(jobs, CONCURRENCY)
+
+    print(f"LLM calls: {llm_client.calls.summary()}")  # connect / total seconds per call over the whole run
+    print(f"LLM context: {history.context.summary()}")  # agent input tokens with the whole history vs. sent
+    if gsm_fastpath.FASTPATH:
+        print(f"GSM fast path: {gsm_fastpath.stats.summary()}")  # messages read without the LLM, accuracy by source
+    if llm_client.RPM_LIMIT or llm_client.TPM_LIMIT:
+        print(f"LLM scheduler: {llm_client.get_scheduler().summary()}")  # queue depth / wait under LLM_RPM, LLM_TPM
+    if llm_client.CACHE_MODE != "off":
+        print(f"LLM cache: {llm_client.cache_stats()}")  # responses recorded / replayed (LLM_CACHE_MODE)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
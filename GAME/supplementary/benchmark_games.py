@@ -0,0 +1,157 @@
+import argparse
+import contextlib
+import importlib
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from functools import partial
+
+import numpy as np
+
+from supplementary import board_store, game_runner, gsm_fastpath, history, llm_client, mock_llm, prompt_layout
+
+VARIANTS = ("baseline", "coin_tracking", "state_tracking", "problem_solving")
+BOARDS_DIR = os.path.join(os.path.dirname(__file__), "boards")
+
+
+def timed(job, durations: list):
+    """Runs one game job and appends its wall-clock time (seconds) to durations."""
+    start = time.perf_counter()
+    try:
+        return job()
+    finally:
+        durations.append(time.perf_counter() - start)
+
+
+def benchmark(
+    variant: str, nodes: int, games: int, concurrency: int, seed: int, boards_path: str, budget: float | None = None
+) -> dict:
+    """
+    Plays games of a self-play variant through game_runner against the endpoint llm_client is
+    configured for, and returns throughput, per-game and per-call latency and the failures.
+    Dialogue, GSM and eval logs go to a temporary directory.
+    """
+    module = importlib.import_module(f"self_play_{variant}")
+    boards = board_store.open_boards(boards_path)
+    rng = random.Random(seed)
+    logs = tempfile.mkdtemp(prefix="benchmark_games-")
+    durations = []
+    jobs = []
+    for i in range(games):
+        board_index = str(rng.randint(1, len(boards)))
+        game = partial(
+            module.play_game, nodes, boards[board_index], seed,
+            f"{logs}/{i}-dialogues.txt", f"{logs}/eval.txt", f"{logs}/{i}-GSM.txt", board_index, str(i),
+        )
+        jobs.append(partial(timed, game, durations))
+
+    llm_client.calls.reset()
+    history.context.reset()
+    gsm_fastpath.stats.reset()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # the games print every turn
+        results = game_runner.run_games(jobs, concurrency, budget)
+    elapsed = time.perf_counter() - start
+
+    failures = Counter(type(result).__name__ for result in results if isinstance(result, BaseException))
+    durations = np.array(durations)
+    return {
+        "games": games,
+        "failed": sum(failures.values()),
+        "failures": dict(failures),
+        "seconds": elapsed,
+        "games_per_second": games / elapsed,
+        "game_p50": float(np.percentile(durations, 50)),
+        "game_p95": float(np.percentile(durations, 95)),
+        "game_max": float(durations.max()),
+        "calls": llm_client.calls.summary(),
+        "context": history.context.summary(),
+        "gsm": gsm_fastpath.stats.summary(),
+        "logs": logs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test the game engine against the local mock LLM (run from GAME/: python -m supplementary.benchmark_games)."
+    )
+    parser.add_argument("--variant", choices=VARIANTS, default="problem_solving")
+    parser.add_argument("--nodes", type=int, default=6)
+    parser.add_argument("--boards", default=None, help="boards file (default: supplementary/boards/boards_N.json)")
+    parser.add_argument("--games", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, game_runner.CONCURRENCY])
+    parser.add_argument("--port", type=int, default=mock_llm.PORT)
+    parser.add_argument("--rpm", type=float, default=None, help="requests per minute for the scheduler")
+    parser.add_argument("--tpm", type=float, default=None, help="tokens per minute for the scheduler")
+    parser.add_argument("--budget", type=float, default=game_runner.GAME_BUDGET, help="seconds per game")
+    parser.add_argument("--call-timeout", type=float, default=llm_client.CALL_TIMEOUT, help="seconds per attempt")
+    parser.add_argument("--hedge", action="store_true", help="hedge calls that outlast the p95 latency")
+    parser.add_argument("--history-turns", type=int, default=history.HISTORY_TURNS, help="exchanges sent to the agents")
+    parser.add_argument("--history-summary", action="store_true", help="fold older exchanges into a summary")
+    parser.add_argument("--prompt-layout", choices=prompt_layout.LAYOUTS, default=prompt_layout.PROMPT_LAYOUT)
+    parser.add_argument("--gsm-fastpath", action="store_true", help="read GSM messages symbolically, LLM as fallback")
+    parser.add_argument("--gsm-confidence", type=float, default=gsm_fastpath.CONFIDENCE, help="fast path threshold")
+    parser.add_argument("--burst", type=float, default=llm_client.BURST_SECONDS, help="seconds of quota spent at once")
+    mock_llm.add_arguments(parser)
+    args = parser.parse_args()
+
+    mock = mock_llm.from_arguments(args)
+    server = mock_llm.serve(mock, port=args.port)
+    # the mock server ignores the key; recorded responses would bypass it
+    llm_client.configure(
+        BASE_URL=f"http://{mock_llm.HOST}:{args.port}/v1", OPENAI_API_KEY="mock", CACHE_MODE="off",
+        RPM_LIMIT=args.rpm, TPM_LIMIT=args.tpm, BURST_SECONDS=args.burst,
+        CALL_TIMEOUT=args.call_timeout, HEDGE=args.hedge,
+    )
+    history.HISTORY_TURNS, history.HISTORY_SUMMARY = args.history_turns, args.history_summary
+    prompt_layout.PROMPT_LAYOUT = args.prompt_layout
+    gsm_fastpath.FASTPATH, gsm_fastpath.CONFIDENCE = args.gsm_fastpath, args.gsm_confidence
+    boards_path = args.boards or os.path.join(BOARDS_DIR, f"boards_{args.nodes}.json")
+
+    for concurrency in args.concurrency:
+        llm_client.configure()  # a fresh scheduler (full buckets) per run
+        result = benchmark(args.variant, args.nodes, args.games, concurrency, args.seed or 0, boards_path, args.budget)
+        calls = result["calls"]
+        print(
+            f"concurrency {concurrency:>3}: {result['games'] - result['failed']}/{result['games']} games in "
+            f"{result['seconds']:.1f}s ({result['games_per_second']:.2f} games/s), "
+            f"game p50 {result['game_p50']:.2f}s p95 {result['game_p95']:.2f}s max {result['game_max']:.2f}s, "
+            f"{calls['calls']} calls p50 {calls.get('total_p50', 0) * 1000:.0f}ms "
+            f"p95 {calls.get('total_p95', 0) * 1000:.0f}ms p99 {calls.get('total_p99', 0) * 1000:.0f}ms, "
+            f"{calls.get('retries', 0)} retries, {calls.get('hedges', 0)} hedges, {calls.get('errors', 0)} errors"
+        )
+        if calls.get("prompt_tokens"):
+            print(
+                f"  prompt tokens: {calls['prompt_tokens']}, {calls['cached_tokens'] / calls['prompt_tokens']:.0%} "
+                f"served from the prefix cache"
+            )
+        context = result["context"]
+        if context["calls"]:
+            print(
+                f"  agent input: {context['full_mean']:.0f} tokens/call with the whole history, "
+                f"{context['sent_mean']:.0f} sent ({context['saved']:.0%} saved)"
+            )
+        gsm = result["gsm"]
+        if gsm["messages"]:
+            accuracy = {
+                source: "-" if gsm[source]["accuracy"] is None else f"{gsm[source]['accuracy']:.0%}"
+                for source in ("symbolic", "llm")
+            }
+            print(
+                f"  GSM: {gsm['hits']}/{gsm['messages']} messages read without the LLM ({gsm['hit_rate']:.0%}), "
+                f"values correct: symbolic {accuracy['symbolic']} of {gsm['symbolic']['triples']}, "
+                f"LLM {accuracy['llm']} of {gsm['llm']['triples']}"
+            )
+        if args.rpm or args.tpm:
+            scheduler = llm_client.get_scheduler().summary()
+            print(f"  scheduler: {scheduler}, {calls['calls'] / result['seconds'] * 60:.0f} requests/min")
+        if result["failed"]:
+            print(f"  failures: {result['failures']} (logs in {result['logs']})")
+    print(f"mock server: {mock.counts}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import json
+import random
+import time
+
+import solvers
+import tsp_utils
+
+
+def random_board(n: int, low: int = 1, high: int = 12) -> list[tuple[str, str, int]]:
+    """Generates a random complete board with n rooms, starting room L."""
+    rooms = ["L"] + [f"R{i}" for i in range(1, n)]
+    return [
+        (rooms[i], rooms[j], random.randint(low, high))
+        for i in range(n)
+        for j in range(i + 1, n)
+    ]
+
+
+def time_solver(solver, g, repeats: int) -> float:
+    """Returns the best wall-clock time (seconds) of solver over repeats runs."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        solver(g, ["L"], True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(max_nodes: int, repeats: int, budget: float) -> dict:
+    """
+    Times every available exact backend on random boards of growing size and returns the
+    calibration used by solvers.candidates: backends ordered by speed per size, and the
+    largest size each backend solved within budget seconds.
+    """
+    names = [name for name, backend in solvers.BACKENDS.items() if backend["exact"] and solvers.is_available(name)]
+    max_size = {name: None for name in names}
+    preference = {}
+
+    for n in range(4, max_nodes + 1):
+        g = tsp_utils.board_to_graph(random_board(n))
+        times = {}
+        for name in names:
+            if max_size[name] is not None:
+                continue  # already too slow on a smaller board
+            if n > (solvers.DEFAULT_MAX_SIZE[name] or n):
+                max_size[name] = n - 1  # beyond what the backend can hold
+                continue
+            times[name] = time_solver(solvers.BACKENDS[name]["solve"], g, repeats)
+            if times[name] > budget:
+                max_size[name] = n - 1
+        preference[str(n)] = sorted(times, key=times.get)
+        print(f"{n:>5} " + " ".join(f"{name}={times[name] * 1000:.2f}ms" for name in preference[str(n)]))
+
+    return {
+        # backends that never exceeded the budget keep their default limit
+        "max_size": {name: size for name, size in max_size.items() if size is not None},
+        "preference": preference,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the exhaustive TSP engines against each other.")
+    parser.add_argument("--min-nodes", type=int, default=4)
+    parser.add_argument("--max-nodes", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--calibrate", action="store_true", help=f"time all registry backends and write {solvers.CALIBRATION_PATH}"
+    )
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per solve a backend may take when calibrating")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.calibrate:
+        calibration = calibrate(args.max_nodes, args.repeats, args.budget)
+        with open(solvers.CALIBRATION_PATH, "w") as f:
+            json.dump(calibration, f, indent=4)
+        return
+
+    engines = {
+        "python": lambda g, pp, all_tours: tsp_utils.solve(g, pp, all_tours, engine="python"),
+        "vectorized": tsp_utils.solve_vectorized,
+        "dp": tsp_utils.solve_dp,
+    }
+
+    print(f"{'nodes':>5} " + " ".join(f"{name:>12}" for name in engines) + f" {'speedup':>9}")
+    for n in range(args.min_nodes, args.max_nodes + 1):
+        g = tsp_utils.board_to_graph(random_board(n))
+        tsp_utils.permutation_table(n - 1, drop_mirrors=True)  # keep table creation out of the timings
+
+        values = {name: solver(g, ["L"], False)[1] for name, solver in engines.items()}
+        if len(set(values.values())) != 1:
+            raise RuntimeError(f"Solvers disagree on {n} nodes: {values}")
+
+        times = {name: time_solver(solver, g, args.repeats) for name, solver in engines.items()}
+        print(
+            f"{n:>5} "
+            + " ".join(f"{times[name] * 1000:>10.2f}ms" for name in engines)
+            + f" {times['python'] / times['vectorized']:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
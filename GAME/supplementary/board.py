@@ -0,0 +1,105 @@
+from itertools import combinations
+
+import networkx as nx
+import numpy as np
+
+
+class Board:
+    def __init__(self, rooms: list[str], weights: np.ndarray | None = None):
+        """
+        A board backed by a symmetric integer matrix with a fixed room index. Hallways are worth at
+        least one coin, so 0 marks a hallway whose value is not known (yet).
+
+        Exposes `nodes` and `number_of_nodes()` like nx.Graph, so the solvers take a Board
+        wherever they take a graph, without converting.
+
+        :param rooms: list[str]; room labels, rooms[i] is row/column i of the matrix
+        :param weights: np.ndarray; (n, n) hallway values (default: all unknown)
+        """
+        self.rooms = list(rooms)
+        self.index = {room: i for i, room in enumerate(self.rooms)}
+        n = len(self.rooms)
+        self.weights = np.zeros((n, n), dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+
+    @classmethod
+    def from_triples(cls, board: list[tuple[str, str, int]], rooms: list[str] | None = None) -> "Board":
+        """
+        Board from [a, b, w] triples; rooms default to the order in which they first appear
+        (so the living room of the board files comes first).
+        """
+        if rooms is None:
+            rooms = list(dict.fromkeys(room for a, b, _ in board for room in (a, b)))
+        result = cls(rooms)
+        for a, b, w in board:
+            result.set(a, b, w)
+        return result
+
+    @classmethod
+    def from_graph(cls, g: nx.Graph) -> "Board":
+        rooms = list(g.nodes)
+        return cls(rooms, nx.to_numpy_array(g, nodelist=rooms, weight="weight", dtype=np.int64))
+
+    def copy(self) -> "Board":
+        return Board(self.rooms, self.weights.copy())
+
+    @property
+    def nodes(self) -> list[str]:
+        return self.rooms
+
+    def number_of_nodes(self) -> int:
+        return len(self.rooms)
+
+    def get(self, a: str, b: str) -> int:
+        """Value of the a-b hallway (0 if unknown), in either orientation."""
+        return int(self.weights[self.index[a], self.index[b]])
+
+    def set(self, a: str, b: str, w: int):
+        i, j = self.index[a], self.index[b]
+        self.weights[i, j] = self.weights[j, i] = int(w)
+
+    def add(self, a: str, b: str, w: int):
+        i, j = self.index[a], self.index[b]
+        self.weights[i, j] += int(w)
+        self.weights[j, i] = self.weights[i, j]
+
+    def __add__(self, other: "Board") -> "Board":
+        """Summed board (e.g. BOT + USER); other is re-indexed if its rooms are in a different order."""
+        order = [other.index[room] for room in self.rooms]
+        return Board(self.rooms, self.weights + other.weights[np.ix_(order, order)])
+
+    def is_complete(self) -> bool:
+        off_diagonal = ~np.eye(len(self.rooms), dtype=bool)
+        return bool((self.weights[off_diagonal] != 0).all())
+
+    def validate(self):
+        """Same checks as tsp_utils.validate_graph: every hallway known, and every value positive."""
+        off_diagonal = self.weights[~np.eye(len(self.rooms), dtype=bool)]
+        if (off_diagonal == 0).any():
+            raise ValueError("Graph must be complete")
+        if (off_diagonal < 0).any():
+            raise ValueError("Edge weights must be positive")
+
+    def path_coins(self, path: list[str]) -> int:
+        """Coins collected along path (a list of rooms), in a single vectorized lookup."""
+        indices = [self.index[room] for room in path]
+        return int(self.weights[indices[:-1], indices[1:]].sum())
+
+    def triples(self) -> list[list]:
+        """[a, b, w] triples of the known hallways, one per room pair in room order (the board file format)."""
+        rows = self.weights.tolist()
+        return [[a, b, rows[i][j]] for (i, a), (j, b) in combinations(enumerate(self.rooms), 2) if rows[i][j]]
+
+    def params(self) -> dict:
+        """Hallway values keyed "node1node2" (e.g. "LE"), as taken by the prompt templates."""
+        rows = self.weights.tolist()
+        return {f"{a}{b}": rows[i][j] or None for (i, a), (j, b) in combinations(enumerate(self.rooms), 2)}
+
+    def prompt_text(self) -> str:
+        """The board as it is shown in [World-state-own] (the str of its triples)."""
+        return str(self.triples())
+
+    def to_graph(self) -> nx.Graph:
+        graph = nx.Graph()
+        graph.add_nodes_from(self.rooms)
+        graph.add_weighted_edges_from((a, b, w) for a, b, w in self.triples())
+        return graph
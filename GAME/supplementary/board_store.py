@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+try:
+    from supplementary import canonical, prefix_tables
+except ImportError:  # run as a script from inside supplementary/
+    import canonical
+    import prefix_tables
+
+MAGIC = b"TSPBOARDS\x01"
+STORE_SUFFIX = ".boards"
+ALIGNMENT = 64  # every array starts on a 64-byte boundary, so np.memmap views are aligned
+
+
+class BoardStore:
+    """
+    Read-only, memory-mapped store of BOT/USER boards with a fixed room index. The file holds a
+    JSON header (rooms, board IDs, array layout) followed by fixed-width arrays:
+
+        weights       int16 [count, 2, n, n]  BOT (0) and USER (1) weight matrices
+        optimum       int32 [count]           coins of the optimal tour, -1 if unknown
+        tour_offsets  int64 [count + 1]       row range of each board's optimal tours in tours
+        tours         int8  [T, n]            optimal tours as room indices (without the closing L)
+
+    Worker processes opening the same file share its pages through the OS page cache, and
+    reading a board never parses more than its own rows.
+
+    :param path: str; path of the .boards file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a board store")
+            header_length = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+            header = json.loads(f.read(header_length))
+
+        self.rooms = header["rooms"]
+        self.room_index = {room: i for i, room in enumerate(self.rooms)}
+        self.count = header["count"]
+        # boards_N.json files number their boards "1", "2", ...; then the ID is the row and no ID index is stored
+        self.sequential = header["ids"] is None
+        self.row_index = None if self.sequential else {board_id: row for row, board_id in enumerate(header["ids"])}
+        self.arrays = {
+            name: np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=tuple(shape))
+            for name, (dtype, shape, offset) in header["arrays"].items()
+            if np.prod(shape) > 0  # np.memmap cannot map empty arrays
+        }
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, board_id: str) -> bool:
+        try:
+            self.row(board_id)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, board_id: str) -> dict:
+        """The board in the boards_N.json format: BOT/USER [a, b, w] triples and OPTIMAL."""
+        row = self.row(board_id)
+        setup = {role: matrix_to_triples(self.arrays["weights"][row, i], self.rooms) for i, role in enumerate(("BOT", "USER"))}
+        optimal = self.optimal(board_id)
+        if optimal is not None:
+            setup["OPTIMAL"] = optimal
+        return setup
+
+    def keys(self) -> list[str]:
+        return [str(row + 1) for row in range(self.count)] if self.sequential else list(self.row_index)
+
+    def row(self, board_id: str) -> int:
+        """Row of a board in the arrays: O(1), from the ID itself or the ID index."""
+        if self.sequential:
+            row = int(board_id) - 1 if str(board_id).isdigit() else -1
+            if not 0 <= row < self.count:
+                raise KeyError(board_id)
+            return row
+        return self.row_index[board_id]
+
+    def matrices(self, board_id: str) -> tuple[np.ndarray, np.ndarray]:
+        """BOT and USER weight matrices (read-only views into the mapped file), rows/columns in self.rooms order."""
+        weights = self.arrays["weights"][self.row(board_id)]
+        return weights[0], weights[1]
+
+    def summed(self, board_id: str) -> np.ndarray:
+        """Weight matrix of the summed BOT+USER board."""
+        bot, user = self.matrices(board_id)
+        return bot.astype(np.int64) + user
+
+    def optimal(self, board_id: str) -> list | None:
+        """OPTIMAL list of a board (closed tours + [coins]), None if the store has no solution for it."""
+        row = self.row(board_id)
+        coins = int(self.arrays["optimum"][row])
+        if coins < 0:
+            return None
+        start, end = self.arrays["tour_offsets"][row : row + 2]
+        tours = [[self.rooms[i] for i in tour] for tour in self.arrays["tours"][start:end]]
+        return [tour + [tour[0]] for tour in tours] + [coins]
+
+
+def matrix_to_triples(weights: np.ndarray, rooms: list[str]) -> list[list]:
+    """[a, b, w] triples of a weight matrix, one per room pair in room order (as in the board files)."""
+    rows = weights.tolist()
+    return [[rooms[i], rooms[j], rows[i][j]] for i in range(len(rooms)) for j in range(i + 1, len(rooms))]
+
+
+def board_matrix(board: list[tuple[str, str, int]], room_index: dict) -> np.ndarray:
+    """Symmetric weight matrix of a board given as [a, b, w] triples."""
+    weights = np.zeros((len(room_index), len(room_index)), dtype=np.int16)
+    for a, b, w in board:
+        weights[room_index[a], room_index[b]] = w
+        weights[room_index[b], room_index[a]] = w
+    return weights
+
+
+def write_store(path: str, boards: dict):
+    """
+    Writes boards (board ID -> boards_N.json entry) to a .boards file. All boards must have the
+    same rooms; fields other than BOT, USER and OPTIMAL (e.g. DIFFICULTY) are not stored.
+    """
+    first = next(iter(boards.values()))
+    rooms = prefix_tables.board_rooms(first["BOT"])
+    room_index = {room: i for i, room in enumerate(rooms)}
+    n, count = len(rooms), len(boards)
+
+    weights = np.zeros((count, 2, n, n), dtype=np.int16)
+    optimum = np.full(count, -1, dtype=np.int32)
+    tour_offsets = np.zeros(count + 1, dtype=np.int64)
+    tours = []
+    for row, setup in enumerate(boards.values()):
+        if set(prefix_tables.board_rooms(setup["BOT"])) != set(rooms):
+            raise ValueError(f"All boards in a store need the rooms {rooms}")
+        weights[row, 0] = board_matrix(setup["BOT"], room_index)
+        weights[row, 1] = board_matrix(setup["USER"], room_index)
+        if setup.get("OPTIMAL"):
+            optimum[row] = setup["OPTIMAL"][-1]
+            tours += [[room_index[room] for room in tour[:-1]] for tour in setup["OPTIMAL"][:-1]]
+        tour_offsets[row + 1] = len(tours)
+    tours = np.array(tours, dtype=np.int8).reshape(-1, n)
+
+    ids = list(boards)
+    arrays = {"weights": weights, "optimum": optimum, "tour_offsets": tour_offsets, "tours": tours}
+    header = {
+        "rooms": rooms,
+        "count": count,
+        "ids": None if ids == [str(i + 1) for i in range(count)] else ids,
+        "arrays": {},
+    }
+
+    # offsets depend on the header length, which depends on the offsets: lay out with a placeholder first
+    def layout(header_length: int) -> int:
+        offset = len(MAGIC) + 8 + header_length
+        for name, array in arrays.items():
+            offset += -offset % ALIGNMENT
+            header["arrays"][name] = [array.dtype.str, list(array.shape), offset]
+            offset += array.nbytes
+        return len(json.dumps(header).encode())
+
+    header_length = layout(0)
+    while layout(header_length) != header_length:
+        header_length = layout(header_length)
+    encoded = json.dumps(header).encode()
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + np.array([len(encoded)], dtype="<u8").tobytes() + encoded)
+        for name, array in arrays.items():
+            f.write(b"\0" * (header["arrays"][name][2] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)  # readers never see a half-written store
+
+
+def read_boards(path: str) -> dict:
+    """Boards from a boards_N.json dict or a JSONL file with one {"id": ..., "BOT": ..., "USER": ...} per line."""
+    if path.endswith(".jsonl"):
+        boards = {}
+        with open(path) as f:
+            for line_number, line in enumerate(f):
+                if line.strip():
+                    setup = json.loads(line)
+                    boards[str(setup.pop("id", line_number + 1))] = setup
+        return boards
+    with open(path) as f:
+        return json.load(f)
+
+
+def open_boards(path: str):
+    """
+    The boards the games draw from: a BoardStore for .boards files, otherwise the parsed JSON dict.
+    Both map board ID -> {"BOT": ..., "USER": ..., "OPTIMAL": ...}.
+    """
+    if path.endswith(STORE_SUFFIX):
+        return BoardStore(path)
+    return read_boards(path)
+
+
+def unique_boards(boards: dict) -> dict:
+    """Drops every board that is a relabelling of the non-start rooms of an earlier one (canonical.board_hash)."""
+    seen = set()
+    return {
+        board_id: setup
+        for board_id, setup in boards.items()
+        if (digest := canonical.board_hash(setup)[0]) not in seen and not seen.add(digest)
+    }
+
+
+def from_json(json_path: str, store_path: str | None = None, dedup: bool = False) -> str:
+    """Converts a boards_N.json (or .jsonl) file into a .boards store next to it, optionally without isomorphic boards."""
+    store_path = store_path or os.path.splitext(json_path)[0] + STORE_SUFFIX
+    boards = read_boards(json_path)
+    write_store(store_path, unique_boards(boards) if dedup else boards)
+    return store_path
+
+
+def to_json(store_path: str, json_path: str) -> str:
+    """Converts a .boards store back into a boards_N.json dict."""
+    from solve_boards import write_boards_json  # script-only dependency
+
+    store = BoardStore(store_path)
+    write_boards_json(json_path, {board_id: store[board_id] for board_id in store.keys()})
+    return json_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert board files to and from the binary board store.")
+    parser.add_argument("file", help="boards_N.json / .jsonl file, or a .boards store with --to-json")
+    parser.add_argument("--output", default=None, help="converted file (default: .boards next to the input)")
+    parser.add_argument("--to-json", action="store_true", help="convert a .boards store back to JSON")
+    parser.add_argument("--dedup", action="store_true", help="skip boards that only relabel an earlier board's rooms")
+    args = parser.parse_args()
+
+    if args.to_json:
+        if args.output is None:
+            parser.error("--to-json needs --output (the JSON file may hold fields the store drops)")
+        converted = to_json(args.file, args.output)
+    else:
+        converted = from_json(args.file, args.output, args.dedup)
+    print(f"{args.file} -> {converted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import hashlib
+import json
+
+import numpy as np
+
+try:
+    from supplementary import prefix_tables
+except ImportError:  # run as a script from inside supplementary/
+    import prefix_tables
+
+
+def refine(codes: np.ndarray, colors: list[int]) -> list[int]:
+    """
+    Colour refinement: splits rooms of equal colour by the multiset of (colour, hallway code) pairs
+    to the other rooms, until no colour splits further. Colours are ranks of label-independent
+    signatures that start with the old colour, so the order of existing colours is kept.
+    """
+    n = len(colors)
+    while True:
+        signatures = [
+            (colors[v], tuple(sorted((colors[u], int(codes[v, u])) for u in range(n) if u != v)))
+            for v in range(n)
+        ]
+        ranks = sorted(set(signatures))
+        refined = [ranks.index(signature) for signature in signatures]
+        if len(set(refined)) == len(set(colors)):
+            return refined
+        colors = refined
+
+
+MAX_LEAVES = 20_000  # leaves of the search tree visited before canonical_order gives up on a canonical form
+
+
+class SearchBudget(Exception):
+    pass
+
+
+def automorphism(order: list[int], other: list[int]) -> list[int]:
+    """The room permutation taking the leaf order to the leaf other, which yield the same matrix."""
+    mapping = [0] * len(order)
+    for v, u in zip(order, other):
+        mapping[v] = u
+    return mapping
+
+
+def orbits(generators: list[list[int]], path: list[int], n: int) -> list[int]:
+    """Orbit representative of each room under the found automorphisms that fix every room of path."""
+    parent = list(range(n))
+
+    def find(v: int) -> int:
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for mapping in generators:
+        if all(mapping[v] == v for v in path):
+            for v, u in enumerate(mapping):
+                parent[find(v)] = find(u)
+    return [find(v) for v in range(n)]
+
+
+def canonical_order(codes: np.ndarray, fixed: int = 1, max_leaves: int = MAX_LEAVES) -> list[int]:
+    """
+    Canonical room order of a symmetric matrix of hallway codes, with the first `fixed` rooms kept in
+    place (the start room, or a visited prefix). Any relabelling of the other rooms yields the same
+    permuted matrix codes[order][:, order]. Individualization-refinement: refine colours, and while
+    a colour class has several rooms, try each of them first and keep the smallest resulting matrix.
+
+    Leaves with the same matrix as the first or best leaf give automorphisms: the search then backs
+    up to where the two paths part (that subtree repeats an explored one), and skips rooms in the
+    orbit of an explored sibling, so symmetric boards (uniform or mostly unknown weights) stay cheap.
+    Past max_leaves leaves the refined order is returned as is; it is a valid order but not canonical,
+    so relabelled boards may then get different keys.
+    """
+    n = len(codes)
+    colors = refine(codes, [min(i, fixed) for i in range(n)])
+    first = best = None  # (matrix, order, path) of the first and of the smallest leaf
+    generators = []
+    leaves = 0
+
+    def search(colors: list[int], path: list[int]) -> int | None:
+        """Explores the subtree; returns the depth to back up to when it found an automorphism."""
+        nonlocal first, best, leaves
+        if len(set(colors)) == n:
+            leaves += 1
+            order = sorted(range(n), key=lambda v: colors[v])
+            matrix = codes[np.ix_(order, order)].tobytes()
+            if first is None:
+                first = best = (matrix, order, path)
+                return None
+            for leaf in (first, best):
+                if matrix == leaf[0]:
+                    generators.append(automorphism(leaf[1], order))
+                    return next((i for i, (a, b) in enumerate(zip(path, leaf[2])) if a != b), len(path))
+            if matrix < best[0]:
+                best = (matrix, order, path)
+            return None
+        if leaves >= max_leaves:
+            raise SearchBudget
+        cell = min(c for c in set(colors) if colors.count(c) > 1)
+        explored = []
+        for v in [v for v in range(n) if colors[v] == cell]:
+            if explored and generators:
+                orbit = orbits(generators, path, n)
+                if any(orbit[v] == orbit[u] for u in explored):
+                    continue  # an automorphism fixing path maps an explored sibling to v
+            explored.append(v)
+            # v goes first within its class; the other rooms of the class follow
+            individualized = [2 * c + (c == cell and u != v) for u, c in enumerate(colors)]
+            back = search(refine(codes, individualized), path + [v])
+            if back is not None and back < len(path):
+                return back
+        return None
+
+    try:
+        search(colors, [])
+    except SearchBudget:
+        return sorted(range(n), key=lambda v: (colors[v], v))
+    return best[1]
+
+
+def board_codes(setup: dict, rooms: list[str]) -> np.ndarray:
+    """One code per hallway that combines its BOT and USER value, so relabelling keeps the pairs together."""
+    index = {room: i for i, room in enumerate(rooms)}
+    codes = np.zeros((len(rooms), len(rooms)), dtype=np.int64)
+    for role, shift in (("BOT", 16), ("USER", 0)):
+        for a, b, w in setup[role]:
+            codes[index[a], index[b]] += int(w) << shift
+            codes[index[b], index[a]] += int(w) << shift
+    return codes
+
+
+def canonical_board(setup: dict, start_node: str = "L") -> tuple[dict, dict]:
+    """
+    Canonical form of a BOT/USER board pair under relabelling of the non-start rooms: boards that
+    differ only by such a relabelling have the same canonical form. The canonical board uses the
+    start room followed by the other room labels in sorted order.
+
+    :return canonical: {"BOT": [...], "USER": [...]} triples in canonical room order
+    :return relabel: dict mapping each original room to its canonical label
+    """
+    rooms = prefix_tables.board_rooms(setup["BOT"], start_node)
+    codes = board_codes(setup, rooms)
+    order = canonical_order(codes)
+    labels = [start_node] + sorted(rooms[1:])
+    relabel = {rooms[v]: labels[i] for i, v in enumerate(order)}
+
+    canonical = {
+        role: [
+            [labels[i], labels[j], int(codes[order[i], order[j]] >> shift & 0xFFFF)]
+            for i in range(len(labels))
+            for j in range(i + 1, len(labels))
+        ]
+        for role, shift in (("BOT", 16), ("USER", 0))
+    }
+    return canonical, relabel
+
+
+def board_hash(setup: dict, start_node: str = "L") -> tuple[str, dict]:
+    """Hash of the canonical form (equal for boards that are relabellings of each other) and the relabel map."""
+    canonical, relabel = canonical_board(setup, start_node)
+    return hashlib.sha256(json.dumps([canonical["BOT"], canonical["USER"]]).encode()).hexdigest(), relabel
+
+
+def relabel_tour(tour: list[str], relabel: dict) -> list[str]:
+    """A tour with every room replaced through relabel (use invert(relabel) to map back)."""
+    return [relabel[room] for room in tour]
+
+
+def invert(relabel: dict) -> dict:
+    return {new: old for old, new in relabel.items()}
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from supplementary import llm_client, rate_limiter
+except ImportError:  # run as a script from inside supplementary/
+    import llm_client
+    import rate_limiter
+
+# games played at the same time by default
+CONCURRENCY = 8
+
+# held while a game appends its evaluation to the eval log, which all games of a batch share
+EVAL_LOG_LOCK = threading.Lock()
+
+# seconds of wall-clock time per game; a game past it ends at its next LLM call (llm_client.GameTimeout)
+GAME_BUDGET = 1800.0
+
+
+def play(game: int, job, budget: float | None = GAME_BUDGET):
+    """Runs one job as game number `game` (so the scheduler can queue its calls fairly) within budget seconds."""
+    rate_limiter.current_game.set(game)
+    llm_client.set_budget(budget)
+    return job()
+
+
+async def run_games_async(jobs: list, concurrency: int = CONCURRENCY, budget: float | None = GAME_BUDGET) -> list:
+    """
+    Plays games concurrently. Each job is a callable that plays one game (builds the GAME and runs
+    its turn loop) and is run on one of `concurrency` executor threads, so its CPU-bound work
+    (parsing, IBP solves) never blocks the event loop. Every LLM call a game makes is handed to
+    this loop (llm_client.attach_loop) and awaited there without blocking, so up to `concurrency`
+    calls are in flight at once and wall-clock time scales with games / concurrency. A game that
+    raises (or runs out of its budget) ends on its own; the others keep playing.
+
+    :return results: list; per job its return value, or the exception that ended it
+    """
+    loop = asyncio.get_running_loop()
+    llm_client.attach_loop(loop)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="game")
+    try:
+        return await asyncio.gather(
+            *(loop.run_in_executor(executor, play, i, job, budget) for i, job in enumerate(jobs)), return_exceptions=True
+        )
+    finally:
+        executor.shutdown(wait=False)
+        await llm_client.detach_loop()
+
+
+def run_games(jobs: list, concurrency: int = CONCURRENCY, budget: float | None = GAME_BUDGET) -> list:
+    """Runs run_games_async in a new event loop; failed games are reported and do not stop the others."""
+    start = time.perf_counter()
+    results = asyncio.run(run_games_async(jobs, concurrency, budget))
+    failed = [(i, result) for i, result in enumerate(results) if isinstance(result, BaseException)]
+    for i, error in failed:
+        if isinstance(error, llm_client.GameTimeout):
+            print(f"game {i} stopped: {error}")
+        else:
+            print(f"game {i} failed:\n{''.join(traceback.format_exception(error))}")
+    print(
+        f"played {len(jobs) - len(failed)}/{len(jobs)} games in {time.perf_counter() - start:.1f}s "
+        f"({concurrency} at a time)"
+    )
+    return results
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import canonical
+import kbest
+import profiler
+import solve_boards
+import tsp_utils
+
+# room labels in the order the hand-made boards list them; larger boards continue with R7, R8, ...
+ROOM_LABELS = ["L", "E", "B", "K", "C", "A"]
+
+
+def room_labels(n: int) -> list[str]:
+    """Labels of an n-room board, starting with the living room L."""
+    return ROOM_LABELS[:n] + [f"R{i + 1}" for i in range(len(ROOM_LABELS), n)]
+
+
+def random_board(rng: np.random.Generator, n: int, low: int, high: int) -> dict:
+    """A BOT/USER board pair on n rooms, every hallway worth a uniform low..high coins to each player."""
+    rooms = room_labels(n)
+    edges = [(a, b) for i, a in enumerate(rooms) for b in rooms[i + 1 :]]
+    return {
+        role: [[a, b, int(w)] for (a, b), w in zip(edges, rng.integers(low, high + 1, len(edges)))]
+        for role in ("BOT", "USER")
+    }
+
+
+def check_board(setup: dict, unique: bool, min_gap: int) -> list | None:
+    """
+    Whether a board meets the difficulty targets: a single optimal tour (up to direction) and/or
+    at least min_gap coins between the optimum and the second-best tour value. Returns the
+    OPTIMAL list (closed tours + [coins]) of an accepted board, None otherwise.
+    """
+    total = {}
+    for a, b, w in setup["BOT"] + setup["USER"]:
+        total[(a, b)] = total.get((a, b), 0) + w
+    g = tsp_utils.board_to_graph([(a, b, w) for (a, b), w in total.items()])
+
+    # every tour within min_gap - 1 coins of the optimum; any that is not optimal breaks the gap
+    near = kbest.k_best_tours(g, k=None, epsilon=max(min_gap - 1, 0))
+    optimum = near[0][1]
+    tours = [tour for tour, coins in near if coins == optimum]
+    if len(tours) < len(near):
+        return None
+    if unique and len(tours) > 2:  # a tour and its mirror image
+        return None
+    return [tour + [tour[0]] for tour in tours] + [optimum]
+
+
+def sample_batch(task: tuple) -> tuple[int, list[tuple[str, dict]]]:
+    """
+    Worker: draws batch_size random boards from the batch's own seed and keeps the ones that meet
+    the targets. Returns the batch index and the accepted boards with their canonical hashes.
+    """
+    batch, seed, n, batch_size, low, high, unique, min_gap = task
+    rng = np.random.default_rng([seed, batch])
+    accepted = []
+    for _ in range(batch_size):
+        setup = random_board(rng, n, low, high)
+        optimal = check_board(setup, unique, min_gap)
+        if optimal is None:
+            continue
+        setup["OPTIMAL"] = optimal
+        if n <= profiler.MAX_PROFILE_NODES:
+            setup["DIFFICULTY"] = profiler.profile_board(setup)
+        accepted.append((canonical.board_hash(setup)[0], setup))
+    return batch, accepted
+
+
+def read_output(output: str) -> tuple[set[str], int, int]:
+    """Hashes, count and next batch index of the boards already generated into output (for resuming)."""
+    hashes, next_batch = set(), 0
+    for setup in solve_boards.read_results(output):  # without a truncated last line of an interrupted run
+        hashes.add(canonical.board_hash(setup)[0])
+        next_batch = max(next_batch, setup["batch"] + 1)
+    return hashes, len(hashes), next_batch
+
+
+def generate(
+    n: int,
+    count: int,
+    output: str,
+    workers: int,
+    batch_size: int = 50,
+    seed: int = 0,
+    low: int = 1,
+    high: int = 6,
+    unique: bool = False,
+    min_gap: int = 0,
+) -> tuple[int, int]:
+    """
+    Rejection-samples boards across a process pool until output holds count boards meeting the
+    targets, appending each accepted board as one JSON line as soon as its batch finishes.
+    Boards already in output are kept, so an interrupted run resumes where it stopped.
+    Returns the number of boards drawn and accepted in this run.
+    """
+    hashes, total, batch = read_output(output)
+    drawn = accepted = 0
+    with solve_boards.open_for_append(output) as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while total < count:
+            while len(pending) < 2 * workers:  # keep every worker busy without running far ahead
+                task = (batch, seed, n, batch_size, low, high, unique, min_gap)
+                pending.add(pool.submit(sample_batch, task))
+                batch += 1
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch_index, boards = future.result()
+                drawn += batch_size
+                for digest, setup in boards:
+                    if total >= count or digest in hashes:  # also drops relabellings of an accepted board
+                        continue
+                    hashes.add(digest)
+                    total += 1
+                    accepted += 1
+                    out.write(json.dumps({"id": str(total), "batch": batch_index, **setup}) + "\n")
+            out.flush()
+        for future in pending:
+            future.cancel()
+    return drawn, accepted
+
+
+def write_json(output: str, path: str):
+    """Converts the generated JSONL file into a boards_N.json dict keyed by board ID, as read by the games."""
+    boards = {}
+    for setup in solve_boards.read_results(output):
+        board_id = setup.pop("id")
+        setup.pop("batch")
+        boards[board_id] = setup
+    solve_boards.write_boards_json(path, boards)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate random boards that meet difficulty targets.")
+    parser.add_argument("--nodes", type=int, default=6, help="rooms per board")
+    parser.add_argument("--count", type=int, default=1000, help="boards to generate")
+    parser.add_argument("--output", default=None, help="JSONL file (default: boards/generated_N.jsonl)")
+    parser.add_argument("--json", default=None, help="also write the boards as a boards_N.json dict")
+    parser.add_argument("--low", type=int, default=1, help="smallest hallway value per player")
+    parser.add_argument("--high", type=int, default=6, help="largest hallway value per player")
+    parser.add_argument("--unique", action="store_true", help="require a single optimal tour (up to direction)")
+    parser.add_argument("--min-gap", type=int, default=0, help="coins between optimum and second-best tour")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=50, help="boards drawn per worker task")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(solve_boards.BOARDS_DIR, f"generated_{args.nodes}.jsonl")
+    drawn, accepted = generate(
+        args.nodes, args.count, output, args.workers, args.batch_size, args.seed,
+        args.low, args.high, args.unique, args.min_gap,
+    )
+    rate = accepted / drawn if drawn else 0.0
+    print(f"accepted {accepted} of {drawn} boards ({rate:.1%}) -> {output}")
+
+    if args.json:
+        write_json(output, args.json)
+        print(f"wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
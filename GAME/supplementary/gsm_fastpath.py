@@ -0,0 +1,239 @@
+import ast
+import json
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Callable
+
+try:
+    from supplementary.board import Board
+except ImportError:  # run as a script from inside supplementary/
+    from board import Board
+
+# read the GSM's [Message] with the rules below and only call the LLM when the reading is not confident
+# enough; e.g. GSM_FASTPATH=1
+FASTPATH = os.environ.get("GSM_FASTPATH") == "1"
+# share of the message's coin amounts that must be resolved to a hallway; below it the LLM reads the message.
+# Anything under 1 accepts partial readings (fewer calls, the unresolved amounts are lost). e.g. GSM_FASTPATH_CONFIDENCE=0.8
+CONFIDENCE = float(os.environ.get("GSM_FASTPATH_CONFIDENCE", 1.0))
+
+NUMBERS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17,
+    "eighteen": 18, "nineteen": 19, "twenty": 20,
+}
+# a number word only counts as an amount in front of these ("one to the attic", not "this one")
+AMOUNT_CONTEXT = r"(?=(?:\s+(?:more|extra|light|ghost))?\s+(?:coins?|to|going|heading|between|from|on|for)\b)"
+NOT_COINS = r"(?!\s*(?:rooms?|players?|turns?|steps?|moves?|nodes?|hallways?|%))"  # "6 rooms", "2 players", ...
+# a clause with one of these talks about the partner's or both players' coins, which are not the speaker's board
+AMBIGUOUS = r"\b(?:you|your|yours|total|totals|sum|together|combined|joint|both|altogether|overall)\b"
+OTHER_WORLD = {"LIGHT": "ghost", "GHOST": "light"}
+SENTENCE_SEPARATOR = r"[.!?]+(?:\s+|$)"
+CLAUSE_SEPARATOR = r"[,;]\s+|\s+(?:and|but|while|whereas|then|plus)\s+"
+# a route told step by step ("first ..., then 2 to the attic", "from there 5 to the kitchen"): after such a word
+# the next amount may start from the room just reached rather than from where the speaker is
+CHAIN = r"\b(?:then|there|next|first|after that|afterwards|from here)\b"
+MOVE = r"\b(?:go|going|move|moving|head|heading|return|returning|walk|walking)\s+(?:back\s+)?to\s+@([a-z])\b(?!~)"
+
+
+@lru_cache(maxsize=8)
+def lexicon_from_prompt(prompt: str) -> tuple[dict, tuple]:
+    """
+    Room names of a get_current_ws prompt ("a dark, spooky bathroom (B)", "the kitchen (K)", ...):
+    {alias: room} with the description, the description cut before " with ", and its last one or
+    two words ("spooky bathroom", "bathroom"), without aliases that name two rooms or only "room";
+    and the room codes.
+    """
+    found = {}
+    for description, room in re.findall(r"\b(?:an?|the) ([\w' ,-]{1,40}?) \(([A-Z])\)", prompt):
+        description = description.lower()
+        short = description.split(" with ")[0]
+        words = short.split()
+        for alias in {description, short, " ".join(words[-2:]), words[-1]}:
+            if alias != "room":
+                found.setdefault(alias, set()).add(room)
+    lexicon = {alias: rooms.pop() for alias, rooms in found.items() if len(rooms) == 1}
+    return lexicon, tuple(sorted(set(lexicon.values())))
+
+
+def normalize(message: str, lexicon: dict, codes: tuple) -> str:
+    """
+    The lower-cased message with every room named as @x and every hallway named as @x~@y
+    ("L-B", "between EC", "between the living room and the attic", "from the kitchen to the attic"),
+    and amounts written as digits.
+    """
+    code = f"[{''.join(codes)}]"
+    text = re.sub(rf"\b({code})\s*[-–/]\s*({code})\b", r"@\1~@\2", message)  # L-B, E/C
+    text = re.sub(rf"\bbetween ({code}) and ({code})\b", r"@\1~@\2", text)
+    text = re.sub(rf"\b(?:between )?({code})({code})\b", r"@\1~@\2", text)  # between EC, the LB hallway
+    text = text.lower()
+    if lexicon:
+        aliases = "|".join(re.escape(alias) for alias in sorted(lexicon, key=len, reverse=True))
+        text = re.sub(
+            rf"\b(?:the |a |an |our |my |your |their )?({aliases})\b",
+            lambda match: "@" + lexicon[match.group(1)].lower(),
+            text,
+        )
+    text = re.sub(r"\bbetween @([a-z]) and @([a-z])\b", r"@\1~@\2", text)
+    text = re.sub(r"\bfrom @([a-z])\s+(?:\w+\s+){0,3}?to @([a-z])\b", r"@\1~@\2", text)
+    text = re.sub(r"@([a-z])\s*[-–]\s*@([a-z])\b", r"@\1~@\2", text)
+    text = re.sub(r"\b(?:a single|a) coin\b", "1 coin", text)
+    return re.sub(
+        rf"\b({'|'.join(NUMBERS)})\b{AMOUNT_CONTEXT}", lambda match: str(NUMBERS[match.group(1)]), text
+    )
+
+
+def extract(message: str, ows: list, loc: str | None, world: str, lexicon: dict, codes: tuple) -> tuple[list, float]:
+    """
+    The hallway values the speaker reports about their own board, read clause by clause: a clause
+    with one amount and one hallway, or one amount and one room (the other end being the last room
+    the message speaks "from"/"in", else [Loc]). Amounts in sentences about the partner ("you"),
+    sums or the other world's coins, amounts with no single hallway, and amounts that may continue
+    a route from the room last reached ("then", "from there"), are unresolved.
+
+    :param ows: list; the known hallways, which are not repeated with the same value
+    :param loc: str; the speaker's room (None if the game does not track it)
+    :return nws, confidence: list, float; [[a, b, w], ...] and the share of the amounts resolved
+    """
+    text = normalize(message, lexicon, codes)
+    origin = loc
+    reached = None  # the room the last resolved amount went to
+    values, amounts, unresolved = {}, 0, 0
+    for sentence in re.split(SENTENCE_SEPARATOR, text):
+        ambiguous = False  # once a sentence is about the partner or a sum, so is the rest of it
+        parts = re.split(f"({CLAUSE_SEPARATOR})", sentence)
+        for separator, clause in zip([""] + parts[1::2], parts[0::2]):
+            numbers = re.findall(rf"\b(\d+)\b{NOT_COINS}", clause)
+            pairs = re.findall(r"@([a-z])~@([a-z])", clause)
+            rooms = list(dict.fromkeys(re.findall(r"@([a-z])\b(?!~)", re.sub(r"@[a-z]~@[a-z]", "", clause))))
+            anchor = re.search(r"\b(?:from|in|at|leaving)\s+@([a-z])\b(?!~)", clause)
+            move = re.search(MOVE, clause)
+            chain = re.search(CHAIN, separator + clause)
+            if chain and reached is not None:
+                origin = None  # "..., then 2 to the attic": from the speaker's room or from the last one named?
+            if anchor:  # "from the kitchen, I get 3 to the attic"
+                origin = anchor.group(1).upper()
+                rooms.remove(anchor.group(1))
+            elif not numbers and move and move.group(1).upper() != origin:
+                origin = None  # "let's go to the kitchen, I get 3 to the attic": from here or from the kitchen?
+            ambiguous = ambiguous or bool(
+                re.search(AMBIGUOUS, clause) or re.search(rf"\b{OTHER_WORLD.get(world, '_')}\b", clause)
+            )
+            if not numbers:
+                continue
+            amounts += len(numbers)
+            if len(numbers) > 1 or ambiguous:
+                unresolved += len(numbers)
+                continue
+            if len(pairs) == 1 and not rooms:
+                a, b = (room.upper() for room in pairs[0])
+            elif not pairs and len(rooms) == 1 and origin:
+                a, b = origin, rooms[0].upper()
+            else:
+                unresolved += 1
+                continue
+            reached = b
+            if chain:  # "10 if we go to the kitchen first, ...": the route goes on from b
+                origin = None
+            key = frozenset((a, b))
+            if a == b or values.get(key, (a, b, int(numbers[0])))[2] != int(numbers[0]):
+                unresolved += 1 + (key in values)  # one hallway, two values
+                values.pop(key, None)
+                continue
+            values[key] = (a, b, int(numbers[0]))
+
+    if not amounts:
+        return [], 1.0
+    known = {frozenset((a, b)): int(w) for a, b, w in ows}
+    nws = [[a, b, w] for key, (a, b, w) in values.items() if known.get(key) != w]
+    return nws, (amounts - unresolved) / amounts
+
+
+def parse_nws(raw_output: str) -> list | None:
+    """The [NWS] list of a GSM output, cleaned the way the games clean it (None if it does not parse)."""
+    match = re.search(r"\[NWS\]:?(.*)", raw_output, flags=re.DOTALL)
+    try:
+        return list(ast.literal_eval(re.sub(r"[^a-zA-Z0-9\s\[\]\(\)\"',]", "", match.group(1).strip())))
+    except (AttributeError, ValueError, SyntaxError, TypeError):
+        return None
+
+
+class FastPathLog:
+    def __init__(self):
+        """
+        GSM outputs by source ("symbolic" or "llm"): messages, confidence of the symbolic reading,
+        and how many of the extracted values match the speaker's true board.
+        """
+        self.lock = threading.Lock()
+        self.counts = {"symbolic": Counter(), "llm": Counter()}
+        self.confidences = []
+
+    def add(self, source: str, raw_output: str, confidence: float | None, truth: Board | None):
+        nws = parse_nws(raw_output)
+        counts = Counter(messages=1)
+        if nws is None:
+            counts["unparsed"] += 1
+        elif truth is not None:
+            for triple in nws:
+                try:
+                    a, b, w = triple
+                    counts["triples"] += 1
+                    counts["correct"] += a in truth.index and b in truth.index and truth.get(a, b) == int(w)
+                except (TypeError, ValueError):
+                    counts["triples"] += 1
+        with self.lock:
+            self.counts[source] += counts
+            if confidence is not None:  # no symbolic reading with the fast path off
+                self.confidences.append(confidence)
+
+    def summary(self) -> dict:
+        """Hit rate (messages read without the LLM) and per-source accuracy against the true boards."""
+        with self.lock:
+            counts = {source: Counter(counter) for source, counter in self.counts.items()}
+            confidences = list(self.confidences)
+        messages = sum(counter["messages"] for counter in counts.values())
+        if not messages:
+            return {"messages": 0}
+        result = {
+            "messages": messages,
+            "hits": counts["symbolic"]["messages"],
+            "hit_rate": counts["symbolic"]["messages"] / messages,
+            "mean_confidence": sum(confidences) / len(confidences) if confidences else None,
+        }
+        for source, counter in counts.items():
+            result[source] = {
+                "triples": counter["triples"],
+                "accuracy": counter["correct"] / counter["triples"] if counter["triples"] else None,
+                "unparsed": counter["unparsed"],
+            }
+        return result
+
+    def reset(self):
+        with self.lock:
+            self.counts = {"symbolic": Counter(), "llm": Counter()}
+            self.confidences = []
+
+
+stats = FastPathLog()
+
+
+def infer(
+    message: str, ows: list, loc: str | None, world: str, prompt: str, llm: Callable[[], str], truth: Board | None = None
+) -> str:
+    """
+    The GSM output for a message, in the LLM's format ([Thought] and [NWS]): the symbolic reading
+    if FASTPATH is on and its confidence reaches CONFIDENCE, else llm(). Recorded in stats, with
+    accuracy against truth (the speaker's board) when it is given.
+
+    :param prompt: str; the GSM system prompt, which names the rooms
+    """
+    nws, confidence = extract(message, ows, loc, world, *lexicon_from_prompt(prompt)) if FASTPATH else ([], None)
+    if FASTPATH and confidence >= CONFIDENCE:
+        raw_output = f"[Thought]: symbolic reading, confidence {confidence:.2f}\n[NWS]: {json.dumps(nws)}"
+        stats.add("symbolic", raw_output, confidence, truth)
+    else:
+        raw_output = llm()
+        stats.add("llm", raw_output, confidence, truth)
+    return raw_output
@@ -0,0 +1,205 @@
+import random
+import time
+
+import networkx as nx
+import numpy as np
+
+try:
+    from supplementary import tsp_utils
+except ImportError:  # run as a script from inside supplementary/
+    import tsp_utils
+
+# default time budget (seconds) of the anytime solver when it is used as a registry backend
+TIME_BUDGET = 0.5
+
+# The local searches below work on the open path [last prefix room, free rooms..., start room];
+# both ends are fixed, so the visited prefix is never changed. Each pass is O(n^3) on large boards,
+# so they stop at `deadline` (a time.perf_counter() value) with the best path found so far.
+
+
+def expired(deadline: float | None) -> bool:
+    return deadline is not None and time.perf_counter() >= deadline
+
+
+def path_coins(weights: np.ndarray, path: list[int]) -> int:
+    """Coins collected along an open path."""
+    return int(sum(weights[path[i], path[i + 1]] for i in range(len(path) - 1)))
+
+
+def greedy_path(weights: np.ndarray, last: int, free: list[int], start: int) -> list[int]:
+    """Walks from last along the most valuable hallway to an unvisited room until all are visited."""
+    path = [last]
+    free = list(free)
+    while free:
+        nxt = max(free, key=lambda j: weights[path[-1], j])
+        path.append(nxt)
+        free.remove(nxt)
+    return path + [start]
+
+
+def two_opt(weights: np.ndarray, path: list[int], deadline: float | None = None) -> list[int]:
+    """Reverses inner segments of the path as long as that collects more coins (or until deadline)."""
+    path = list(path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(path) - 2):
+            if expired(deadline):
+                return path
+            for j in range(i + 1, len(path) - 1):
+                a, b, c, d = path[i - 1], path[i], path[j], path[j + 1]
+                if weights[a, c] + weights[b, d] > weights[a, b] + weights[c, d]:
+                    path[i : j + 1] = path[i : j + 1][::-1]
+                    improved = True
+    return path
+
+
+def or_opt(weights: np.ndarray, path: list[int], max_segment: int = 3, deadline: float | None = None) -> list[int]:
+    """Moves segments of up to max_segment inner rooms (possibly reversed) to a better position (or until deadline)."""
+    path = list(path)
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, len(path) - length):
+                if expired(deadline):
+                    return path
+                segment = path[i : i + length]
+                rest = path[:i] + path[i + length :]
+                removed = (
+                    weights[path[i - 1], segment[0]]
+                    + weights[segment[-1], path[i + length]]
+                    - weights[path[i - 1], path[i + length]]
+                )
+                best_gain, best_move = 0, None
+                for q in range(len(rest) - 1):
+                    if q == i - 1:
+                        continue  # the original position
+                    for piece in (segment, segment[::-1]):
+                        added = (
+                            weights[rest[q], piece[0]]
+                            + weights[piece[-1], rest[q + 1]]
+                            - weights[rest[q], rest[q + 1]]
+                        )
+                        if added - removed > best_gain:
+                            best_gain, best_move = added - removed, (q, piece)
+                if best_move is not None:
+                    q, piece = best_move
+                    path = rest[: q + 1] + piece + rest[q + 1 :]
+                    improved = True
+                    break
+            if improved:
+                break
+    return path
+
+
+def local_search(weights: np.ndarray, path: list[int], deadline: float | None = None) -> list[int]:
+    """Alternates 2-opt and Or-opt until neither finds an improvement or the deadline has passed."""
+    coins = path_coins(weights, path)
+    while True:
+        path = or_opt(weights, two_opt(weights, path, deadline), deadline=deadline)
+        new_coins = path_coins(weights, path)
+        if new_coins <= coins or expired(deadline):
+            return path
+        coins = new_coins
+
+
+def double_bridge(path: list[int], rng: random.Random) -> list[int]:
+    """Lin-Kernighan style kick: cuts the inner rooms into four parts A B C D and reconnects them as A C B D."""
+    inner = path[1:-1]
+    if len(inner) < 4:
+        rng.shuffle(inner)
+        return [path[0]] + inner + [path[-1]]
+    i, j, k = sorted(rng.sample(range(1, len(inner)), 3))
+    return [path[0]] + inner[:i] + inner[j:k] + inner[i:j] + inner[k:] + [path[-1]]
+
+
+def upper_bound(weights: np.ndarray, last: int, free: list[int], start: int) -> int:
+    """
+    Cheap bound on the coins of the path from last through free back to start: every free room
+    uses two of its hallways and each end one, and every hallway is shared by two rooms.
+    """
+    if not free:
+        return int(weights[last, start])
+    bound = 0
+    for room in free:
+        neighbours = [j for j in free if j != room] + [last, start]
+        bound += np.sort(weights[room, neighbours])[-2:].sum()
+    bound += weights[last, free].max() + weights[start, free].max()
+    return int(bound // 2)
+
+
+def anytime_search(
+    g: nx.Graph,
+    partial_path: list[str] = ["L"],
+    time_budget: float = TIME_BUDGET,
+    seed: int = 0,
+    kicks: bool = True,
+) -> dict:
+    """
+    Improves a tour that starts with partial_path until time_budget seconds have passed
+    (or the tour provably cannot get better): greedy start, 2-opt + Or-opt local search,
+    then iterated double-bridge kicks from the best tour found so far. The local searches
+    stop at the deadline too, so time_budget=0 returns the greedy tour.
+
+    :param kicks: bool; whether to spend the rest of the budget on double-bridge kicks
+    :return report: dict with "tour" (list[str], without the closing start room), "coins" (int),
+        "history" ([(seconds, coins), ...] for every improvement), "bound" (int, the degree
+        bound upper_bound) and "gap" (relative distance of coins to bound)
+    """
+    deadline = time.perf_counter() + time_budget
+    started = time.perf_counter()
+    rng = random.Random(seed)
+
+    nodelist, weights = tsp_utils.weight_matrix(g)
+    index = {node: i for i, node in enumerate(nodelist)}
+    prefix = [index[node] for node in (partial_path or ["L"])]
+    free = [i for i in range(len(nodelist)) if i not in prefix]
+    last, start = prefix[-1], prefix[0]
+    prefix_coins = path_coins(weights, prefix)
+
+    bound = prefix_coins + upper_bound(weights, last, free, start)
+
+    best = local_search(weights, greedy_path(weights, last, free, start), deadline)
+    best_coins = prefix_coins + path_coins(weights, best)
+    history = [(time.perf_counter() - started, best_coins)]
+
+    while kicks and time.perf_counter() < deadline and best_coins < bound and len(free) > 2:
+        candidate = local_search(weights, double_bridge(best, rng), deadline)
+        coins = prefix_coins + path_coins(weights, candidate)
+        if coins > best_coins:
+            best, best_coins = candidate, coins
+            history.append((time.perf_counter() - started, best_coins))
+
+    tour = [nodelist[i] for i in prefix + best[1:-1]]
+    if len(nodelist) == 1:
+        best_coins = 0
+    return {
+        "tour": tour,
+        "coins": best_coins,
+        "history": history,
+        "bound": bound,
+        "gap": (bound - best_coins) / bound if bound > 0 else 0.0,
+    }
+
+
+def solve_heuristic(
+    g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False, time_budget: float = TIME_BUDGET
+) -> tuple[list[str], int] | tuple[list[list[str]], int]:
+    """
+    Find a long (not necessarily the longest) tour that starts with partial_path:
+    greedy construction followed by 2-opt + Or-opt until no move helps, within time_budget seconds.
+    """
+    report = anytime_search(g, partial_path, time_budget, kicks=False)
+    return [report["tour"]] if get_all_tours else report["tour"], report["coins"]
+
+
+def solve_anytime(
+    g: nx.Graph,
+    partial_path: list[str] = ["L"],
+    get_all_tours: bool = False,
+    time_budget: float = TIME_BUDGET,
+) -> tuple[list[str], int] | tuple[list[list[str]], int]:
+    """anytime_search with the (tour, coins) contract of the other solvers."""
+    report = anytime_search(g, partial_path, time_budget)
+    return [report["tour"]] if get_all_tours else report["tour"], report["coins"]
@@ -0,0 +1,108 @@
+import os
+import re
+import threading
+
+import numpy as np
+
+try:
+    from supplementary import rate_limiter
+except ImportError:  # run as a script from inside supplementary/
+    import rate_limiter
+
+# exchanges (partner input + own reply) sent besides the system prompt and the current input;
+# None sends the whole history. e.g. LLM_HISTORY_TURNS=3
+HISTORY_TURNS = int(os.environ["LLM_HISTORY_TURNS"]) if os.environ.get("LLM_HISTORY_TURNS") else None
+# fold the dropped exchanges into one compact message instead of leaving them out; e.g. LLM_HISTORY_SUMMARY=1
+HISTORY_SUMMARY = os.environ.get("LLM_HISTORY_SUMMARY") == "1"
+
+SUMMARY_CHARS = 160  # characters of a dropped partner message kept in the summary
+
+
+def flag(text: str, name: str) -> str:
+    """Content of the [name] block of a message (empty if there is none)."""
+    match = re.search(rf"\[{name}\]:?(.*?)(?=\n\[[^\]]+\]|$)", text, flags=re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def summarize(dropped: list) -> dict:
+    """
+    One user message standing in for the dropped exchanges: per turn the partner's message
+    (shortened) and the agent's own actions. Boards, visited rooms and IBP are not repeated,
+    since every input restates them.
+    """
+    lines, turn = [], 0
+    for message in dropped:
+        if message["role"] == "user":
+            turn += 1
+            observation = flag(message["content"], "Observation")
+            if len(observation) > SUMMARY_CHARS:
+                observation = observation[:SUMMARY_CHARS] + "..."
+            lines.append(f"{turn}. partner: {observation or '-'}")
+        else:
+            lines.append(f"{turn}. you: {flag(message['content'], 'Action') or '-'}")
+    return {"role": "user", "content": "[Earlier turns]:\n" + "\n".join(lines)}
+
+
+def window(msg_history: list, turns: int | None = None, summary: bool | None = None) -> list:
+    """
+    The messages to send for msg_history: the system prompt, the last `turns` exchanges and the
+    current input; the older exchanges are dropped, or folded into summarize() with summary.
+    The history itself is not changed, so the logs keep every turn.
+
+    :param msg_history: list; [system, user, assistant, user, ..., user] as kept by BotInstance
+    :param turns: int; exchanges kept (default: HISTORY_TURNS; None keeps all)
+    :param summary: bool; fold dropped exchanges into one message (default: HISTORY_SUMMARY)
+    """
+    turns = HISTORY_TURNS if turns is None else turns
+    summary = HISTORY_SUMMARY if summary is None else summary
+    system, rest = msg_history[:1], msg_history[1:]
+    keep = 2 * turns + 1 if turns is not None else len(rest)  # + the current input
+    if len(rest) <= keep:
+        return msg_history
+    dropped, kept = rest[: len(rest) - keep], rest[len(rest) - keep :]
+    return system + ([summarize(dropped)] if summary else []) + kept
+
+
+class ContextLog:
+    def __init__(self):
+        """Estimated input tokens per agent call: with the whole history and with what window() sent."""
+        self.lock = threading.Lock()
+        self.records = []  # (turn, full tokens, sent tokens)
+
+    def add(self, msg_history: list, sent: list):
+        turn = sum(message["role"] == "assistant" for message in msg_history) + 1
+        full = rate_limiter.estimate_tokens(msg_history, 0)
+        with self.lock:
+            self.records.append((turn, full, rate_limiter.estimate_tokens(sent, 0)))
+
+    def summary(self) -> dict:
+        """Mean input tokens per call before and after windowing, overall and per turn, and the saving."""
+        with self.lock:
+            records = np.array(self.records)
+        if not len(records):
+            return {"calls": 0}
+        turns, full, sent = records.T
+        return {
+            "calls": len(records),
+            "full_mean": float(full.mean()),
+            "sent_mean": float(sent.mean()),
+            "saved": float(1 - sent.sum() / full.sum()),
+            "per_turn": {
+                int(turn): (float(full[turns == turn].mean()), float(sent[turns == turn].mean()))
+                for turn in np.unique(turns)
+            },
+        }
+
+    def reset(self):
+        with self.lock:
+            self.records = []
+
+
+context = ContextLog()
+
+
+def bounded(msg_history: list) -> list:
+    """window(msg_history) with the default policy, recorded in context."""
+    sent = window(msg_history)
+    context.add(msg_history, sent)
+    return sent
@@ -1,17 +1,109 @@
+from itertools import combinations
+
 import networkx as nx
-from gurobipy import GRB, Env, Model
+import numpy as np
+from gurobipy import GRB, Env, GurobiError, Model, quicksum
 from numpy import argmax
 
-import tsp_utils
+try:
+    from supplementary import tsp_utils
+except ImportError:  # run as a script from inside supplementary/
+    import tsp_utils
+
+# boards with at least this many rooms use the DFJ formulation when the session picks automatically
+DFJ_MIN_NODES = 10
+
+
+def tour_from_matrix(
+    tour_matrix: np.ndarray, nodelist: list[str], partial_path: list[str]
+) -> list[str]:
+    """Follows the chosen edges of a solved tour matrix, starting from partial_path."""
+    tour_matrix = np.array(tour_matrix)
+    n = len(nodelist)
+    node_sequence = (
+        [nodelist.index(label) for label in partial_path] if partial_path else [0]
+    )
+    while len(node_sequence) < n:
+        last_node = node_sequence[-1]
+        next_node = int(argmax(tour_matrix[last_node]))
+        node_sequence.append(next_node)
+        tour_matrix[last_node][next_node] = 0
+
+    return [nodelist[i] for i in node_sequence]
+
+
+def tour_from_edges(
+    selected: list[tuple[int, int]], nodelist: list[str], partial_path: list[str], directed: bool = False
+) -> list[str]:
+    """Walks the tour given by its selected edges, starting along partial_path (and in edge direction if directed)."""
+    neighbours = {i: [] for i in range(len(nodelist))}
+    for i, j in selected:
+        neighbours[i].append(j)
+        if not directed:
+            neighbours[j].append(i)
+
+    node_sequence = (
+        [nodelist.index(label) for label in partial_path] if partial_path else [0]
+    )
+    while len(node_sequence) < len(nodelist):
+        previous = node_sequence[-2] if len(node_sequence) > 1 else None
+        node_sequence.append(
+            next(j for j in sorted(neighbours[node_sequence[-1]]) if j != previous)
+        )
+
+    return [nodelist[i] for i in node_sequence]
+
+
+def add_subtour_cuts(model: Model, where: int):
+    """
+    Gurobi callback for the DFJ formulation: whenever an integer solution contains a cycle
+    that misses some rooms, cut it off with a lazy subtour-elimination constraint.
+    """
+    if where != GRB.Callback.MIPSOL:
+        return
+
+    values = model.cbGetSolution(model._x)
+    chosen = nx.Graph()
+    chosen.add_nodes_from(range(model._n))
+    chosen.add_edges_from(edge for edge, value in values.items() if value > 0.5)
+
+    for component in nx.connected_components(chosen):
+        if len(component) < model._n:
+            model.cbLazy(
+                quicksum(model._x[edge] for edge in combinations(sorted(component), 2))
+                <= len(component) - 1
+            )
+            model._cuts.append(sorted(component))
+
+
+def solve_dfj(
+    g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False
+) -> tuple[list[str], int] | tuple[list[list[str]], int]:
+    """
+    Find the longest tour with the symmetric Dantzig-Fulkerson-Johnson formulation:
+    one binary per undirected edge, degree 2 per room, subtour cuts added lazily.
+    Same (ordering, objective) contract as solve_ilp, but scales to 30-60 room boards.
+    """
+    session = ILPSession(start_node=partial_path[0] if partial_path else "L", formulation="dfj")
+    try:
+        return session.solve(g, partial_path, get_all_tours)
+    finally:
+        session.close()
 
 
 def solve_ilp(
     g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False
 ) -> tuple[list[str], int] | tuple[list[list[str]], int]:
-    nodelist = list(g.nodes())
+    if get_all_tours:  # enumerate the co-optimal tours with no-good cuts on a reusable model
+        session = ILPSession(start_node=partial_path[0] if partial_path else "L", formulation="mtz")
+        try:
+            return session.solve(g, partial_path, get_all_tours=True)
+        finally:
+            session.close()
+
+    nodelist, weight_mat = tsp_utils.weight_matrix(g)
 
     n = g.number_of_nodes()
-    weight_mat = nx.adjacency_matrix(g).todense()
 
     with Env(empty=True) as env:
         env.setParam("OutputFlag", 0)
@@ -57,17 +149,7 @@ def solve_ilp(
 
         # Distance variable must equal the sum of the weights of the edges
         model.addConstr(
-            (
-                sum(  # type: ignore
-                    [
-                        edges[source, target] * weight_mat[source, target]
-                        for source in range(n)
-                        for target in range(n)
-                    ]
-                )
-                == D
-            ),
-            name="calculate_coins",
+            (edges * weight_mat).sum() == D, name="calculate_coins"
         )
 
         model.optimize()
@@ -76,19 +158,222 @@ def solve_ilp(
         # model.write("tsp.lp")  # the variables, bounds, constraints, and objective
         # model.write("tsp.sol")  # the solution (values of all variables)
 
-        tour_matrix = edges.getAttr("X")
+        ordering = tour_from_matrix(edges.getAttr("X"), nodelist, partial_path)
+
+        return ordering, model.getObjective().getValue()
+
+
+class ILPSession:
+    def __init__(self, start_node: str = "L", formulation: str = "auto"):
+        """
+        A long-lived TSP model for one agent (BotInstance), re-optimized every turn instead of rebuilt.
+        The model is built on the first call; afterwards only the objective coefficients of edges whose
+        value changed and the bounds of the visited-prefix edges are updated, and the previous tour is
+        passed to Gurobi as a warm start.
+
+        :param start_node: str; the room every tour starts and ends in (MTZ counters skip it)
+        :param formulation: str; "mtz" (directed, Miller-Tucker-Zemlin), "dfj" (symmetric, lazy subtour
+            cuts) or "auto" (DFJ from DFJ_MIN_NODES rooms on)
+        """
+        self.start_node = start_node
+        self.formulation = formulation
+        self.env = None
+        self.model = None
+        self.nodelist = []  # fixed room order of the model, start_node first
+        self.edge_vars = {}  # (i, j) -> binary edge variable; i < j for the symmetric DFJ model
+        self.weight_mat = None  # objective coefficients currently in the model
+        self.fixed_edges = set()  # edge keys whose lower bound is set to 1 (visited prefix)
+        self.tour = None  # edge keys of the previous solution, used as warm start
 
-        node_sequence = (
-            [nodelist.index(label) for label in partial_path] if partial_path else [0]
+    def edge_key(self, i: int, j: int) -> tuple[int, int]:
+        """Maps a travelled room pair to the key of its variable (undirected edges in the DFJ model)."""
+        return (min(i, j), max(i, j)) if self.model._formulation == "dfj" else (i, j)
+
+    def build(self, nodelist: list[str], weight_mat: np.ndarray):
+        """Creates the environment and the model for the given rooms and edge values."""
+        self.close()
+        n = len(nodelist)
+        formulation = self.formulation
+        if formulation == "auto":
+            formulation = "dfj" if n >= DFJ_MIN_NODES else "mtz"
+
+        self.env = Env(empty=True)
+        self.env.setParam("OutputFlag", 0)
+        self.env.start()
+        model = Model("TSP", env=self.env)
+        model._formulation = formulation
+        model._n = n
+
+        if formulation == "mtz":
+            # Edge variables carry the coins directly as objective coefficients (no separate distance variable)
+            edges = model.addMVar((n, n), vtype=GRB.BINARY, name="edges")
+            model.addConstr(edges.diagonal().sum() == 0, name="no_self_loops")
+            model.addConstr(edges.sum(axis=0) == 1, name="one_arrival_per_node")
+            model.addConstr(edges.sum(axis=1) == 1, name="one_departure_per_node")
+
+            # Miller-Tucker-Zemlin subtour elimination; room 0 is the start room
+            counters = model.addMVar(n, vtype=GRB.INTEGER, name="counters")
+            model.addConstrs(
+                counters[i] - counters[j] + 1 <= (n - 1) * (1 - edges[i, j])
+                for i in range(1, n)
+                for j in range(1, n)
+                if i != j
+            )
+            model.addConstrs(2 <= counters[i] for i in range(1, n))
+            model.addConstrs(counters[i] <= n for i in range(1, n))
+
+            edges.setAttr("Obj", weight_mat)
+            edge_list = edges.tolist()
+            self.edge_vars = {(i, j): edge_list[i][j] for i in range(n) for j in range(n)}
+        else:
+            # One variable per undirected edge; every room is entered and left once (degree 2)
+            x = model.addVars(
+                combinations(range(n), 2),
+                vtype=GRB.BINARY,
+                obj={(i, j): weight_mat[i, j] for i, j in combinations(range(n), 2)},
+                name="edges",
+            )
+            model.addConstrs(
+                (x.sum(i, "*") + x.sum("*", i) == 2 for i in range(n)), name="degree"
+            )
+            model.Params.LazyConstraints = 1
+            model._x = x
+            model._cuts = []
+            self.edge_vars = dict(x)
+
+        model.ModelSense = GRB.MAXIMIZE
+
+        self.model = model
+        self.nodelist = nodelist
+        self.weight_mat = weight_mat.copy()
+        self.fixed_edges = set()
+        self.tour = None
+
+    def update_objective(self, weight_mat: np.ndarray) -> int:
+        """Sets new coefficients for the edges whose value changed; returns how many were updated."""
+        changed = {self.edge_key(i, j) for i, j in np.argwhere(weight_mat != self.weight_mat)}
+        for i, j in changed:
+            self.edge_vars[i, j].Obj = weight_mat[i, j]
+        self.weight_mat = weight_mat.copy()
+        return len(changed)
+
+    def update_prefix(self, partial_path: list[str]):
+        """Forces the edges of partial_path into the tour by raising their lower bounds to 1."""
+        index = {node: i for i, node in enumerate(self.nodelist)}
+        prefix_edges = {
+            self.edge_key(index[partial_path[i]], index[partial_path[i + 1]])
+            for i in range(len(partial_path) - 1)
+        }
+        for key in self.fixed_edges - prefix_edges:
+            self.edge_vars[key].LB = 0
+        for key in prefix_edges - self.fixed_edges:
+            self.edge_vars[key].LB = 1
+        self.fixed_edges = prefix_edges
+
+    def solve(
+        self, g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False
+    ) -> tuple[list[str], int] | tuple[list[list[str]], int]:
+        """Re-optimizes the model for the current board g and visited prefix; same contract as solve_ilp."""
+        if get_all_tours:
+            tours = self.k_best(g, partial_path, k=None, epsilon=0)
+            return [tour for tour, _ in tours], tours[0][1]
+
+        rooms, weights = tsp_utils.weight_matrix(g)
+        nodelist = [self.start_node] + sorted(node for node in rooms if node != self.start_node)
+        order = [rooms.index(node) for node in nodelist]
+        weight_mat = weights[np.ix_(order, order)]
+
+        if self.model is None or nodelist != self.nodelist:
+            self.build(nodelist, weight_mat)
+        else:
+            self.update_objective(weight_mat)
+        self.update_prefix(partial_path or [self.start_node])
+
+        if self.tour is not None:  # warm start from the previous IBP
+            for key, var in self.edge_vars.items():
+                var.Start = 1 if key in self.tour else 0
+
+        self.optimize()
+        if self.model.Status != GRB.OPTIMAL:  # interrupted, infeasible or over a size limit: no tour to report
+            raise GurobiError(GRB.Error.DATA_NOT_AVAILABLE, f"ILP session ended with status {self.model.Status}")
+        return self.current_tour(partial_path), int(round(self.model.ObjVal))
+
+    def optimize(self):
+        """Runs Gurobi on the current model and remembers the chosen edges (None without an optimal solution)."""
+        if self.model._formulation == "dfj":
+            self.model.optimize(add_subtour_cuts)
+            # keep the cuts found in this round as regular constraints for the next re-optimization
+            for component in self.model._cuts:
+                self.model.addConstr(
+                    quicksum(self.model._x[edge] for edge in combinations(component, 2))
+                    <= len(component) - 1
+                )
+            self.model._cuts = []
+        else:
+            self.model.optimize()
+
+        if self.model.Status == GRB.OPTIMAL:
+            self.tour = {key for key, var in self.edge_vars.items() if var.X > 0.5}
+        else:
+            self.tour = None  # never report or warm-start from an earlier turn's tour
+
+    def current_tour(self, partial_path: list[str]) -> list[str]:
+        """The room ordering of the last solution, starting with partial_path."""
+        return tour_from_edges(
+            sorted(self.tour), self.nodelist, partial_path, directed=self.model._formulation == "mtz"
         )
-        while len(node_sequence) < n:
-            # print(tour_matrix)
-            last_node = node_sequence[-1]
-            next_node = int(argmax(tour_matrix[last_node]))
-            node_sequence.append(next_node)
-            tour_matrix[last_node][next_node] = 0
-            # tour_matrix[next_node][last_node] = 0
 
-        ordering = [nodelist[i] for i in node_sequence]
+    def k_best(
+        self,
+        g: nx.Graph,
+        partial_path: list[str] = ["L"],
+        k: int | None = 10,
+        epsilon: int | None = None,
+    ) -> list[tuple[list[str], int]]:
+        """
+        The best tours in order of decreasing coins: after each solve, a no-good cut excludes the
+        tour just found and the model is re-optimized. Stops after k tours or once the next tour is
+        more than epsilon coins below the optimum. The cuts are removed again afterwards.
+        In the symmetric DFJ model both directions of a tour are listed when only the start is fixed.
 
-        return ordering, model.getObjective().getValue()
+        :return tours: list of (tour without the closing start room, coins)
+        """
+        ordering, coins = self.solve(g, partial_path)
+        optimum = coins
+        tours = []
+        no_goods = []
+        while k is None or len(tours) < k:
+            tours.append((ordering, coins))
+            if self.model._formulation == "dfj" and len(partial_path or [self.start_node]) == 1 and len(ordering) > 2:
+                tours.append((ordering[:1] + ordering[1:][::-1], coins))
+
+            no_goods.append(
+                self.model.addConstr(
+                    quicksum(self.edge_vars[key] for key in self.tour) <= len(self.tour) - 1
+                )
+            )
+            self.optimize()
+            if self.model.Status != GRB.OPTIMAL:
+                break  # no tour left
+            ordering, coins = self.current_tour(partial_path), int(round(self.model.ObjVal))
+            if epsilon is not None and coins < optimum - epsilon:
+                break
+
+        self.model.remove(no_goods)
+        return tours[:k] if k is not None else tours
+
+    def close(self):
+        """Frees the Gurobi model and environment (and with it the license token)."""
+        if self.model is not None:
+            self.model.dispose()
+            self.model = None
+        if self.env is not None:
+            self.env.dispose()
+            self.env = None
+        self.edge_vars = {}
+
+    def __enter__(self) -> "ILPSession":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,105 @@
+import heapq
+from itertools import count
+
+import networkx as nx
+import numpy as np
+
+try:
+    from supplementary import prefix_tables, solvers, tsp_utils
+except ImportError:  # run as a script from inside supplementary/
+    import prefix_tables
+    import solvers
+    import tsp_utils
+
+# largest board (rooms) enumerated with the exact completion table; larger ones need Gurobi
+MAX_TABLE_NODES = 20
+
+
+def k_best_tours(
+    g: nx.Graph,
+    k: int | None = 10,
+    partial_path: list[str] = ["L"],
+    epsilon: int | None = None,
+) -> list[tuple[list[str], int]]:
+    """
+    The best tours that start with partial_path, in order of decreasing coins, without
+    scanning all permutations. Returns the top k tours, every tour within epsilon coins of
+    the optimum, or (if both are given) whichever list is shorter. Mirror-image tours are
+    listed separately, as in the OPTIMAL lists of the board files.
+
+    :return tours: list of (tour without the closing start room, coins)
+    """
+    if k is None and epsilon is None:
+        raise ValueError("Give k, epsilon or both")
+    if g.number_of_nodes() <= MAX_TABLE_NODES:
+        return best_first(g, k, partial_path, epsilon)
+    if not solvers.ilp_available():
+        raise RuntimeError(f"Boards with more than {MAX_TABLE_NODES} rooms need a licensed gurobipy")
+    session = solvers.ilp_solver.ILPSession(start_node=(partial_path or ["L"])[0])
+    try:
+        return session.k_best(g, partial_path, k, epsilon)
+    finally:
+        session.close()
+
+
+def best_first(
+    g: nx.Graph, k: int | None, partial_path: list[str], epsilon: int | None
+) -> list[tuple[list[str], int]]:
+    """
+    Best-first search over partial tours, ordered by coins so far plus the exact best completion
+    (prefix_tables.completion_table). Because that estimate is exact, complete tours leave the
+    queue in order of decreasing coins and only branches that lead to a listed tour are expanded.
+    """
+    nodelist, weights = tsp_utils.weight_matrix(g)
+    start_node = (partial_path or ["L"])[0]
+    rooms = [start_node] + [node for node in nodelist if node != start_node]
+    order = [nodelist.index(room) for room in rooms]
+    weights = weights[np.ix_(order, order)]
+    table = prefix_tables.completion_table(weights)
+    m = len(rooms) - 1
+    full = (1 << m) - 1
+
+    def estimate(coins: int, mask: int, last: int) -> int:
+        if last == 0:  # only the start room visited
+            return coins + max(
+                (int(weights[0, j + 1] + table[1 << j, j]) for j in range(m)), default=0
+            )
+        return coins + int(table[mask, last - 1])
+
+    prefix = [rooms.index(room) for room in (partial_path or [start_node])]
+    mask = sum(1 << (i - 1) for i in prefix[1:])
+    coins = int(sum(weights[prefix[i], prefix[i + 1]] for i in range(len(prefix) - 1)))
+
+    tie = count()  # keeps the heap from comparing paths
+    queue = [(-estimate(coins, mask, prefix[-1]), next(tie), prefix, mask, coins)]
+    tours = []
+    optimum = None
+    while queue and (k is None or len(tours) < k):
+        negative_estimate, _, path, mask, coins = heapq.heappop(queue)
+        if optimum is not None and epsilon is not None and -negative_estimate < optimum - epsilon:
+            break
+        if mask == full:
+            total = coins + int(weights[path[-1], 0]) if len(path) > 1 else 0
+            optimum = total if optimum is None else optimum
+            tours.append(([rooms[i] for i in path], total))
+            continue
+        for j in range(m):
+            if not mask >> j & 1:
+                child_coins = coins + int(weights[path[-1], j + 1])
+                child_mask = mask | 1 << j
+                heapq.heappush(
+                    queue,
+                    (-estimate(child_coins, child_mask, j + 1), next(tie), path + [j + 1], child_mask, child_coins),
+                )
+    return tours
+
+
+def co_optimal_tours(g: nx.Graph, partial_path: list[str] = ["L"]) -> tuple[list[list[str]], int]:
+    """Every optimal tour, in the (tours, coins) form of get_all_tours=True."""
+    tours = k_best_tours(g, k=None, partial_path=partial_path, epsilon=0)
+    return [tour for tour, _ in tours], tours[0][1]
+
+
+def is_near_optimal(coins: int, optimum: int, epsilon: int) -> bool:
+    """Whether a path worth coins counts as near-optimal (within epsilon coins of the optimum)."""
+    return coins >= optimum - epsilon
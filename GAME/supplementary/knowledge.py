@@ -0,0 +1,49 @@
+try:
+    from supplementary.board import Board
+except ImportError:  # run as a script from inside supplementary/
+    from board import Board
+
+
+class PartnerKnowledge:
+    def __init__(self, own: Board):
+        """
+        What an agent knows about its partner's board: one value per hallway, keyed by the unordered
+        room pair, so ("E", "L", 3) and ("L", "E", 3) are the same report and repeating a report
+        changes nothing. A new value for a known hallway replaces the old one.
+
+        :param own: Board; the agent's own board
+        """
+        self.own = own
+        self.total = own.copy()  # own board + the partner's known values
+        self.edges = {}  # (room, room) in sorted order -> (a, b, w) as first reported
+        self.version = 0  # increases whenever an update changed a value
+
+    def update(self, addition: list) -> list[tuple[str, str, int]]:
+        """
+        Merges hallway reports [(a, b, w), ...] (e.g. a GSM [NWS] list) into the store.
+        Reports of rooms that are not on the board are ignored.
+
+        :return changed: list; the reports that added or changed a value
+        """
+        changed = []
+        for a, b, w in addition:
+            if a == b or a not in self.own.index or b not in self.own.index:
+                continue
+            key = (min(a, b), max(a, b))
+            w = int(w)
+            old = self.edges.get(key)
+            if old is not None and old[2] == w:
+                continue
+            self.total.add(a, b, w - (old[2] if old is not None else 0))
+            self.edges[key] = (old[0], old[1], w) if old is not None else (a, b, w)
+            changed.append((a, b, w))
+        if changed:
+            self.version += 1
+        return changed
+
+    def world_state(self) -> list[tuple[str, str, int]]:
+        """The known partner hallways in the order they were learned, as shown in [World-state-user]."""
+        return list(self.edges.values())
+
+    def __len__(self) -> int:
+        return len(self.edges)
@@ -0,0 +1,470 @@
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from functools import partial
+
+import httpx
+import numpy as np
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+try:
+    from supplementary import rate_limiter, response_cache
+    from supplementary.config import OPENAI_API_KEY
+except ImportError:  # run as a script from inside supplementary/
+    import rate_limiter
+    import response_cache
+    from config import OPENAI_API_KEY
+
+# OpenAI-compatible endpoint, e.g. http://127.0.0.1:8765/v1 for mock_llm; None uses the OpenAI API (or OPENAI_BASE_URL)
+BASE_URL = os.environ.get("LLM_BASE_URL")
+
+# connection pool of the process-wide client; idle connections are kept open for KEEPALIVE_EXPIRY seconds
+MAX_CONNECTIONS = 64
+MAX_KEEPALIVE_CONNECTIONS = 32
+KEEPALIVE_EXPIRY = 120.0
+
+# seconds; generations can take long, opening a connection should not
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 120.0
+WRITE_TIMEOUT = 30.0
+POOL_TIMEOUT = 30.0
+
+# record / replay of responses (see response_cache.MODES); e.g. LLM_CACHE_MODE=replay to rerun a recorded batch offline
+CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "off")
+CACHE_PATH = response_cache.CACHE_PATH
+
+# provider quota shared by all games of the process (None: unlimited); e.g. LLM_RPM=500 LLM_TPM=30000
+RPM_LIMIT = float(os.environ["LLM_RPM"]) if os.environ.get("LLM_RPM") else None
+TPM_LIMIT = float(os.environ["LLM_TPM"]) if os.environ.get("LLM_TPM") else None
+BURST_SECONDS = 60.0  # seconds of quota that may be spent at once
+
+# retries of transient errors (timeouts, connection errors, 429, 5xx), with full-jitter exponential backoff
+CALL_TIMEOUT = 90.0  # seconds per attempt
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# hedging (game_runner runs only): once an attempt outlasts this percentile of recent calls, a duplicate
+# request is sent and the first reply wins; e.g. LLM_HEDGE=1
+HEDGE = os.environ.get("LLM_HEDGE") == "1"
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_CALLS = 20  # calls observed before the percentile is trusted
+
+TRANSIENT = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+    TimeoutError,  # an attempt (or a hedged race) ran past CALL_TIMEOUT
+)
+
+_lock = threading.Lock()
+_client = None
+_loop = None  # event loop that serves chat() calls from other threads (see attach_loop)
+_async_client = None
+_scheduler = None
+_record = contextvars.ContextVar("llm_call_record", default=None)  # timing record of the call in flight
+_deadline = contextvars.ContextVar("game_deadline", default=None)  # time.monotonic() by which the game must end
+
+
+class GameTimeout(RuntimeError):
+    """A game ran past its wall-clock budget (see set_budget); raised by its next LLM call."""
+
+
+def _tracer(record: dict, asynchronous: bool):
+    """
+    httpcore trace hook that adds the time spent opening connections (TCP connect + TLS handshake)
+    to record. A request on a kept-alive connection adds nothing, so connect time 0 means reuse.
+    """
+    started = {}
+
+    def on_event(event: str, info: dict):
+        step = event.rsplit(".", 1)[0]
+        if step not in ("connection.connect_tcp", "connection.start_tls"):
+            return
+        if event.endswith(".started"):
+            started[step] = time.perf_counter()
+        elif step in started:
+            record["connect"] += time.perf_counter() - started.pop(step)
+
+    if asynchronous:  # the async transport awaits its trace hook
+
+        async def trace(event: str, info: dict):
+            on_event(event, info)
+
+        return trace
+    return on_event
+
+
+class TimedTransport(httpx.HTTPTransport):
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        record = _record.get()
+        if record is not None:
+            request.extensions["trace"] = _tracer(record, asynchronous=False)
+        return super().handle_request(request)
+
+
+class AsyncTimedTransport(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        record = _record.get()
+        if record is not None:
+            request.extensions["trace"] = _tracer(record, asynchronous=True)
+        return await super().handle_async_request(request)
+
+
+def _record_usage(record: dict, completion):
+    """Adds the prompt tokens of a completion, and how many of them the provider's prefix cache served, to record."""
+    usage = completion.usage
+    if usage is None:
+        return
+    details = usage.prompt_tokens_details
+    record["prompt_tokens"] = usage.prompt_tokens
+    record["cached_tokens"] = (details.cached_tokens or 0) if details is not None else 0
+
+
+class CallLog:
+    def __init__(self):
+        """Per-call timings of the shared client: connect time and total time (seconds) of every call."""
+        self.lock = threading.Lock()
+        self.records = []
+
+    def add(self, record: dict):
+        with self.lock:
+            self.records.append(record)
+
+    def summary(self) -> dict:
+        """
+        Number of calls, retries, hedges and errors, prompt tokens and how many were served from the
+        provider's prefix cache, connection reuse rate, mean connect time and mean / p50 / p95 / p99 total time.
+        """
+        with self.lock:
+            records = list(self.records)
+        if not records:
+            return {"calls": 0}
+        connect = np.array([record["connect"] for record in records])
+        total = np.array([record["total"] for record in records])
+        return {
+            "calls": len(records),
+            "retries": sum(record.get("attempt", 0) > 0 for record in records),
+            "hedges": sum(record.get("hedge", False) for record in records),
+            "errors": sum("error" in record for record in records),
+            "prompt_tokens": sum(record.get("prompt_tokens", 0) for record in records),
+            "cached_tokens": sum(record.get("cached_tokens", 0) for record in records),
+            "reused": float((connect == 0).mean()),
+            "connect_mean": float(connect.mean()),
+            "connect_total": float(connect.sum()),
+            "total_mean": float(total.mean()),
+            "total_p50": float(np.percentile(total, 50)),
+            "total_p95": float(np.percentile(total, 95)),
+            "total_p99": float(np.percentile(total, 99)),
+        }
+
+    def percentile(self, q: float, recent: int = 200) -> float | None:
+        """Total time of the q-th percentile of the last `recent` successful calls (None before HEDGE_MIN_CALLS)."""
+        with self.lock:
+            totals = [record["total"] for record in self.records[-recent:] if "error" not in record and "cancelled" not in record]
+        if len(totals) < HEDGE_MIN_CALLS:
+            return None
+        return float(np.percentile(totals, q))
+
+    def reset(self):
+        with self.lock:
+            self.records = []
+
+
+calls = CallLog()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT, write=WRITE_TIMEOUT, pool=POOL_TIMEOUT)
+
+
+def make_client() -> OpenAI:
+    """An OpenAI client on a pooled, keep-alive HTTP client with the module's limits and timeouts."""
+    http_client = httpx.Client(transport=TimedTransport(limits=_limits()), timeout=_timeout())
+    # retries follow this module's policy (_scheduled), not the SDK's
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=BASE_URL, http_client=http_client, max_retries=0)
+
+
+def get_client() -> OpenAI:
+    """The process-wide client, created on first use and shared by every agent, GSM and thread."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = make_client()
+    return _client
+
+
+def configure(**settings):
+    """
+    Changes the endpoint, pool limits, timeouts, retry policy, cache mode or quota (e.g.
+    configure(CALL_TIMEOUT=60), configure(CACHE_MODE="replay") or configure(RPM_LIMIT=500)); the
+    next call opens a new client and scheduler with them.
+    """
+    global _client, _scheduler
+    with _lock:
+        for name, value in settings.items():
+            if name not in globals() or not name.isupper():
+                raise ValueError(f"Unknown client setting {name}")
+            if name == "CACHE_MODE" and value not in response_cache.MODES:
+                raise ValueError(f"Unknown cache mode {value}, expected one of {response_cache.MODES}")
+            globals()[name] = value
+        if _client is not None:
+            _client.close()
+        _client = None
+        _scheduler = None
+
+
+def attach_loop(loop: asyncio.AbstractEventLoop):
+    """
+    Serves chat() calls made from other threads on loop, with one non-blocking AsyncOpenAI client:
+    the calling thread waits for its own reply while the loop keeps every other call in flight.
+    """
+    global _loop, _async_client
+    _loop, _async_client = loop, None
+
+
+async def detach_loop():
+    """Stops serving chat() on the event loop and closes the async client (call from the loop)."""
+    global _loop, _async_client
+    client, _loop, _async_client = _async_client, None, None
+    if client is not None:
+        await client.close()
+
+
+def get_scheduler() -> rate_limiter.Scheduler:
+    """The process-wide scheduler that keeps all games within RPM_LIMIT and TPM_LIMIT."""
+    global _scheduler
+    if _scheduler is None:
+        with _lock:
+            if _scheduler is None:
+                _scheduler = rate_limiter.Scheduler(RPM_LIMIT, TPM_LIMIT, BURST_SECONDS)
+    return _scheduler
+
+
+async def acomplete(
+    model: str,
+    messages: list,
+    max_tokens: int,
+    temperature: float = 1,
+    seed: int | None = None,
+    timeout: float | None = None,
+    record: dict | None = None,
+):
+    """One API call on the attached loop's async client; returns the whole completion (content and usage)."""
+    global _async_client
+    if _async_client is None:
+        http_client = httpx.AsyncClient(transport=AsyncTimedTransport(limits=_limits()), timeout=_timeout())
+        _async_client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=BASE_URL, http_client=http_client, max_retries=0)
+
+    record = {"model": model, "connect": 0.0, **(record or {})}
+    _record.set(record)
+    start = time.perf_counter()
+    try:
+        completion = await _async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            seed=seed,
+            timeout=timeout or CALL_TIMEOUT,
+        )
+        _record_usage(record, completion)
+    except asyncio.CancelledError:  # the other request of a hedged attempt replied first
+        record["cancelled"] = True
+        raise
+    except Exception as error:
+        record["error"] = type(error).__name__
+        raise
+    finally:
+        record["total"] = time.perf_counter() - start
+        calls.add(record)
+    return completion
+
+
+async def _hedged(model: str, messages: list, max_tokens: int, temperature: float, seed: int | None, timeout: float, attempt: int):
+    """
+    One attempt of a call on the event loop: the request, plus (with HEDGE) a duplicate once the
+    request outlasts the HEDGE_PERCENTILE latency of recent calls and the quota has room for it.
+    The first reply wins and the other request is cancelled; raises TimeoutError after timeout.
+    The duplicate settles its own reservation: the tokens its reply used, or all of them back
+    when it failed or was cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+    tasks = [asyncio.ensure_future(acomplete(model, messages, max_tokens, temperature, seed, timeout, {"attempt": attempt}))]
+    pending = set(tasks)
+    delay = calls.percentile(HEDGE_PERCENTILE) if HEDGE else None
+    hedge_at = loop.time() + delay if delay is not None and delay < timeout else None
+    error = None
+    try:
+        while pending:
+            until = end if hedge_at is None else hedge_at
+            done, pending = await asyncio.wait(
+                pending, timeout=max(until - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            if done:
+                continue  # a failed request; wait for the other one, if any
+            if hedge_at is None:
+                raise TimeoutError(f"no reply within {timeout:.0f}s")
+            hedge_at = None
+            scheduler, reserved = get_scheduler(), rate_limiter.estimate_tokens(messages, max_tokens)
+            if scheduler.try_acquire(reserved):
+                record = {"attempt": attempt, "hedge": True}
+                tasks.append(asyncio.ensure_future(acomplete(model, messages, max_tokens, temperature, seed, end - loop.time(), record)))
+                tasks[-1].add_done_callback(partial(_settle_hedge, scheduler, reserved))
+                pending.add(tasks[-1])
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+            # the loser's outcome is not needed once the attempt is decided (and may still be an error)
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+
+def _settle_hedge(scheduler: rate_limiter.Scheduler, reserved: int, task: asyncio.Future):
+    """Settles a hedged duplicate's reservation once its request is over (won, lost, failed or cancelled)."""
+    if task.cancelled() or task.exception() is not None:
+        scheduler.settle(reserved, 0)
+    else:
+        usage = task.result().usage
+        scheduler.settle(reserved, usage.total_tokens if usage else None)
+
+
+def _complete(model: str, messages: list, max_tokens: int, temperature: float, seed: int | None, timeout: float, attempt: int):
+    """One attempt of a call: on the runner's event loop (hedged) if one is attached, else on the shared sync client."""
+    loop = _loop
+    if loop is not None and not loop.is_closed():
+        return asyncio.run_coroutine_threadsafe(
+            _hedged(model, messages, max_tokens, temperature, seed, timeout, attempt), loop
+        ).result()
+
+    record = {"model": model, "connect": 0.0, "attempt": attempt}
+    token = _record.set(record)
+    start = time.perf_counter()
+    try:
+        completion = get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            seed=seed,
+            timeout=timeout,
+        )
+        _record_usage(record, completion)
+    except Exception as error:
+        record["error"] = type(error).__name__
+        raise
+    finally:
+        record["total"] = time.perf_counter() - start
+        _record.reset(token)
+        calls.add(record)
+    return completion
+
+
+def set_budget(seconds: float | None):
+    """Gives the game played by the calling thread `seconds` of wall-clock time from now (None: no limit)."""
+    _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+
+def _remaining(deadline: float | None) -> float | None:
+    """Seconds left of the game's budget (None: no limit); raises GameTimeout once it is spent."""
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise GameTimeout("the game ran past its wall-clock budget")
+    return remaining
+
+
+def backoff(attempt: int, error: Exception) -> float:
+    """Seconds before retry attempt + 1: the server's Retry-After if it sent one, else full-jitter exponential backoff."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def _scheduled(model: str, messages: list, max_tokens: int, temperature: float, seed: int | None) -> str:
+    """
+    One API call under the retry policy. Every attempt waits its turn in the scheduler for a
+    request and its estimated tokens, and is limited to CALL_TIMEOUT and to what is left of the
+    game's budget. Transient errors are retried up to MAX_RETRIES times after backoff();
+    the tokens the reported usage shows were not needed go back to the scheduler, and a failed
+    attempt gives back all of its tokens.
+    """
+    scheduler = get_scheduler()
+    reserved = rate_limiter.estimate_tokens(messages, max_tokens)
+    game, deadline = rate_limiter.current_game.get(), _deadline.get()
+    for attempt in range(MAX_RETRIES + 1):
+        _remaining(deadline)
+        scheduler.acquire(reserved, game)
+        remaining = _remaining(deadline)  # the wait for the quota counts against the budget
+        timeout = CALL_TIMEOUT if remaining is None else min(CALL_TIMEOUT, remaining)
+        try:
+            completion = _complete(model, messages, max_tokens, temperature, seed, timeout, attempt)
+        except Exception as error:
+            scheduler.settle(reserved, 0)  # the next attempt reserves its own
+            if not isinstance(error, TRANSIENT) or attempt == MAX_RETRIES:
+                raise
+            wait = backoff(attempt, error)
+            remaining = _remaining(deadline)
+            if remaining is not None and wait >= remaining:
+                raise GameTimeout("the game's budget ends before the next retry") from error
+            time.sleep(wait)
+            continue
+        scheduler.settle(reserved, completion.usage.total_tokens if completion.usage else None)
+        return completion.choices[0].message.content
+
+
+def cache_stats() -> dict:
+    """Hits and misses of the response cache in this process (empty when CACHE_MODE is off)."""
+    if CACHE_MODE == "off":
+        return {}
+    return {"mode": CACHE_MODE, **response_cache.shared_cache(CACHE_PATH).stats()}
+
+
+def chat(model: str, messages: list, max_tokens: int, temperature: float = 1, seed: int | None = None) -> str:
+    """
+    One chat completion through the shared client; returns the message content and records
+    the call's connect and total time in calls. Calls wait for the shared RPM/TPM budget
+    (get_scheduler), are retried on transient errors, and inside a game_runner run are handed
+    to the runner's event loop. Depending on CACHE_MODE, the response is recorded to or
+    replayed from the response cache, keyed by model, seed, temperature, max_tokens and the
+    hash of messages.
+    """
+    mode = CACHE_MODE
+    if mode == "off":
+        return _scheduled(model, messages, max_tokens, temperature, seed)
+
+    cache = response_cache.shared_cache(CACHE_PATH)
+    key = response_cache.request_key(model, messages, max_tokens, temperature, seed)
+    if mode in ("replay", "record-missing"):
+        content = cache.get(key)
+        if content is not None:
+            return content
+        if mode == "replay":
+            raise response_cache.ReplayMiss(f"no recorded response for {model} (seed {seed}), key {key}")
+
+    content = _scheduled(model, messages, max_tokens, temperature, seed)
+    cache.put(key, model, seed, content)
+    return content
@@ -0,0 +1,303 @@
+import argparse
+import ast
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# seconds before a reply: constant, uniform (0..2*mean), exponential or lognormal around mean
+LATENCIES = ("constant", "uniform", "exponential", "lognormal")
+
+FIELD_PATTERN = r"\[([^\]]+)\]:?\s*(.*?)(?=\n\[[^\]]+\]|$)"  # "[Flag]: content" blocks of an input
+EDGE_PATTERN = r"\b([A-Z]\w*)-([A-Z]\w*): (\d+)"  # hallway reports in the mock agents' messages
+
+# prefix caching as providers do it: in blocks of 128 tokens, for prompts of at least 1024 tokens
+CACHE_BLOCK = 128
+CACHE_MIN = 1024
+CHARS_PER_TOKEN = 4
+
+
+def fields(text: str) -> dict:
+    """The [Flag]: content blocks of a game input (e.g. World-state-own, Visited, IBP, OWS)."""
+    return {flag.strip(): content.strip() for flag, content in re.findall(FIELD_PATTERN, text, flags=re.DOTALL)}
+
+
+def literal(text: str | None, default):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return default
+
+
+def last_input(messages: list) -> str:
+    """The game's input of a request: its last user message (a board section may follow it, see prompt_layout)."""
+    return next(message["content"] for message in reversed(messages) if message["role"] == "user")
+
+
+def agent_reply(messages: list) -> str:
+    """
+    Rule-based player: moves to the room the partner just suggested, else to the next room of its
+    [IBP] if it has one, else to the room its own board pays most for; tells the partner its own
+    values from the current room, and ends the game once every room is visited. Rooms visited so
+    far come from [Visited] or, for the variants that do not show it, from its own earlier visit()
+    actions (also those folded into an [Earlier turns] summary).
+    """
+    state = fields(last_input(messages))
+    own = literal(state.get("World-state-own"), [])
+    weights = {}
+    for a, b, w in own:
+        weights[(a, b)] = weights[(b, a)] = int(w)
+    rooms = list(dict.fromkeys(room for a, b, _ in own for room in (a, b)))
+
+    visited = literal(state.get("Visited"), None)
+    if visited is None:
+        visited = ["L"]
+        for message in messages:
+            if message["role"] == "assistant":
+                visited += re.findall(r"visit\(\"?'?(\w+)", message["content"])
+            elif message["content"].startswith("[Earlier turns]"):  # own actions of a windowed history
+                own_actions = "\n".join(re.findall(r"^\d+\. you: (.*)$", message["content"], flags=re.MULTILINE))
+                visited += re.findall(r"visit\(\"?'?(\w+)", own_actions)
+    location = visited[-1]
+    remaining = [room for room in rooms if room not in visited]
+
+    report = ", ".join(f"{location}-{room}: {weights[(location, room)]}" for room in remaining if (location, room) in weights)
+    if not remaining:
+        path = visited if visited[-1] == "L" and len(visited) > 1 else visited + ["L"]
+        return (
+            f"[Thought]: mock - every room is visited\n[Action]: end({json.dumps(path)})\n"
+            f"[Message]: We are done, our path is {path}."
+        )
+
+    ibp = literal(state.get("IBP"), [])
+    suggested = re.findall(r"Let's go to (\w+)", state.get("Observation", ""))
+    if suggested and suggested[-1] in remaining:  # follow the partner, so both end up on one path
+        step = suggested[-1]
+    elif len(ibp) > len(visited) and ibp[len(visited)] in remaining:
+        step = ibp[len(visited)]
+    else:
+        step = max(remaining, key=lambda room: weights.get((location, room), 0))
+    return (
+        f"[Thought]: mock - next room {step}\n"
+        f'[Action]: suggest({json.dumps([location, step])}), inform("coins from {location}"), visit("{step}")\n'
+        f"[Message]: My coins from {location}: {report}. Let's go to {step}."
+    )
+
+
+def gsm_reply(messages: list) -> str:
+    """Rule-based GSM: the hallway reports of the [Message] that are not in [OWS] yet."""
+    state = fields(last_input(messages))
+    known = {frozenset((a, b)) for a, b, _ in literal(state.get("OWS"), [])}
+    new = [[a, b, int(w)] for a, b, w in re.findall(EDGE_PATTERN, state.get("Message", "")) if frozenset((a, b)) not in known]
+    return f"[Thought]: mock - {len(new)} new values\n[NWS]: {json.dumps(new)}"
+
+
+class MockLLM:
+    def __init__(
+        self,
+        latency: str = "constant",
+        latency_mean: float = 0.0,
+        latency_sigma: float = 0.5,
+        token_latency: float = 0.0,
+        prompt_latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        script: dict | None = None,
+        seed: int | None = None,
+    ):
+        """
+        The behaviour of the mock server: how long a reply takes, how often it fails, and what it says.
+
+        :param latency: str; distribution of the time to first byte (see LATENCIES)
+        :param latency_mean: float; mean of that distribution in seconds
+        :param latency_sigma: float; shape of the lognormal distribution
+        :param token_latency: float; seconds added per completion token
+        :param prompt_latency: float; seconds added per prompt token not served from the prefix cache (prefill)
+        :param error_rate: float; share of requests answered with error_status instead of a completion
+        :param error_status: int; HTTP status of injected errors (e.g. 500, 429 or 503)
+        :param script: dict; {"agent": [...], "gsm": [...]} replies returned in turn instead of the rules
+        :param seed: int; seed of the latency and error draws
+        """
+        if latency not in LATENCIES:
+            raise ValueError(f"Unknown latency distribution {latency}, expected one of {LATENCIES}")
+        self.latency = latency
+        self.latency_mean = latency_mean
+        self.latency_sigma = latency_sigma
+        self.token_latency = token_latency
+        self.prompt_latency = prompt_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.script = {kind: itertools.cycle(replies) for kind, replies in (script or {}).items() if replies}
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()  # the handler threads share rng, script and counters
+        self.counts = {"agent": 0, "gsm": 0, "errors": 0}
+        self.prefixes = set()  # hashes of every prompt prefix seen, block by block
+
+    def cached_tokens(self, model: str, messages: list) -> int:
+        """
+        Tokens of the prompt the prefix cache would serve: its leading CACHE_BLOCK-token blocks that
+        an earlier request began with too (byte for byte). Every block of this prompt is cached after.
+        """
+        text = "".join(f"<{message['role']}>{message['content']}" for message in messages)
+        block = CACHE_BLOCK * CHARS_PER_TOKEN
+        digest = hashlib.sha256(model.encode())
+        hits, hit = 0, True
+        with self.lock:
+            for start in range(0, len(text) - block + 1, block):
+                digest.update(text[start : start + block].encode())
+                key = digest.digest()
+                hit = hit and key in self.prefixes
+                hits += hit
+                self.prefixes.add(key)
+        cached = hits * CACHE_BLOCK
+        return cached if cached >= CACHE_MIN else 0
+
+    def delay(self) -> float:
+        with self.lock:
+            if self.latency == "uniform":
+                return float(self.rng.uniform(0, 2 * self.latency_mean))
+            if self.latency == "exponential":
+                return float(self.rng.exponential(self.latency_mean)) if self.latency_mean else 0.0
+            if self.latency == "lognormal":  # mean latency_mean, median below it
+                mu = np.log(self.latency_mean or 1e-9) - self.latency_sigma**2 / 2
+                return float(self.rng.lognormal(mu, self.latency_sigma))
+            return self.latency_mean
+
+    def fails(self) -> bool:
+        with self.lock:
+            failed = bool(self.rng.random() < self.error_rate)
+            self.counts["errors"] += failed
+            return failed
+
+    def reply(self, messages: list) -> str:
+        kind = "gsm" if "[OWS]" in last_input(messages) else "agent"
+        with self.lock:
+            self.counts[kind] += 1
+            if kind in self.script:
+                return next(self.script[kind])
+        return gsm_reply(messages) if kind == "gsm" else agent_reply(messages)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as the pooled client expects
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    mock = MockLLM()
+
+    def send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        try:
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):  # the client gave up on the request (e.g. a cancelled hedge)
+            self.close_connection = True
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self.send_json(200, self.mock.counts)
+        else:
+            self.send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        except ValueError:  # the client closed the connection mid-request
+            self.close_connection = True
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "not found"}})
+            return
+
+        time.sleep(self.mock.delay())
+        if self.mock.fails():
+            self.send_json(self.mock.error_status, {"error": {"message": "injected error", "type": "mock"}})
+            return
+
+        content = self.mock.reply(request["messages"])
+        prompt_tokens = sum(len(message["content"]) for message in request["messages"]) // CHARS_PER_TOKEN
+        cached_tokens = min(self.mock.cached_tokens(request.get("model", ""), request["messages"]), prompt_tokens)
+        completion_tokens = len(content) // CHARS_PER_TOKEN
+        # prefill of the tokens the prefix cache does not serve, then generation
+        time.sleep(self.mock.prompt_latency * (prompt_tokens - cached_tokens) + self.mock.token_latency * completion_tokens)
+        self.send_json(
+            200,
+            {
+                "id": "mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate a load test
+
+
+def serve(mock: MockLLM, host: str = HOST, port: int = PORT) -> ThreadingHTTPServer:
+    """Starts the mock server on a background thread; its base URL is http://host:port/v1."""
+    handler = type("MockHandler", (Handler,), {"mock": mock})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", choices=LATENCIES, default="constant")
+    parser.add_argument("--latency-mean", type=float, default=0.0, help="seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="shape of the lognormal latency")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per completion token")
+    parser.add_argument("--prompt-latency", type=float, default=0.0, help="seconds per prompt token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected errors")
+    parser.add_argument("--script", default=None, help='JSON file {"agent": [...], "gsm": [...]} of replies')
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def from_arguments(args: argparse.Namespace) -> MockLLM:
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    return MockLLM(
+        args.latency, args.latency_mean, args.latency_sigma, args.token_latency, args.prompt_latency,
+        args.error_rate, args.error_status, script, args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible chat-completions server for load tests.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = serve(from_arguments(args), args.host, args.port)
+    print(f"mock LLM on http://{args.host}:{args.port}/v1 (set LLM_BASE_URL to use it)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
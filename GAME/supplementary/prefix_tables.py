@@ -0,0 +1,145 @@
+import json
+import os
+
+import numpy as np
+
+try:
+    from supplementary import tsp_utils
+except ImportError:  # run as a script from inside supplementary/
+    import tsp_utils
+
+
+def board_rooms(board: list[tuple[str, str, int]], start_node: str = "L") -> list[str]:
+    """Room order used for the tables: the start room first, then the rooms as they appear on the board."""
+    rooms = [start_node]
+    for a, b, _ in board:
+        rooms += [room for room in (a, b) if room not in rooms]
+    return rooms
+
+
+def summed_matrix(setup: dict, rooms: list[str]) -> np.ndarray:
+    """Weight matrix of the summed BOT+USER board (the coins the players collect together)."""
+    index = {room: i for i, room in enumerate(rooms)}
+    weights = np.zeros((len(rooms), len(rooms)), dtype=np.int64)
+    for a, b, w in setup["BOT"] + setup["USER"]:
+        weights[index[a], index[b]] += w
+        weights[index[b], index[a]] += w
+    return weights
+
+
+def completion_table(weights: np.ndarray) -> np.ndarray:
+    """
+    Backward Held-Karp DP from a single pass over all subsets. Room 0 is the start room and
+    rooms 1..m are encoded as bits 0..m-1. Entry [mask, j] holds the most coins collectable
+    from room j+1, having visited exactly the rooms in mask (j included), through every
+    remaining room and back to the start. Entries with j outside mask are unused.
+    """
+    m = len(weights) - 1
+    inner = weights[1:, 1:].astype(np.int32)
+    table = np.full((1 << m, m), tsp_utils._UNREACHABLE, dtype=np.int32)
+    full = (1 << m) - 1
+    table[full] = weights[1:, 0]
+
+    masks = np.arange(1 << m)
+    popcount = np.zeros(1 << m, dtype=np.int8)
+    for j in range(m):
+        popcount += (masks >> j) & 1
+
+    for size in range(m - 1, 0, -1):
+        layer = masks[popcount == size]
+        for k in range(m):
+            open_masks = layer[(layer >> k) & 1 == 0]
+            # from any room j in the mask, walk to k and continue optimally from there
+            step = inner[:, k][None, :] + table[open_masks | (1 << k), k][:, None]
+            table[open_masks] = np.maximum(table[open_masks], step)
+
+    return table
+
+
+class PrefixTables:
+    def __init__(self, rooms: list[str], board_ids: list[str], tables: np.ndarray, weights: np.ndarray):
+        """
+        Best achievable completion for every visited prefix of every board of one size.
+
+        :param rooms: list[str]; room order of the tables, start room first
+        :param board_ids: list[str]; board keys as in boards_N.json
+        :param tables: np.ndarray; (boards, 2^(n-1), n-1) completion tables, see completion_table
+        :param weights: np.ndarray; (boards, n, n) summed BOT+USER weight matrices
+        """
+        self.rooms = rooms
+        self.index = {room: i for i, room in enumerate(rooms)}
+        self.board_ids = board_ids
+        self.board_index = {board_id: i for i, board_id in enumerate(board_ids)}
+        self.tables = tables
+        self.weights = weights
+        # optimum per board: leave the start room to the best first room
+        first = np.arange(len(rooms) - 1)
+        self.optimal = (weights[:, 0, 1:] + tables[:, 1 << first, first]).max(axis=1)
+
+    @classmethod
+    def build(cls, boards: dict) -> "PrefixTables":
+        """Runs one DP pass per board of a boards_N.json dict."""
+        board_ids = list(boards)
+        rooms = board_rooms(boards[board_ids[0]]["BOT"])
+        weights = np.stack([summed_matrix(boards[board_id], rooms) for board_id in board_ids])
+        tables = np.stack([completion_table(w) for w in weights])
+        return cls(rooms, board_ids, tables, weights)
+
+    def save(self, path: str):
+        """Stores the tables compactly (smallest integer type that fits) as .npz."""
+        dtype = np.int16 if self.tables.max() < np.iinfo(np.int16).max else np.int32
+        np.savez_compressed(
+            path,
+            rooms=np.array(self.rooms),
+            board_ids=np.array(self.board_ids),
+            tables=np.maximum(self.tables, np.iinfo(dtype).min).astype(dtype),
+            weights=self.weights.astype(dtype),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PrefixTables":
+        data = np.load(path)
+        return cls(
+            [str(room) for room in data["rooms"]],
+            [str(board_id) for board_id in data["board_ids"]],
+            data["tables"].astype(np.int32),
+            data["weights"].astype(np.int64),
+        )
+
+    def prefix_coins(self, board_id: str, prefix: list[str]) -> int:
+        """Coins already collected along the prefix."""
+        w = self.weights[self.board_index[str(board_id)]]
+        idx = [self.index[room] for room in prefix]
+        return int(sum(w[idx[i], idx[i + 1]] for i in range(len(idx) - 1)))
+
+    def best_completion(self, board_id: str, prefix: list[str]) -> int:
+        """
+        Most coins of any full tour that starts with prefix (a visited list like BotInstance.visited;
+        a trailing return to the start room is allowed). One table read after encoding the prefix.
+        """
+        b = self.board_index[str(board_id)]
+        rooms = prefix[:-1] if len(prefix) > 1 and prefix[-1] == self.rooms[0] else prefix
+        if len(rooms) <= 1:
+            return int(self.optimal[b])
+
+        mask = 0
+        for room in rooms[1:]:
+            mask |= 1 << (self.index[room] - 1)
+        return self.prefix_coins(board_id, rooms) + int(self.tables[b, mask, self.index[rooms[-1]] - 1])
+
+    def regret(self, board_id: str, prefix: list[str]) -> int:
+        """Coins lost so far: optimum of the board minus the best tour still reachable from prefix."""
+        return int(self.optimal[self.board_index[str(board_id)]]) - self.best_completion(board_id, prefix)
+
+
+def tables_path(boards_path: str) -> str:
+    """boards/boards_6.json -> boards/boards_6.prefix.npz"""
+    return os.path.splitext(boards_path)[0] + ".prefix.npz"
+
+
+def build_for_file(boards_path: str) -> PrefixTables:
+    """Builds and stores the prefix tables next to a boards_N.json file."""
+    with open(boards_path) as f:
+        tables = PrefixTables.build(json.load(f))
+    tables.save(tables_path(boards_path))
+    return tables
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from supplementary import prefix_tables, solve_boards
+except ImportError:  # run as a script from inside supplementary/
+    import prefix_tables
+    import solve_boards
+
+# largest board (rooms) the counting DP handles; memory grows as 2^(n-1) * (n-1) * max tour value
+MAX_PROFILE_NODES = 12
+
+
+def tour_histogram(weights: np.ndarray) -> np.ndarray:
+    """
+    Counting DP over (visited rooms, current room, coins so far): histogram[v] is the number of
+    tours from room 0 back to room 0 worth v coins. Both directions of a tour are counted, as in
+    the OPTIMAL lists. Cost is O(2^m * m^2 * V) for m = n - 1 rooms and V the largest tour value.
+    """
+    weights = weights.astype(np.int64)
+    n = len(weights)
+    if n > MAX_PROFILE_NODES:
+        raise ValueError(f"Counting tours needs at most {MAX_PROFILE_NODES} rooms")
+    m = n - 1
+    if m == 0:
+        return np.ones(1, dtype=np.int64)
+
+    inner = weights[1:, 1:]
+    max_value = int(np.sort(weights, axis=1)[:, -2:].sum() // 2 + weights.max())
+    counts = np.zeros((1 << m, m, max_value + 1), dtype=np.int64)
+    for j in range(m):
+        counts[1 << j, j, weights[0, j + 1]] = 1
+
+    masks = np.arange(1 << m)
+    popcount = np.zeros(1 << m, dtype=np.int8)
+    for j in range(m):
+        popcount += (masks >> j) & 1
+
+    for size in range(1, m):
+        layer = masks[popcount == size]
+        for j in range(m):
+            ending = layer[(layer >> j) & 1 == 1]
+            for k in range(m):
+                step = inner[j, k]
+                extend = ending[(ending >> k) & 1 == 0]
+                if k == j or len(extend) == 0:
+                    continue
+                # every path ending in j gains the j-k hallway: shift its value histogram by that many coins
+                counts[extend | (1 << k), k, step:] += counts[extend, j, : max_value + 1 - step]
+
+    histogram = np.zeros(max_value + 1, dtype=np.int64)
+    full = (1 << m) - 1
+    for j in range(m):
+        closing = weights[j + 1, 0]
+        histogram[closing:] += counts[full, j, : max_value + 1 - closing]
+    return np.trim_zeros(histogram, "b")
+
+
+def difficulty(histogram: np.ndarray) -> dict:
+    """
+    Difficulty summary of a board from its tour-value histogram: number of tours, how many are
+    optimal, the gap to the second-best tour value, and how far the optimum lies above the mean.
+    """
+    values = np.flatnonzero(histogram)
+    counts = histogram[values]
+    mean = float((values * counts).sum() / counts.sum())
+    std = float(np.sqrt(((values - mean) ** 2 * counts).sum() / counts.sum()))
+    return {
+        "TOURS": int(counts.sum()),
+        "OPTIMUM": int(values[-1]),
+        "CO-OPTIMAL": int(counts[-1]),
+        "SECOND-BEST": int(values[-2]) if len(values) > 1 else None,
+        "GAP": int(values[-1] - values[-2]) if len(values) > 1 else None,
+        "MEAN": round(mean, 2),
+        "Z-OPTIMUM": round(float(values[-1] - mean) / std, 2) if std > 0 else 0.0,
+    }
+
+
+def profile_board(setup: dict) -> dict:
+    """Difficulty summary of one BOT/USER board pair (on the summed board)."""
+    rooms = prefix_tables.board_rooms(setup["BOT"])
+    return difficulty(tour_histogram(prefix_tables.summed_matrix(setup, rooms)))
+
+
+def profile_file(path: str, workers: int) -> dict:
+    """Profiles every board of a boards_N.json file in parallel and writes DIFFICULTY next to OPTIMAL."""
+    with open(path) as f:
+        boards = json.load(f)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        summaries = dict(zip(boards, pool.map(profile_board, boards.values())))
+    for key, summary in summaries.items():
+        boards[key]["DIFFICULTY"] = summary
+    solve_boards.write_boards_json(path, boards)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write tour-value difficulty summaries into board files.")
+    parser.add_argument("files", nargs="+", help="boards_N.json files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    for path in args.files:
+        for key, summary in profile_file(path, args.workers).items():
+            print(f"{path} {key}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
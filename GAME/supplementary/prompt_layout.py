@@ -0,0 +1,41 @@
+import os
+from functools import lru_cache
+
+# inline: the system prompt as the prompt modules build it (instructions, examples, then this game's board);
+# prefix: the board section moves to the end of every request, so everything before the conversation is
+# byte-identical across games and can be served from the provider's prefix cache. e.g. LLM_PROMPT_LAYOUT=prefix
+LAYOUTS = ("inline", "prefix")
+PROMPT_LAYOUT = os.environ.get("LLM_PROMPT_LAYOUT", "inline")
+
+# the prompt modules separate the example game from this game's rooms and coins with a line "---"
+BOARD_SEPARATOR = "\n---\n"
+
+
+@lru_cache(maxsize=64)
+def split_board(prompt: str) -> tuple[str, str]:
+    """
+    A GHOST_prompt / USER_LIGHT_prompt system prompt split into its static part (task, rules and
+    example game, the same in every game) and its board section (this game's rooms and coins).
+    A prompt without a board section (e.g. get_current_ws) is all static.
+    """
+    static, separator, board = prompt.rpartition(BOARD_SEPARATOR)
+    if not separator:
+        return prompt, ""
+    return static, board
+
+
+def arrange(messages: list, layout: str | None = None) -> list:
+    """
+    The messages to send for an agent's request under layout (default: PROMPT_LAYOUT). With
+    "prefix", the system prompt is cut to its static part and the board section follows the
+    conversation as a final system message; the conversation itself is unchanged.
+    """
+    layout = PROMPT_LAYOUT if layout is None else layout
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown prompt layout {layout}, expected one of {LAYOUTS}")
+    if layout == "inline" or not messages or messages[0]["role"] != "system":
+        return messages
+    static, board = split_board(messages[0]["content"])
+    if not board:
+        return messages
+    return [{"role": "system", "content": static}] + messages[1:] + [{"role": "system", "content": board}]
@@ -0,0 +1,170 @@
+import contextvars
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# the game a call belongs to; set by game_runner for every game it plays
+current_game = contextvars.ContextVar("current_game", default=None)
+
+CHARS_PER_TOKEN = 4  # rough size of a token in English text, for estimates before the call
+
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    """Tokens a call may count against the quota before its usage is known: prompt estimate + max_tokens."""
+    return sum(len(message["content"]) for message in messages) // CHARS_PER_TOKEN + max_tokens
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst: float = 60.0):
+        """
+        A bucket that refills continuously at per_minute units per minute and holds burst seconds'
+        worth (by default one minute, so a burst can spend a full minute's budget at once).
+
+        :param per_minute: float; budget per minute (requests or tokens)
+        :param burst: float; seconds of budget the bucket holds
+        """
+        self.rate = per_minute / 60.0  # per second
+        self.capacity = self.rate * burst
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if it can be taken now); call after refill."""
+        amount = min(amount, self.capacity)  # a request larger than the bucket waits for a full bucket
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float):
+        """Returns an overestimate (e.g. tokens reserved but not used)."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class Scheduler:
+    def __init__(self, rpm: float | None = None, tpm: float | None = None, burst: float = 60.0):
+        """
+        Admits LLM calls within a requests-per-minute and a tokens-per-minute budget, shared by every
+        game of the process. Waiting calls are queued per game and admitted round-robin across
+        games, so a game with many calls cannot starve the others.
+
+        :param rpm: float; requests per minute (None: unlimited)
+        :param tpm: float; tokens per minute, prompt + completion (None: unlimited)
+        :param burst: float; seconds of budget that can be spent at once (see TokenBucket)
+        """
+        self.buckets = {}
+        if rpm:
+            self.buckets["requests"] = TokenBucket(rpm, burst)
+        if tpm:
+            self.buckets["tokens"] = TokenBucket(tpm, burst)
+        self.condition = threading.Condition()
+        self.queues = {}  # game -> deque of waiting tickets
+        self.order = deque()  # games with waiting calls, the next one to be served first
+        self.waits = []  # seconds every admitted call spent in the queue
+        self.max_depth = 0
+        self.tokens_reserved = 0
+        self.tokens_used = 0
+
+    def depth(self) -> int:
+        """Calls waiting right now."""
+        with self.condition:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def acquire(self, tokens: int, game=None) -> float:
+        """
+        Blocks until the call may be sent and reserves its budget: one request and an estimate of
+        its tokens (prompt + max_tokens, as providers count them). Returns the seconds waited.
+        """
+        if not self.buckets:
+            return 0.0
+        ticket = object()
+        start = time.monotonic()
+        with self.condition:
+            if game not in self.queues:
+                self.queues[game] = deque()
+                self.order.append(game)
+            self.queues[game].append(ticket)
+            self.max_depth = max(self.max_depth, sum(len(queue) for queue in self.queues.values()))
+
+            while True:
+                timeout = None
+                if self.order[0] == game and self.queues[game][0] is ticket:
+                    now = time.monotonic()
+                    needs = {"requests": 1, "tokens": tokens}
+                    for name, bucket in self.buckets.items():
+                        bucket.refill(now)
+                    timeout = max(bucket.wait_time(needs[name]) for name, bucket in self.buckets.items())
+                    if timeout == 0:
+                        break
+                self.condition.wait(timeout)
+
+            for name, bucket in self.buckets.items():
+                bucket.take(1 if name == "requests" else tokens)
+            self.tokens_reserved += tokens
+            self.queues[game].popleft()
+            self.order.popleft()
+            if self.queues[game]:
+                self.order.append(game)  # its next call queues behind the other games
+            else:
+                del self.queues[game]
+            waited = time.monotonic() - start
+            self.waits.append(waited)
+            self.condition.notify_all()
+        return waited
+
+    def try_acquire(self, tokens: int) -> bool:
+        """
+        Reserves a request and tokens only if no call is waiting and the budget has room right now
+        (e.g. for a hedged duplicate, which is not worth queueing for).
+        """
+        if not self.buckets:
+            return True
+        with self.condition:
+            if self.order:
+                return False
+            now = time.monotonic()
+            needs = {"requests": 1, "tokens": tokens}
+            for name, bucket in self.buckets.items():
+                bucket.refill(now)
+            if any(bucket.wait_time(needs[name]) > 0 for name, bucket in self.buckets.items()):
+                return False
+            for name, bucket in self.buckets.items():
+                bucket.take(needs[name])
+            self.tokens_reserved += tokens
+            return True
+
+    def settle(self, reserved: int, used: int | None):
+        """Gives back the reserved tokens a finished call did not use (used: its reported total)."""
+        if "tokens" not in self.buckets or used is None:
+            return
+        with self.condition:
+            self.tokens_used += used
+            if reserved > used:
+                self.buckets["tokens"].give(reserved - used)
+                self.condition.notify_all()
+
+    def summary(self) -> dict:
+        """Admitted calls, current and maximum queue depth, and mean / p50 / p95 / max seconds waited."""
+        with self.condition:
+            waits = np.array(self.waits)
+            depth = sum(len(queue) for queue in self.queues.values())
+            reserved, used = self.tokens_reserved, self.tokens_used
+        if not len(waits):
+            return {"admitted": 0, "depth": depth}
+        return {
+            "admitted": len(waits),
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "wait_mean": float(waits.mean()),
+            "wait_p50": float(np.percentile(waits, 50)),
+            "wait_p95": float(np.percentile(waits, 95)),
+            "wait_max": float(waits.max()),
+            "tokens_reserved": reserved,
+            "tokens_used": used,
+        }
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# default location of the recorded responses; shared by all games, seeds and variants on this host
+CACHE_PATH = os.environ.get(
+    "LLM_RESPONSE_CACHE", os.path.join(os.path.dirname(__file__), ".cache", "llm_responses.sqlite")
+)
+
+# off: always call the API; record: call the API and store every response;
+# replay: answer from the store only (offline); record-missing: answer from the store, call the API on a miss
+MODES = ("off", "record", "replay", "record-missing")
+
+_shared = {}
+
+
+class ReplayMiss(LookupError):
+    """A call that replay mode cannot answer: the request was never recorded."""
+
+
+def history_hash(messages: list) -> str:
+    """Content hash of a message history (roles and contents in order)."""
+    return hashlib.sha256(json.dumps(messages, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def request_key(model: str, messages: list, max_tokens: int, temperature: float, seed: int | None) -> str:
+    """
+    Content hash of a chat request: everything that determines the (seeded) response. Two calls
+    with the same key are the same request, in any game, process or run.
+    """
+    fields = [model, seed, float(temperature), max_tokens, history_hash(messages)]
+    return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str = CACHE_PATH):
+        """
+        Recorded LLM responses on disk (SQLite), keyed by request_key, shared by every process
+        that opens the same path. Nothing is evicted: a recording is what makes a batch replayable.
+
+        :param path: str; SQLite file
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.hits = 0  # calls answered from the store in this process
+        self.misses = 0  # calls that were not recorded yet
+        self.lock = threading.Lock()  # one connection shared by the games of a process (game_runner threads)
+
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")  # readers and writers in other processes do not block each other
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, seed INTEGER, content TEXT, created REAL)"
+        )
+
+    def get(self, key: str) -> str | None:
+        """The recorded response content for key, or None; counts the hit or miss."""
+        with self.lock:
+            row = self.db.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, key: str, model: str, seed: int | None, content: str):
+        """Records a response; recording the same request again replaces it."""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, model, seed, content, time.time())
+            )
+
+    def stats(self) -> dict:
+        """Hits and misses of this process and the number of recorded responses."""
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+            "entries": entries,
+        }
+
+
+def shared_cache(path: str = CACHE_PATH) -> ResponseCache:
+    """The process-wide store for path, opened on first use."""
+    if path not in _shared:
+        _shared[path] = ResponseCache(path)
+    return _shared[path]
+
+
+if __name__ == "__main__":
+    for name, value in shared_cache().stats().items():
+        print(f"{name}:\t{value}")
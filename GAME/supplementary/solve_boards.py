@@ -1,46 +1,209 @@
+import argparse
+import glob
+import hashlib
 import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
-import tsp_utils
-from AGENTS.prompts_problem_solving import BotInstance
+try:
+    from supplementary import kbest, prefix_tables, solvers, tsp_utils
+except ImportError:  # run as a script from inside supplementary/
+    import kbest
+    import prefix_tables
+    import solvers
+    import tsp_utils
 
-# import jsbeautifier
+BOARDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "boards")
 
 
-# options = jsbeautifier.default_options()
-# options.preserve_newlines = False
-# options.keep_array_indentation = False
-# options.brace_style = "collapse"
+def board_hash(setup: dict) -> str:
+    """Content hash of a BOT/USER board pair, independent of edge order and orientation."""
+    normalized = [
+        sorted([min(a, b), max(a, b), int(w)] for a, b, w in setup[role])
+        for role in ("BOT", "USER")
+    ]
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
 
-for n in range(4, 7):
-    boards = json.load(open(f"boards/boards_{n}.json"))
 
-    optimal = {}
+def read_shard(path: str):
+    """
+    Streams (board_id, setup) pairs from a shard: either a boards_N.json dict keyed by board ID,
+    or a JSONL file with one {"id": ..., "BOT": [...], "USER": [...]} object per line.
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line_number, line in enumerate(f):
+                if line.strip():
+                    setup = json.loads(line)
+                    yield f"{name}:{setup.get('id', line_number)}", setup
+    else:
+        with open(path) as f:
+            for key, setup in json.load(f).items():
+                yield f"{name}:{key}", setup
 
-    for i in range(1, 7):
-        setup = boards[str(i)]
-        bot = BotInstance(
-            BASE_PROMPT="", MODEL="", SEED=0, MAXTOKENS=0, BOARD=setup["BOT"]
-        )
-        bot.update_total_board(setup["USER"])
 
-        g = tsp_utils.board_to_graph(bot.total_board)
-        tsp_utils.validate_graph(g)
-        IBPS, IBC = tsp_utils.solve(g, get_all_tours=True)
+def read_results(path: str):
+    """Streams the JSON objects of a JSONL output file, skipping a truncated last line (interrupted run)."""
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
 
-        IBPS = [tour + [tour[0]] for tour in IBPS]
 
-        optimal[i] = {
-            "BOT": setup["BOT"],
-            "USER": setup["USER"],
-            "OPTIMAL": IBPS + [IBC],
-        }
+def open_for_append(path: str):
+    """Opens a JSONL output file for appending, first ending a truncated last line so new lines start fresh."""
+    truncated = False
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            truncated = f.read(1) != b"\n"
+    out = open(path, "a")
+    if truncated:
+        out.write("\n")
+    return out
 
-    with open(f"boards/boards_{n}.json", "w") as f:
-        f.write("{\n")
-        for i in range(1, 7):
-            f.write(f'\t"{i}": {{\n')
-            f.write(f'\t\t"BOT": {json.dumps(optimal[i]["BOT"])},\n')
-            f.write(f'\t\t"USER": {json.dumps(optimal[i]["USER"])},\n')
-            f.write(f'\t\t"OPTIMAL": {json.dumps(optimal[i]["OPTIMAL"])}\n')
-            f.write(f"\t}}{',' if i != 6 else ''}\n")
-        f.write("}\n")
+
+def solve_board(task: tuple[str, str, dict], epsilon: int | None = None) -> dict:
+    """
+    Worker: sums the two boards and finds every optimal tour (closed, i.e. ending in the start room);
+    with epsilon, also every tour within epsilon coins of the optimum (NEAR-OPTIMAL, tours + [epsilon]).
+    """
+    board_id, digest, setup = task
+    total = {}
+    for a, b, w in setup["BOT"] + setup["USER"]:
+        key = (min(a, b), max(a, b))
+        total[key] = total.get(key, 0) + int(w)
+
+    g = tsp_utils.board_to_graph([(a, b, w) for (a, b), w in total.items()])
+    tsp_utils.validate_graph(g)
+    tours, coins = solvers.solve(g, get_all_tours=True, exact=True)
+
+    result = {
+        "id": board_id,
+        "hash": digest,
+        "BOT": setup["BOT"],
+        "USER": setup["USER"],
+        "OPTIMAL": [tour + [tour[0]] for tour in tours] + [coins],
+    }
+    if epsilon is not None:
+        near = kbest.k_best_tours(g, k=None, epsilon=epsilon)
+        result["NEAR-OPTIMAL"] = [tour + [tour[0]] for tour, _ in near] + [epsilon]
+    return result
+
+
+def solved_hashes(output: str) -> set[str]:
+    """Hashes of the boards already solved in the output file (failed boards are tried again)."""
+    return {result["hash"] for result in read_results(output) if "OPTIMAL" in result}
+
+
+def run(
+    shards: list[str], output: str, workers: int, max_in_flight: int, epsilon: int | None = None
+) -> tuple[int, int]:
+    """
+    Solves every board of the shards that is not in output yet, across a process pool,
+    appending one JSON line per board as soon as it is solved. A board that cannot be solved
+    (e.g. an invalid graph) gets an {"id", "hash", "ERROR"} line instead and the run goes on.
+    Returns the number of new boards solved and failed.
+    """
+    done = solved_hashes(output)
+    tasks = (
+        (board_id, digest, setup)
+        for shard in shards
+        for board_id, setup in read_shard(shard)
+        # skip boards solved in an earlier run, and duplicates within this one
+        if (digest := board_hash(setup)) not in done and not done.add(digest)
+    )
+
+    written = failed = 0
+    with open_for_append(output) as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}  # future -> task
+        for task in tasks:
+            pending[pool.submit(solve_board, task, epsilon)] = task
+            if len(pending) >= max_in_flight:  # bounded window, so the input is never read ahead
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                written += len(finished)
+                failed += write_results(out, finished, pending)
+        written += len(pending)
+        failed += write_results(out, wait(pending).done, pending)
+    return written - failed, failed
+
+
+def write_results(out, finished, pending: dict) -> int:
+    """
+    Appends finished results to the output file and flushes, so an interrupted run loses nothing;
+    a board whose worker raised is recorded with its error. Returns the number of failed boards.
+    """
+    failed = 0
+    for future in finished:
+        board_id, digest, _ = pending.pop(future)
+        try:
+            result = future.result()
+        except Exception as error:  # one bad board must not abort the run
+            result = {"id": board_id, "hash": digest, "ERROR": repr(error)}
+            failed += 1
+            print(f"failed to solve {board_id}: {error!r}")
+        out.write(json.dumps(result) + "\n")
+    out.flush()
+    return failed
+
+
+def write_boards_json(path: str, boards: dict):
+    """Writes a boards_N.json dict with one line per field, as in the hand-edited files."""
+    entries = [
+        f'    "{key}": {{\n'
+        + ",\n".join(f"        {json.dumps(field)}: {json.dumps(value)}" for field, value in setup.items())
+        + "\n    }"
+        for key, setup in boards.items()
+    ]
+    with open(path, "w") as f:
+        f.write("{\n" + ",\n".join(entries) + "\n}\n")
+
+
+def update_json(shard: str, output: str):
+    """Writes the OPTIMAL entries from output back into a boards_N.json shard and rebuilds its prefix tables."""
+    name = os.path.splitext(os.path.basename(shard))[0]
+    results = {result["hash"]: result["OPTIMAL"] for result in read_results(output) if "OPTIMAL" in result}
+
+    with open(shard) as f:
+        boards = json.load(f)
+    for setup in boards.values():
+        setup["OPTIMAL"] = results.get(board_hash(setup), setup.get("OPTIMAL"))
+
+    write_boards_json(shard, boards)
+
+    prefix_tables.build_for_file(shard)  # best completion of every visited prefix, stored as boards_N.prefix.npz
+    print(f"updated {shard} ({name})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the optimal tours of all boards in the given shards.")
+    parser.add_argument(
+        "shards", nargs="*", help="boards_N.json or .jsonl files (default: boards/boards_*.json)"
+    )
+    parser.add_argument("--output", default=os.path.join(BOARDS_DIR, "solved_boards.jsonl"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-in-flight", type=int, default=256, help="boards queued in the pool at once")
+    parser.add_argument(
+        "--epsilon", type=int, default=None, help="also list all tours within this many coins of the optimum"
+    )
+    parser.add_argument(
+        "--update-json", action="store_true", help="write OPTIMAL back into the boards_N.json shards"
+    )
+    args = parser.parse_args()
+
+    shards = args.shards or sorted(glob.glob(os.path.join(BOARDS_DIR, "boards_*.json")))
+    solved, failed = run(shards, args.output, args.workers, args.max_in_flight, args.epsilon)
+    print(f"solved {solved} new boards -> {args.output}" + (f" ({failed} failed, see ERROR lines)" if failed else ""))
+
+    if args.update_json:
+        for shard in shards:
+            if shard.endswith(".json"):
+                update_json(shard, args.output)
+
+
+if __name__ == "__main__":
+    main()
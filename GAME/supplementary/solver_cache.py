@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import networkx as nx
+import numpy as np
+
+try:
+    from supplementary import canonical, tsp_utils
+except ImportError:  # run as a script from inside supplementary/
+    import canonical
+    import tsp_utils
+
+# default location of the cache shared by all games, seeds and variants on this host
+CACHE_PATH = os.environ.get(
+    "TSP_SOLVER_CACHE", os.path.join(os.path.dirname(__file__), ".cache", "solver_cache.sqlite")
+)
+MAX_ENTRIES = 100_000
+
+_shared = {}
+
+
+def board_key(g: nx.Graph, partial_path: list[str], get_all_tours: bool = False) -> tuple[str, list[str]]:
+    """
+    Content hash of a solver call: the known weight matrix in canonical room order, the length of
+    the visited prefix and the mode. The visited rooms keep their place and the other rooms are
+    canonicalized (canonical.canonical_order), so boards that differ only by the labels of the
+    unvisited rooms share one entry. Cached tours are stored as positions in that order.
+
+    :return key: str; hash of the call
+    :return rooms: list[str]; the rooms of g in canonical order (to map cached tours back)
+    """
+    prefix = list(partial_path or ["L"])
+    nodelist, weights = tsp_utils.weight_matrix(g)
+    first = [nodelist.index(room) for room in prefix] + [i for i, room in enumerate(nodelist) if room not in prefix]
+    weights = weights[np.ix_(first, first)].astype(np.int64)
+    order = canonical.canonical_order(weights, fixed=len(prefix))
+    rooms = [nodelist[first[i]] for i in order]
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([len(rooms), len(prefix), get_all_tours]).encode())
+    digest.update(weights[np.ix_(order, order)].tobytes())
+    return digest.hexdigest(), rooms
+
+
+def to_positions(result: tuple, rooms: list[str], get_all_tours: bool) -> tuple:
+    """A solver result with its tour(s) written as positions in rooms, the form stored in the cache."""
+    index = {room: i for i, room in enumerate(rooms)}
+    tours, coins = result
+    if get_all_tours:
+        return [[index[room] for room in tour] for tour in tours], coins
+    return [index[room] for room in tours], coins
+
+
+def from_positions(result: tuple, rooms: list[str], get_all_tours: bool) -> tuple:
+    """Inverse of to_positions: the cached tour(s) in the room labels of the current board."""
+    tours, coins = result
+    if get_all_tours:
+        return [[rooms[i] for i in tour] for tour in tours], coins
+    return [rooms[i] for i in tours], coins
+
+
+class SolverCache:
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        """
+        A content-addressed store of solver results on disk (SQLite), shared by every process
+        that opens the same path. Least recently used entries are evicted beyond max_entries.
+
+        :param path: str; SQLite file
+        :param max_entries: int; number of results kept
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0  # lookups answered from the cache in this process
+        self.misses = 0  # lookups that had to be solved in this process
+        self.lock = threading.Lock()  # one connection shared by the games of a process (game_runner threads)
+
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")  # readers and writers in other processes do not block each other
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT, last_used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_lru ON results (last_used)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+        self.db.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+
+    def get(self, key: str):
+        """Returns the cached (tour(s), coins) for key, or None; counts the hit or miss."""
+        with self.lock:
+            row = self.db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self.db.execute("UPDATE stats SET value = value + 1 WHERE name = 'misses'")
+                return None
+
+            self.hits += 1
+            self.db.execute("UPDATE stats SET value = value + 1 WHERE name = 'hits'")
+            self.db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        tours, coins = json.loads(row[0])
+        return tours, coins
+
+    def put(self, key: str, result: tuple):
+        """Stores a solver result and evicts the least recently used entries beyond max_entries."""
+        tours, coins = result
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                (key, json.dumps([tours, int(coins)]), time.time()),
+            )
+            excess = self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.db.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+
+    def stats(self) -> dict:
+        """Hit/miss counters of this process and of every process that used the cache file."""
+        with self.lock:
+            totals = dict(self.db.execute("SELECT name, value FROM stats").fetchall())
+            entries = self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+            "total_hits": totals["hits"],
+            "total_misses": totals["misses"],
+            "total_hit_rate": totals["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+def shared_cache(path: str = CACHE_PATH) -> SolverCache:
+    """The process-wide cache for path, opened on first use."""
+    if path not in _shared:
+        _shared[path] = SolverCache(path)
+    return _shared[path]
+
+
+if __name__ == "__main__":
+    for name, value in shared_cache().stats().items():
+        print(f"{name}:\t{value}")
@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+
+import networkx as nx
+
+try:
+    from supplementary import heuristics, solver_cache, tsp_utils
+except ImportError:  # run as a script from inside supplementary/
+    import heuristics
+    import solver_cache
+    import tsp_utils
+
+try:
+    import gurobipy
+except ImportError:  # the ILP backends are optional
+    gurobipy = None
+else:
+    try:
+        from supplementary import ilp_solver
+    except ImportError:  # run as a script from inside supplementary/
+        import ilp_solver
+
+# per-host calibration written by `python benchmark_solvers.py --calibrate`
+CALIBRATION_PATH = os.environ.get(
+    "TSP_SOLVER_CALIBRATION", os.path.join(os.path.dirname(__file__), "solver_calibration.json")
+)
+
+# largest problem size (rooms not yet fixed by the partial path, plus the start room) a backend
+# is tried on when no calibration is available; None means no limit
+DEFAULT_MAX_SIZE = {
+    "vectorized": tsp_utils.MAX_VECTORIZED_ROOMS + 1,
+    "dp": 18,
+    "ilp": 60,
+    "brute_force": 9,
+    "heuristic": None,
+}
+# order in which exact backends are preferred when no calibration is available
+DEFAULT_PREFERENCE = ["vectorized", "dp", "ilp", "brute_force"]
+
+# errors that mean a backend cannot take this problem on this host (no Gurobi license, a model
+# too large for the license, tables that do not fit in memory); the next candidate is tried.
+# Any other error is a bug or bad input and is raised.
+UNAVAILABLE = (MemoryError,) + ((gurobipy.GurobiError,) if gurobipy is not None else ())
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {}
+_calibration = None
+_ilp_licensed = None
+
+
+def register_backend(
+    name: str, solve, exact: bool = True, all_tours: bool = True, requires_gurobi: bool = False
+):
+    """
+    Adds a solver to the registry.
+
+    :param name: str; key used in calibration files and for explicit selection
+    :param solve: callable (g, partial_path, get_all_tours) -> (tour(s), coins)
+    :param exact: bool; whether solve always returns an optimal tour
+    :param all_tours: bool; whether solve can return every co-optimal tour
+    :param requires_gurobi: bool; whether solve needs a licensed gurobipy installation
+    """
+    BACKENDS[name] = {
+        "solve": solve,
+        "exact": exact,
+        "all_tours": all_tours,
+        "requires_gurobi": requires_gurobi,
+    }
+
+
+def ilp_available() -> bool:
+    """Checks once per process whether gurobipy is installed and a license can be obtained."""
+    global _ilp_licensed
+    if _ilp_licensed is None:
+        _ilp_licensed = False
+        if gurobipy is not None:
+            try:
+                with gurobipy.Env(empty=True) as env:
+                    env.setParam("OutputFlag", 0)
+                    env.start()
+                _ilp_licensed = True
+            except gurobipy.GurobiError:
+                pass
+    return _ilp_licensed
+
+
+def is_available(name: str) -> bool:
+    """Whether the named backend can run in this process."""
+    return name in BACKENDS and (not BACKENDS[name]["requires_gurobi"] or ilp_available())
+
+
+def load_calibration() -> dict:
+    """Reads the host calibration ({"max_size": {...}, "preference": {size: [...]}}), if there is one."""
+    global _calibration
+    if _calibration is None:
+        _calibration = {}
+        if os.path.exists(CALIBRATION_PATH):
+            with open(CALIBRATION_PATH) as f:
+                _calibration = json.load(f)
+    return _calibration
+
+
+def problem_size(g: nx.Graph, partial_path: list[str]) -> int:
+    """Rooms the solver still has to order, counting the start room (= number of rooms for ["L"])."""
+    return g.number_of_nodes() - len(partial_path or ["L"]) + 1
+
+
+def candidates(size: int, get_all_tours: bool = False, exact: bool = True) -> list[str]:
+    """
+    Backends to try for a problem of the given size, fastest first. The calibrated order for
+    this size is used when the host has been calibrated, the default order otherwise; the
+    heuristic is appended as last resort unless an exact answer is required.
+    """
+    calibration = load_calibration()
+    max_size = {**DEFAULT_MAX_SIZE, **calibration.get("max_size", {})}
+    preference = calibration.get("preference", {}).get(str(size), DEFAULT_PREFERENCE)
+    names = [name for name in preference if name in BACKENDS] + [
+        name for name in DEFAULT_PREFERENCE if name not in preference and name in BACKENDS
+    ]
+    if not exact:
+        names.append("heuristic")
+
+    return [
+        name
+        for name in names
+        if is_available(name)
+        and (max_size.get(name) is None or size <= max_size[name])
+        and (BACKENDS[name]["all_tours"] or not get_all_tours)
+    ]
+
+
+def select_backend(g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False) -> str:
+    """Name of the backend solve() would use first for this graph and partial path."""
+    names = candidates(problem_size(g, partial_path), get_all_tours, exact=False)
+    if not names:
+        raise RuntimeError("No solver backend available")
+    return names[0]
+
+
+def solve(
+    g: nx.Graph,
+    partial_path: list[str] = ["L"],
+    get_all_tours: bool = False,
+    backend: str | None = None,
+    exact: bool = False,
+) -> tuple[list[str], int] | tuple[list[list[str]], int]:
+    """
+    Find the longest path in a complete graph that starts with partial_path, using the fastest
+    available backend for its size. If a backend is unavailable for the problem (UNAVAILABLE, e.g.
+    the Gurobi license does not cover the model size), the next candidate is tried, with a warning.
+
+    :param backend: str; force a specific backend instead of choosing by size
+    :param exact: bool; never fall back to the heuristic
+    """
+    names = [backend] if backend else candidates(problem_size(g, partial_path), get_all_tours, exact)
+    errors = []
+    for name in names:
+        try:
+            return BACKENDS[name]["solve"](g, partial_path, get_all_tours)
+        except UNAVAILABLE as error:  # try the next backend
+            logger.warning("solver backend %s unavailable (%r), trying the next one", name, error)
+            errors.append(f"{name}: {error!r}")
+    raise RuntimeError(f"No solver backend could solve the board ({'; '.join(errors)})")
+
+
+class SolverSession:
+    def __init__(self, cache=None):
+        """
+        Per-agent front end of the registry (one per BotInstance). Boards are dispatched like solve(),
+        except that the ILP backend keeps one persistent model (ilp_solver.ILPSession) between calls.
+
+        :param cache: solver_cache.SolverCache; optional store of exact results shared across games
+        """
+        self.ilp = None
+        self.cache = cache
+        self.last_backend = None  # name of the backend that produced the latest result ("cache" for hits)
+
+    def solve(
+        self, g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False
+    ) -> tuple[list[str], int] | tuple[list[list[str]], int]:
+        """Same contract as solve()."""
+        if self.cache is not None:
+            key, rooms = solver_cache.board_key(g, partial_path, get_all_tours)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.last_backend = "cache"
+                return solver_cache.from_positions(cached, rooms, get_all_tours)
+
+        errors = []
+        for name in candidates(problem_size(g, partial_path), get_all_tours, exact=False):
+            try:
+                if name == "ilp":
+                    if self.ilp is None:
+                        self.ilp = ilp_solver.ILPSession()
+                    result = self.ilp.solve(g, partial_path, get_all_tours)
+                else:
+                    result = BACKENDS[name]["solve"](g, partial_path, get_all_tours)
+            except UNAVAILABLE as error:  # try the next backend
+                logger.warning("solver backend %s unavailable (%r), trying the next one", name, error)
+                errors.append(f"{name}: {error!r}")
+                continue
+
+            self.last_backend = name
+            if self.cache is not None and BACKENDS[name]["exact"]:
+                self.cache.put(key, solver_cache.to_positions(result, rooms, get_all_tours))
+            return result
+        raise RuntimeError(f"No solver backend could solve the board ({'; '.join(errors)})")
+
+    def close(self):
+        """Frees the persistent ILP model, if one was built (its Gurobi environment holds a license token)."""
+        if self.ilp is not None:
+            self.ilp.close()
+            self.ilp = None
+
+    def __enter__(self) -> "SolverSession":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+register_backend(
+    "brute_force", lambda g, pp, all_tours: tsp_utils.solve(g, pp, all_tours, engine="python")
+)
+register_backend("vectorized", tsp_utils.solve_vectorized)
+register_backend("dp", tsp_utils.solve_dp)
+register_backend("ilp", ilp_solver.solve_dfj if gurobipy else None, requires_gurobi=True)
+register_backend("heuristic", heuristics.solve_anytime, exact=False, all_tours=False)
@@ -1,27 +1,60 @@
+import os
 from itertools import permutations
 
 import networkx as nx
+import numpy as np
+
+try:
+    from supplementary.board import Board
+except ImportError:  # run as a script from inside supplementary/
+    from board import Board
+
+# sentinel for unreachable DP states; far below any reachable tour value but safe from int32 overflow
+_UNREACHABLE = -(2**30)
+
+# largest number of free rooms the vectorized engine enumerates (9 free rooms = 10-room board)
+MAX_VECTORIZED_ROOMS = 9
+
+# directory for the memory-mapped permutation tables, shared by every process on the host
+PERMUTATION_CACHE = os.environ.get(
+    "TSP_PERMUTATION_CACHE", os.path.join(os.path.dirname(__file__), ".cache", "permutations")
+)
+_permutation_tables: dict[tuple[int, bool], np.ndarray] = {}
 
 
 def board_to_graph(board: list[tuple[str, str, int]]) -> nx.Graph:
-    """Converts a board (list of edges) to a graph."""
+    """Converts a board (list of edges) to a graph. Board.from_triples gives the matrix-backed equivalent."""
     graph = nx.Graph()
     for edge in board:
         graph.add_edge(edge[0], edge[1], weight=edge[2])
     return graph
 
 
-def is_complete(g: nx.Graph) -> bool:
+def is_complete(g: nx.Graph | Board) -> bool:
     """Checks whether g is a complete graph."""
+    if isinstance(g, Board):
+        return g.is_complete()
     n = len(g.nodes)
     return g.number_of_edges() == n * (n - 1) // 2
 
 
-def validate_graph(g: nx.Graph):
+def weight_matrix(g: nx.Graph | Board) -> tuple[list[str], np.ndarray]:
+    """Returns the node list of g and the matching symmetric integer weight matrix."""
+    if isinstance(g, Board):  # already a matrix: no conversion
+        return list(g.rooms), g.weights
+    nodelist = list(g.nodes)
+    weights = nx.to_numpy_array(g, nodelist=nodelist, weight="weight", dtype=np.int64)
+    return nodelist, weights
+
+
+def validate_graph(g: nx.Graph | Board):
     """
     Checks that the graph is valid for TSP.
     In other words, checks that it is complete and has positive edge weights.
     """
+    if isinstance(g, Board):
+        g.validate()
+        return
     if not is_complete(g):
         raise ValueError("Graph must be complete")
     for _, _, weight in g.edges(data="weight"):
@@ -29,22 +62,57 @@ def validate_graph(g: nx.Graph):
             raise ValueError("Edge weights must be positive")
 
 
+def permutation_table(m: int, drop_mirrors: bool = False) -> np.ndarray:
+    """
+    Returns all permutations of range(m) as a read-only (m!, m) uint8 array.
+    With drop_mirrors, only one of each permutation and its reverse is kept.
+    The table is written once to PERMUTATION_CACHE and memory-mapped afterwards,
+    so worker processes share the same pages instead of each building a copy.
+    """
+    key = (m, drop_mirrors)
+    if key not in _permutation_tables:
+        path = os.path.join(PERMUTATION_CACHE, f"perm_{m}{'_half' if drop_mirrors else ''}.npy")
+        if not os.path.exists(path):
+            table = np.array(list(permutations(range(m))), dtype=np.uint8).reshape(-1, m)
+            if drop_mirrors and m > 1:
+                table = table[table[:, 0] < table[:, -1]]
+            os.makedirs(PERMUTATION_CACHE, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, table)
+            os.replace(tmp_path, path)  # atomic, so concurrent writers never expose a partial table
+        _permutation_tables[key] = np.load(path, mmap_mode="r")
+    return _permutation_tables[key]
+
+
 def solve(
-    g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False
+    g: nx.Graph,
+    partial_path: list[str] = ["L"],
+    get_all_tours: bool = False,
+    engine: str = "vectorized",
 ) -> tuple[list[str], int] | tuple[list[list[str]], int]:
-    """Find the longest path in a complete graph that starts with partial_path."""
+    """
+    Find the longest path in a complete graph that starts with partial_path.
+    engine selects the exhaustive enumeration: "vectorized" (NumPy, used up to
+    MAX_VECTORIZED_ROOMS free rooms) or "python" (the original permutation loop).
+    """
     start_node = partial_path[0] if partial_path else "L"
     remaining_nodes = [
         node for node in g.nodes if node not in partial_path and node != start_node
     ]
 
+    if engine == "vectorized" and len(remaining_nodes) <= MAX_VECTORIZED_ROOMS:
+        return solve_vectorized(g, partial_path, get_all_tours)
+
     best_tours: list[list[str]] = []
     best_distance = 0
 
+    nodelist, weights = weight_matrix(g)
     weight_dict = {
-        (e[1], e[0]) if flip else e: w
-        for e, w in nx.get_edge_attributes(g, "weight").items()
-        for flip in range(2)
+        (a, b): int(weights[i, j])
+        for i, a in enumerate(nodelist)
+        for j, b in enumerate(nodelist)
+        if i != j
     }
 
     for perm in permutations(remaining_nodes):
@@ -60,9 +128,125 @@ def solve(
             best_distance = distance
             best_tours = [ordering[:-1]]
         elif get_all_tours and distance == best_distance:
-            best_tours.append(ordering)
+            best_tours.append(ordering[:-1])
 
     if best_tours == []:
         raise RuntimeError("No valid tour found")
 
     return best_tours if get_all_tours else best_tours[0], best_distance
+
+
+def solve_vectorized(
+    g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False
+) -> tuple[list[str], int] | tuple[list[list[str]], int]:
+    """
+    Find the longest path in a complete graph that starts with partial_path.
+    Scores every completion at once: the edges of all tours are gathered from the
+    weight matrix and summed in one pass. When only the start room is fixed,
+    mirror-image tours have the same value and only one of each pair is scored.
+    """
+    nodelist, weights = weight_matrix(g)
+    index = {node: i for i, node in enumerate(nodelist)}
+    prefix = [index[node] for node in (partial_path or ["L"])]
+    remaining = np.array([i for i in range(len(nodelist)) if i not in prefix], dtype=np.intp)
+    last, start = prefix[-1], prefix[0]
+
+    prefix_distance = int(sum(weights[prefix[i], prefix[i + 1]] for i in range(len(prefix) - 1)))
+    head = [nodelist[i] for i in prefix]
+
+    if len(remaining) == 0:
+        distance = prefix_distance + int(weights[last, start]) if len(prefix) > 1 else 0
+        return ([head] if get_all_tours else head), distance
+
+    mirrored = len(prefix) == 1
+    table = permutation_table(len(remaining), drop_mirrors=mirrored)
+    inner = weights[np.ix_(remaining, remaining)]
+
+    distances = (
+        weights[last, remaining][table[:, 0]]
+        + inner[table[:, :-1], table[:, 1:]].sum(axis=1)
+        + weights[remaining, start][table[:, -1]]
+    )
+    best_distance = int(distances.max())
+
+    rows = np.flatnonzero(distances == best_distance) if get_all_tours else [int(distances.argmax())]
+    best_tours = []
+    for row in rows:
+        completion = [nodelist[i] for i in remaining[table[row]]]
+        best_tours.append(head + completion)
+        if get_all_tours and mirrored and len(completion) > 1:
+            best_tours.append(head + completion[::-1])
+
+    return best_tours if get_all_tours else best_tours[0], prefix_distance + best_distance
+
+
+def solve_dp(
+    g: nx.Graph, partial_path: list[str] = ["L"], get_all_tours: bool = False
+) -> tuple[list[str], int] | tuple[list[list[str]], int]:
+    """
+    Find the longest path in a complete graph that starts with partial_path.
+    Exact Held-Karp dynamic program over bitmasks of the rooms not yet in partial_path,
+    so the cost is O(2^m * m^2) for m remaining rooms instead of O(m!).
+    Tours are returned without the closing start node, like solve.
+    """
+    nodelist, weights = weight_matrix(g)
+    index = {node: i for i, node in enumerate(nodelist)}
+    prefix = [index[node] for node in (partial_path or ["L"])]
+    remaining = [i for i in range(len(nodelist)) if i not in prefix]
+    m = len(remaining)
+
+    prefix_distance = int(sum(weights[prefix[i], prefix[i + 1]] for i in range(len(prefix) - 1)))
+    last, start = prefix[-1], prefix[0]
+
+    if m == 0:
+        distance = prefix_distance + int(weights[last, start]) if len(prefix) > 1 else 0
+        tour = [nodelist[i] for i in prefix]
+        return ([tour] if get_all_tours else tour), distance
+
+    # best[mask, j]: most coins on a path leaving the last prefix room, visiting the
+    # remaining rooms in mask exactly once and ending in remaining room j
+    inner = weights[np.ix_(remaining, remaining)].astype(np.int32)
+    best = np.full((1 << m, m), _UNREACHABLE, dtype=np.int32)
+    for j in range(m):
+        best[1 << j, j] = weights[last, remaining[j]]
+
+    masks = np.arange(1 << m)
+    popcount = np.zeros(1 << m, dtype=np.int8)
+    for j in range(m):
+        popcount += (masks >> j) & 1
+
+    for size in range(2, m + 1):
+        layer = masks[popcount == size]
+        for j in range(m):
+            ending = layer[(layer >> j) & 1 == 1]
+            previous = ending ^ (1 << j)
+            # rooms outside previous are unreachable there, so they never win the max
+            best[ending, j] = (best[previous] + inner[:, j]).max(axis=1)
+
+    full = (1 << m) - 1
+    closing = best[full] + weights[remaining, start].astype(np.int32)
+    best_distance = int(closing.max())
+
+    def backtrack(mask: int, j: int) -> list[list[int]]:
+        """Recovers every optimal room sequence (ending in j) that realises best[mask, j]."""
+        rest = mask ^ (1 << j)
+        if rest == 0:
+            return [[j]]
+        target = best[mask, j]
+        sequences = []
+        for k in range(m):
+            if rest >> k & 1 and best[rest, k] + inner[k, j] == target:
+                sequences += [seq + [j] for seq in backtrack(rest, k)]
+                if not get_all_tours:
+                    break
+        return sequences
+
+    head = [nodelist[i] for i in prefix]
+    best_tours = []
+    for j in np.flatnonzero(closing == best_distance):
+        for seq in backtrack(full, int(j)):
+            best_tours.append(head + [nodelist[remaining[k]] for k in seq])
+        if not get_all_tours:
+            break
+
+    return best_tours if get_all_tours else best_tours[0], prefix_distance + best_distance
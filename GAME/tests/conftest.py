@@ -0,0 +1,22 @@
+import pytest
+
+from supplementary import llm_client, mock_llm
+
+
+@pytest.fixture
+def mock_endpoint(tmp_path):
+    """
+    llm_client pointed at a mock server on a free port, with the response cache in tmp_path;
+    every client setting a test changes is restored afterwards.
+    """
+    mock = mock_llm.MockLLM()
+    server = mock_llm.serve(mock, port=0)
+    saved = {name: value for name, value in vars(llm_client).items() if name.isupper()}
+    llm_client.configure(
+        BASE_URL=f"http://{mock_llm.HOST}:{server.server_address[1]}/v1", OPENAI_API_KEY="mock",
+        CACHE_PATH=str(tmp_path / "responses.sqlite"),
+    )
+    yield mock
+    llm_client.configure(**saved)
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,39 @@
+import glob
+import json
+import math
+import os
+
+import pytest
+
+from supplementary import profiler
+from supplementary.board import Board
+
+BOARD_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "supplementary", "boards", "boards_*.json")))
+
+
+def boards():
+    for path in BOARD_FILES:
+        with open(path) as f:
+            for key, setup in json.load(f).items():
+                yield pytest.param(setup, id=f"{os.path.basename(path)}:{key}")
+
+
+@pytest.mark.parametrize("setup", list(boards()))
+def test_optimal_tours_match_the_difficulty_profile(setup):
+    joint = Board.from_triples(setup["BOT"]) + Board.from_triples(setup["USER"])
+    *tours, coins = setup["OPTIMAL"]
+    assert all(joint.path_coins(tour) == coins for tour in tours)
+    if "DIFFICULTY" in setup:
+        assert setup["DIFFICULTY"]["OPTIMUM"] == coins
+        assert setup["DIFFICULTY"]["CO-OPTIMAL"] == len(tours)
+
+
+@pytest.mark.parametrize("setup", list(boards()))
+def test_the_profiler_counts_every_tour_and_the_optimal_ones(setup):
+    summary = profiler.profile_board(setup)
+    *tours, coins = setup["OPTIMAL"]
+    rooms = len(tours[0]) - 1
+    assert summary["TOURS"] == math.factorial(rooms - 1)  # both directions, as in the OPTIMAL lists
+    assert (summary["OPTIMUM"], summary["CO-OPTIMAL"]) == (coins, len(tours))
+    if "DIFFICULTY" in setup:
+        assert summary == setup["DIFFICULTY"]
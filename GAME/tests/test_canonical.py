@@ -0,0 +1,84 @@
+import json
+import os
+import random
+import time
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from supplementary import canonical, solver_cache
+
+BOARDS = os.path.join(os.path.dirname(__file__), "..", "supplementary", "boards", "boards_6.json")
+
+
+def relabelled(setup: dict, rng: random.Random) -> tuple[dict, dict]:
+    """The board with its non-start rooms shuffled, and the shuffle."""
+    rooms = sorted({room for a, b, _ in setup["BOT"] for room in (a, b)} - {"L"})
+    mapping = dict(zip(rooms, rng.sample(rooms, len(rooms))), L="L")
+    return {role: [[mapping[a], mapping[b], w] for a, b, w in setup[role]] for role in ("BOT", "USER")}, mapping
+
+
+@pytest.fixture(scope="module")
+def boards() -> dict:
+    with open(BOARDS) as f:
+        return json.load(f)
+
+
+def test_relabelled_boards_share_the_hash(boards):
+    rng = random.Random(0)
+    for setup in boards.values():
+        digest, relabel = canonical.board_hash(setup)
+        shuffled, mapping = relabelled(setup, rng)
+        other, other_relabel = canonical.board_hash(shuffled)
+        assert other == digest
+        # both relabel maps lead to the same canonical board
+        for role in ("BOT", "USER"):
+            ours = {frozenset((relabel[a], relabel[b])): w for a, b, w in setup[role]}
+            theirs = {frozenset((other_relabel[mapping[a]], other_relabel[mapping[b]])): w for a, b, w in setup[role]}
+            assert ours == theirs
+
+
+def test_relabel_tour_round_trip(boards):
+    _, relabel = canonical.board_hash(boards["1"])
+    tour = boards["1"]["OPTIMAL"][0]
+    assert canonical.relabel_tour(canonical.relabel_tour(tour, relabel), canonical.invert(relabel)) == tour
+
+
+def test_canonical_order_keeps_the_prefix_and_ignores_labels():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n, fixed = int(rng.integers(4, 9)), int(rng.integers(1, 3))
+        codes = np.triu(rng.integers(0, 3, (n, n)), 1)
+        codes = codes + codes.T
+        perm = list(range(fixed)) + list(fixed + rng.permutation(n - fixed))
+        shuffled = codes[np.ix_(perm, perm)]
+        order, other = canonical.canonical_order(codes, fixed), canonical.canonical_order(shuffled, fixed)
+        assert order[:fixed] == list(range(fixed))
+        assert codes[np.ix_(order, order)].tobytes() == shuffled[np.ix_(other, other)].tobytes()
+
+
+def test_symmetric_boards_are_fast():
+    for n in (9, 12):
+        codes = np.ones((n, n), dtype=np.int64) - np.eye(n, dtype=np.int64)  # every hallway equal
+        start = time.perf_counter()
+        order = canonical.canonical_order(codes)
+        assert sorted(order) == list(range(n)) and time.perf_counter() - start < 1.0
+
+
+def test_search_budget_falls_back_to_a_valid_order():
+    codes = np.ones((8, 8), dtype=np.int64) - np.eye(8, dtype=np.int64)
+    order = canonical.canonical_order(codes, fixed=2, max_leaves=1)
+    assert order[:2] == [0, 1] and sorted(order) == list(range(8))
+
+
+def test_cache_key_ignores_unvisited_labels():
+    rng = random.Random(1)
+    g = nx.complete_graph(["L", "E", "B", "K", "C", "A"])
+    for a, b in g.edges:
+        g[a][b]["weight"] = rng.randint(1, 3)
+    mapping = {"L": "L", "E": "E", "B": "K", "K": "C", "C": "A", "A": "B"}
+    key, rooms = solver_cache.board_key(g, ["L", "E"])
+    other, other_rooms = solver_cache.board_key(nx.relabel_nodes(g, mapping), ["L", "E"])
+    assert other == key
+    assert other_rooms[:2] == rooms[:2] == ["L", "E"]
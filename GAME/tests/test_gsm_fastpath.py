@@ -0,0 +1,103 @@
+import pytest
+
+from AGENTS.prompts_problem_solving import get_current_ws
+from supplementary import gsm_fastpath
+
+LEXICON = gsm_fastpath.lexicon_from_prompt(get_current_ws(6))
+
+# the example messages of the GSM prompt (prompts_problem_solving.get_current_ws): message, OWS, Loc, World, NWS
+PROMPT_EXAMPLES = [
+    (
+        "Hello! To get started and find our best path, could you share the number of ghost coins between the living room and each adjacent room? I can get 6 light coins going to the bathroom, 5 to the kitchen, 4 to the children's room, 3 to the sixth room, and only 1 to the empty room. Let me know what you see, so we can decide the best initial move!",
+        [], "L", "LIGHT", [["L", "B", 6], ["L", "K", 5], ["L", "C", 4], ["L", "E", 1], ["L", "A", 3]],
+    ),
+    (
+        "Great, we've got a good start to the bathroom. Now, considering our next move from the bathroom, I could collect 2 going to the empty room, 4 to the kitchen, 2 to the children's room, and 3 to the attic. How many coins could you collect on those routes? Let me know, and we can chart our best course forward!",
+        [], "B", "GHOST", [["B", "E", 2], ["B", "K", 4], ["B", "C", 2], ["B", "A", 3]],
+    ),
+    (
+        "Now that we're going to the kitchen, for our subsequent step, I could collect 6 coins going to the empty room, 1 to the children's room, and 2 to the attic. How many ghost coins could you gather on those paths? Let me know, and we can decide our next best move!",
+        [], "K", "LIGHT", [["K", "E", 6], ["K", "C", 1], ["K", "A", 2]],
+    ),
+    (
+        "Next up, considering our path from the empty room, you say you can collect 1 coin heading to the children's room and 5 to the attic. I can get get 2 between EC and 3 between EA. Does this change anything for you?",
+        [], "E", "GHOST", [["E", "C", 1], ["E", "A", 5]],
+    ),
+    (
+        "From the attic, our best remaining path is to move to the children's room, collecting 6 coins, and then return to the living room with an additional 4 coins. This should finalize our journey efficiently. Are you ready for us to complete the sequence?",
+        [["L", "C", 4]], "A", "GHOST", [["A", "C", 6]],
+    ),
+]
+
+
+def extract(message, ows=(), loc="L", world="LIGHT"):
+    return gsm_fastpath.extract(message, list(ows), loc, world, *LEXICON)
+
+
+def hallways(nws: list) -> set:
+    return {(frozenset((a, b)), w) for a, b, w in nws}
+
+
+def test_lexicon_names_every_room():
+    lexicon, codes = LEXICON
+    assert codes == ("A", "B", "C", "E", "K", "L")
+    assert lexicon["bathroom"] == "B" and lexicon["spooky bathroom"] == "B" and lexicon["empty room"] == "E"
+    assert "room" not in lexicon
+
+
+@pytest.mark.parametrize("message, ows, loc, world, expected", PROMPT_EXAMPLES)
+def test_prompt_examples_are_read_or_left_to_the_llm(message, ows, loc, world, expected):
+    """A confident reading must be the prompt's answer; anything else goes to the LLM with the default threshold."""
+    nws, confidence = extract(message, ows, loc, world)
+    if confidence >= gsm_fastpath.CONFIDENCE:
+        assert hallways(nws) == hallways(expected)
+
+
+def test_prompt_examples_with_one_origin_are_confident():
+    for message, ows, loc, world, expected in PROMPT_EXAMPLES[1:3]:
+        assert extract(message, ows, loc, world) == (expected, 1.0)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "i get 10 coins if we go to the kitchen first, then 2 to the attic",
+        "I get 2 coins to the attic. From there 5 to the kitchen.",
+        "Let's go to the kitchen, I get 3 to the attic.",
+        "In total we would collect 15 coins on the path L-B-K.",
+    ],
+)
+def test_routes_and_sums_are_not_confident(message):
+    nws, confidence = extract(message)
+    assert confidence < 1.0
+    assert ["L", "A", 2] not in nws[1:] and ["L", "K", 5] not in nws and ["L", "A", 3] not in nws
+
+
+def test_hallway_codes_anchors_and_known_values():
+    assert extract("My coins from L: L-B: 6, L-K: 5, L-E: 2. Let's go to K.", [["L", "B", 6]]) == (
+        [["L", "K", 5], ["L", "E", 2]],
+        1.0,
+    )
+    assert extract("From the kitchen I get three coins to the attic and one to the dark, spooky bathroom.", loc=None) == (
+        [["K", "A", 3], ["K", "B", 1]],
+        1.0,
+    )
+    assert extract("We are done, our path is ['L', 'B', 'L'].") == ([], 1.0)
+
+
+def test_infer_only_reads_symbolically_with_the_fast_path_on(monkeypatch):
+    def broken(*args):
+        raise AssertionError("extract ran with the fast path off")
+
+    monkeypatch.setattr(gsm_fastpath, "extract", broken)
+    monkeypatch.setattr(gsm_fastpath, "FASTPATH", False)
+    assert gsm_fastpath.infer("6 to the bathroom", [], "L", "LIGHT", get_current_ws(6), lambda: "[NWS]: []") == "[NWS]: []"
+
+
+def test_infer_falls_back_below_the_threshold(monkeypatch):
+    monkeypatch.setattr(gsm_fastpath, "FASTPATH", True)
+    monkeypatch.setattr(gsm_fastpath, "CONFIDENCE", 1.0)
+    prompt, llm = get_current_ws(6), lambda: "[Thought]: llm\n[NWS]: []"
+    assert gsm_fastpath.infer("I get 2 coins to the attic. From there 5 to the kitchen.", [], "L", "LIGHT", prompt, llm) == llm()
+    output = gsm_fastpath.infer("I get 2 coins to the attic.", [], "L", "LIGHT", prompt, llm)
+    assert gsm_fastpath.parse_nws(output) == [["L", "A", 2]]
@@ -0,0 +1,32 @@
+import time
+
+import networkx as nx
+import numpy as np
+
+from supplementary import heuristics, tsp_utils
+
+
+def random_board(n: int, seed: int = 0) -> nx.Graph:
+    rng = np.random.default_rng(seed)
+    rooms = ["L"] + [f"R{i}" for i in range(1, n)]
+    return tsp_utils.board_to_graph(
+        [(a, b, int(rng.integers(1, 10))) for i, a in enumerate(rooms) for b in rooms[i + 1 :]]
+    )
+
+
+def test_local_search_stops_at_the_deadline():
+    g = random_board(200)
+    for budget in (0, 0.05):
+        start = time.perf_counter()
+        report = heuristics.anytime_search(g, ["L"], time_budget=budget)
+        assert time.perf_counter() - start < budget + 0.5
+        assert sorted(report["tour"]) == sorted(g.nodes) and report["tour"][0] == "L"
+
+
+def test_heuristic_tours_are_valid_and_never_beat_the_optimum():
+    for seed in range(5):
+        g = random_board(8, seed)
+        _, optimum = tsp_utils.solve_dp(g, ["L", "R3"])
+        tour, coins = heuristics.solve_heuristic(g, ["L", "R3"])
+        assert tour[:2] == ["L", "R3"] and sorted(tour) == sorted(g.nodes)
+        assert coins <= optimum <= heuristics.anytime_search(g, ["L", "R3"], time_budget=0)["bound"]
@@ -0,0 +1,68 @@
+from supplementary import history
+
+
+def conversation(turns: int) -> list:
+    """A msg_history with `turns` finished exchanges and the current input."""
+    messages = [{"role": "system", "content": "rules and board"}]
+    for turn in range(1, turns + 1):
+        messages.append({"role": "user", "content": f"[World-state-own] ...\n[Observation] partner message {turn}"})
+        messages.append({"role": "assistant", "content": f"[Thought] ...\n[Action]: visit(\"{turn}\")\n[Message]: hi"})
+    messages.append({"role": "user", "content": "[Observation] current input"})
+    return messages
+
+
+def test_the_whole_history_is_sent_without_a_window():
+    messages = conversation(5)
+    assert history.window(messages, turns=None, summary=False) == messages
+
+
+def test_the_window_keeps_the_system_prompt_the_last_exchanges_and_the_current_input():
+    messages = conversation(5)
+    sent = history.window(messages, turns=2, summary=False)
+    assert sent == messages[:1] + messages[-5:]
+    assert sent[-1]["content"] == "[Observation] current input"
+    assert len(messages) == 12  # the history itself keeps every turn
+
+
+def test_a_short_history_is_sent_unchanged():
+    messages = conversation(2)
+    assert history.window(messages, turns=2, summary=True) is messages
+    assert history.window(conversation(0), turns=0, summary=True) == conversation(0)
+
+
+def test_dropped_exchanges_are_folded_into_one_summary():
+    messages = conversation(4)
+    sent = history.window(messages, turns=1, summary=True)
+    assert sent[0] == messages[0] and sent[2:] == messages[-3:]
+    assert sent[1] == {
+        "role": "user",
+        "content": "[Earlier turns]:\n"
+        '1. partner: partner message 1\n1. you: visit("1")\n'
+        '2. partner: partner message 2\n2. you: visit("2")\n'
+        '3. partner: partner message 3\n3. you: visit("3")',
+    }
+
+
+def test_the_summary_shortens_long_messages_and_marks_missing_blocks():
+    dropped = [
+        {"role": "user", "content": "[Observation] " + "x" * (history.SUMMARY_CHARS + 10)},
+        {"role": "assistant", "content": "no action block"},
+    ]
+    partner, own = history.summarize(dropped)["content"].splitlines()[1:]
+    assert partner == "1. partner: " + "x" * history.SUMMARY_CHARS + "..."
+    assert own == "1. you: -"
+
+
+def test_bounded_records_the_tokens_saved(monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_TURNS", 1)
+    monkeypatch.setattr(history, "HISTORY_SUMMARY", False)
+    history.context.reset()
+    try:
+        messages = conversation(6)
+        assert history.bounded(messages) == messages[:1] + messages[-3:]
+        summary = history.context.summary()
+        assert summary["calls"] == 1 and 0 < summary["saved"] < 1
+        assert summary["sent_mean"] < summary["full_mean"]
+        assert list(summary["per_turn"]) == [7]
+    finally:
+        history.context.reset()
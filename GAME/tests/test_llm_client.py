@@ -0,0 +1,65 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from supplementary import llm_client, rate_limiter
+
+# one token per second, so the bucket hardly refills while a test runs
+QUOTA = {"TPM_LIMIT": 60, "BURST_SECONDS": 60_000}
+MESSAGES = [{"role": "system", "content": "rules"}, {"role": "user", "content": "[Message]: L-B: 6\n[OWS]: []"}]
+
+
+def level(scheduler: rate_limiter.Scheduler) -> float:
+    bucket = scheduler.buckets["tokens"]
+    bucket.refill(time.monotonic())
+    return bucket.level
+
+
+def test_failed_attempts_give_their_tokens_back(mock_endpoint):
+    mock_endpoint.error_rate = 1.0
+    llm_client.configure(**QUOTA, MAX_RETRIES=2, BACKOFF_BASE=0.0)
+    with pytest.raises(openai.InternalServerError):
+        llm_client.chat("gpt", MESSAGES, 600)
+    scheduler = llm_client.get_scheduler()
+    assert mock_endpoint.counts["errors"] == 3
+    assert scheduler.tokens_reserved == 3 * rate_limiter.estimate_tokens(MESSAGES, 600)
+    assert level(scheduler) == scheduler.buckets["tokens"].capacity
+
+
+def test_a_successful_call_keeps_only_the_tokens_it_used(mock_endpoint):
+    llm_client.configure(**QUOTA)
+    llm_client.chat("gpt", MESSAGES, 600)
+    scheduler = llm_client.get_scheduler()
+    assert 0 < scheduler.tokens_used < scheduler.tokens_reserved
+    assert level(scheduler) == pytest.approx(scheduler.buckets["tokens"].capacity - scheduler.tokens_used, abs=1)
+
+
+def test_a_hedged_duplicate_settles_its_own_reservation():
+    loop = asyncio.new_event_loop()
+    try:
+        scheduler = rate_limiter.Scheduler(tpm=QUOTA["TPM_LIMIT"], burst=QUOTA["BURST_SECONDS"])
+        capacity = scheduler.buckets["tokens"].capacity
+
+        assert scheduler.try_acquire(700)
+        cancelled = loop.create_future()
+        cancelled.cancel()  # the primary replied first
+        llm_client._settle_hedge(scheduler, 700, cancelled)
+        assert level(scheduler) == pytest.approx(capacity, abs=1)
+
+        assert scheduler.try_acquire(700)
+        failed = loop.create_future()
+        failed.set_exception(openai.APIConnectionError(request=None))
+        llm_client._settle_hedge(scheduler, 700, failed)
+        assert level(scheduler) == pytest.approx(capacity, abs=1)
+
+        assert scheduler.try_acquire(700)
+        won = loop.create_future()
+        won.set_result(SimpleNamespace(usage=SimpleNamespace(total_tokens=120)))
+        llm_client._settle_hedge(scheduler, 700, won)
+        assert scheduler.tokens_used == 120
+        assert level(scheduler) == pytest.approx(capacity - 120, abs=1)
+    finally:
+        loop.close()
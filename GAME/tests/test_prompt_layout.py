@@ -0,0 +1,64 @@
+import importlib
+import json
+import os
+
+import pytest
+
+from supplementary import prompt_layout
+from supplementary.board import Board
+
+BOARDS = os.path.join(os.path.dirname(__file__), "..", "supplementary", "boards", "boards_6.json")
+VARIANTS = ["baseline", "coin_tracking", "problem_solving", "state_tracking"]
+
+
+def prompts(variant: str, key: str) -> tuple[str, str]:
+    """The GHOST and USER_LIGHT system prompts of a variant for one board of boards_6.json."""
+    module = importlib.import_module(f"AGENTS.prompts_{variant}")
+    with open(BOARDS) as f:
+        setup = json.load(f)[key]
+    return (
+        module.GHOST_prompt(Board.from_triples(setup["BOT"]).params(), 6),
+        module.USER_LIGHT_prompt(Board.from_triples(setup["USER"]).params(), 6),
+    )
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_the_static_part_is_the_same_in_every_game(variant):
+    for first, second in zip(prompts(variant, "1"), prompts(variant, "2")):
+        static, board = prompt_layout.split_board(first)
+        assert static + prompt_layout.BOARD_SEPARATOR + board == first
+        assert static == prompt_layout.split_board(second)[0]
+        assert board != prompt_layout.split_board(second)[1]
+        assert "living room" in board and prompt_layout.BOARD_SEPARATOR not in board
+
+
+@pytest.mark.parametrize("variant", VARIANTS[1:])
+def test_a_prompt_without_a_board_section_is_all_static(variant):
+    prompt = importlib.import_module(f"AGENTS.prompts_{variant}").get_current_ws(6)
+    assert prompt_layout.split_board(prompt) == (prompt, "")
+
+
+def test_the_prefix_layout_moves_the_board_after_the_conversation():
+    system = prompts("problem_solving", "1")[0]
+    conversation = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    messages = [{"role": "system", "content": system}] + conversation
+    static, board = prompt_layout.split_board(system)
+
+    assert prompt_layout.arrange(messages, "inline") is messages
+    assert prompt_layout.arrange(messages, "prefix") == (
+        [{"role": "system", "content": static}] + conversation + [{"role": "system", "content": board}]
+    )
+    assert messages[0]["content"] == system  # the history is not changed
+
+
+def test_the_prefix_layout_leaves_other_requests_unchanged():
+    no_board = [{"role": "system", "content": "rules only"}, {"role": "user", "content": "hi"}]
+    no_system = [{"role": "user", "content": "hi"}]
+    assert prompt_layout.arrange(no_board, "prefix") is no_board
+    assert prompt_layout.arrange(no_system, "prefix") is no_system
+    assert prompt_layout.arrange([], "prefix") == []
+
+
+def test_an_unknown_layout_is_rejected():
+    with pytest.raises(ValueError):
+        prompt_layout.arrange([{"role": "user", "content": "hi"}], "suffix")
@@ -0,0 +1,38 @@
+import pytest
+
+from supplementary import llm_client, response_cache
+
+MESSAGES = [{"role": "system", "content": "rules"}, {"role": "user", "content": "[Message]: L-B: 6\n[OWS]: []"}]
+
+
+def test_request_key_covers_everything_that_shapes_the_response():
+    key = response_cache.request_key("gpt", MESSAGES, 600, 1, 7)
+    assert key == response_cache.request_key("gpt", [dict(message) for message in MESSAGES], 600, 1.0, 7)
+    assert key != response_cache.request_key("gpt", MESSAGES, 600, 1, 8)
+    assert key != response_cache.request_key("gpt", MESSAGES[:1], 600, 1, 7)
+    assert key != response_cache.request_key("gpt", MESSAGES, 1200, 1, 7)
+
+
+def test_store_round_trip(tmp_path):
+    cache = response_cache.ResponseCache(str(tmp_path / "responses.sqlite"))
+    assert cache.get("key") is None
+    cache.put("key", "gpt", 7, "[NWS]: []")
+    assert cache.get("key") == "[NWS]: []"
+    assert response_cache.ResponseCache(cache.path).get("key") == "[NWS]: []"  # on disk, for other processes
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_record_then_replay_offline(mock_endpoint):
+    llm_client.configure(CACHE_MODE="record")
+    recorded = llm_client.chat("gpt", MESSAGES, 600, seed=7)
+    assert mock_endpoint.counts["gsm"] == 1
+
+    llm_client.configure(CACHE_MODE="replay")
+    assert llm_client.chat("gpt", MESSAGES, 600, seed=7) == recorded
+    assert mock_endpoint.counts["gsm"] == 1  # answered from the recording
+    with pytest.raises(response_cache.ReplayMiss):
+        llm_client.chat("gpt", MESSAGES, 600, seed=8)
+
+    llm_client.configure(CACHE_MODE="record-missing")
+    llm_client.chat("gpt", MESSAGES, 600, seed=8)
+    assert mock_endpoint.counts["gsm"] == 2
@@ -0,0 +1,45 @@
+import json
+
+from supplementary import solve_boards
+
+TRIANGLE = {"BOT": [["L", "B", 1], ["L", "K", 1], ["B", "K", 1]], "USER": [["L", "B", 1], ["L", "K", 2], ["B", "K", 3]]}
+
+
+def test_a_truncated_last_line_is_skipped_and_the_next_append_starts_a_fresh_line(tmp_path):
+    output = tmp_path / "solved.jsonl"
+    output.write_text(json.dumps({"hash": "a", "OPTIMAL": []}) + "\n" + '{"hash": "b", "OPT')
+    assert [result["hash"] for result in solve_boards.read_results(output)] == ["a"]
+
+    with solve_boards.open_for_append(output) as out:
+        out.write(json.dumps({"hash": "c", "OPTIMAL": []}) + "\n")
+    assert [result["hash"] for result in solve_boards.read_results(output)] == ["a", "c"]
+    assert solve_boards.solved_hashes(output) == {"a", "c"}
+
+
+def test_a_board_that_fails_is_recorded_and_the_run_goes_on(tmp_path):
+    bad = {"BOT": [["L", "B", 1], ["L", "K", 1]], "USER": [["L", "B", 1], ["L", "K", 1]]}  # not complete
+    shard = tmp_path / "shard.jsonl"
+    shard.write_text(json.dumps({"id": "bad", **bad}) + "\n" + json.dumps({"id": "good", **TRIANGLE}) + "\n")
+    output = tmp_path / "solved.jsonl"
+
+    assert solve_boards.run([str(shard)], str(output), workers=1, max_in_flight=1) == (1, 1)
+    results = {result["id"]: result for result in solve_boards.read_results(output)}
+    assert "ValueError" in results["shard:bad"]["ERROR"]
+    assert results["shard:good"]["OPTIMAL"][-1] == 9
+    # the failed board is tried again on the next run, the solved one is not
+    assert solve_boards.run([str(shard)], str(output), workers=1, max_in_flight=1) == (0, 1)
+
+
+def test_update_json_ignores_failed_and_truncated_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(solve_boards.prefix_tables, "build_for_file", lambda path: None)
+    shard = tmp_path / "boards_3.json"
+    shard.write_text(json.dumps({"1": {**TRIANGLE, "OPTIMAL": "stale"}}))
+    digest = solve_boards.board_hash(TRIANGLE)
+    output = tmp_path / "solved.jsonl"
+    output.write_text(
+        json.dumps({"hash": digest, "ERROR": "ValueError()"}) + "\n"
+        + json.dumps({"hash": digest, "OPTIMAL": [["L", "B", "K", "L"], 9]}) + "\n"
+        + '{"hash": "'
+    )
+    solve_boards.update_json(str(shard), str(output))
+    assert json.loads(shard.read_text())["1"]["OPTIMAL"] == [["L", "B", "K", "L"], 9]
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+
+import pytest
+
+from supplementary import kbest, solvers, tsp_utils
+from supplementary.board import Board
+
+BOARDS = os.path.join(os.path.dirname(__file__), "..", "supplementary", "boards", "boards_6.json")
+
+
+def joint_graphs():
+    with open(BOARDS) as f:
+        for key, setup in json.load(f).items():
+            joint = Board.from_triples(setup["BOT"]) + Board.from_triples(setup["USER"])
+            yield pytest.param(joint.to_graph(), setup["OPTIMAL"], id=key)
+
+
+EXACT = [name for name, backend in solvers.BACKENDS.items() if backend["exact"] and solvers.is_available(name)]
+
+
+@pytest.mark.parametrize("g, optimal", list(joint_graphs()))
+def test_exact_backends_agree_with_the_board_file(g, optimal):
+    *tours, coins = optimal
+    expected = sorted(tour[:-1] for tour in tours)  # the file lists closed tours
+    for name in EXACT:
+        found, value = solvers.BACKENDS[name]["solve"](g, ["L"], True)
+        assert value == coins, name
+        if solvers.BACKENDS[name]["all_tours"]:
+            assert sorted(found) == expected, name
+    assert sorted(kbest.co_optimal_tours(g)[0]) == expected
+
+
+@pytest.mark.parametrize("g, optimal", list(joint_graphs()))
+def test_exact_backends_agree_on_partial_paths(g, optimal):
+    for partial_path in (["L", "B"], ["L", "E", "K"], ["L", "A", "C", "B", "K"]):
+        values = {name: solvers.BACKENDS[name]["solve"](g, partial_path, False)[1] for name in EXACT}
+        assert len(set(values.values())) == 1, values
+        tour, coins = solvers.solve(g, partial_path)
+        assert tour[: len(partial_path)] == partial_path and coins == values["dp"]
+
+
+def test_unavailable_backend_falls_back_with_a_warning(monkeypatch, caplog):
+    def out_of_memory(g, partial_path, get_all_tours):
+        raise MemoryError
+
+    solvers.register_backend("out_of_memory", out_of_memory)
+    monkeypatch.setattr(solvers, "candidates", lambda *args, **kwargs: ["out_of_memory", "dp"])
+    g = tsp_utils.board_to_graph([("L", "B", 2), ("L", "K", 3), ("B", "K", 4)])
+    try:
+        with caplog.at_level(logging.WARNING, logger=solvers.__name__):
+            assert solvers.solve(g)[1] == 9
+            assert solvers.SolverSession().solve(g)[1] == 9
+    finally:
+        del solvers.BACKENDS["out_of_memory"]
+    assert sum("out_of_memory unavailable" in record.message for record in caplog.records) == 2
+
+
+def test_backend_bugs_are_not_hidden(monkeypatch):
+    def broken(g, partial_path, get_all_tours):
+        raise ValueError("bad input")
+
+    solvers.register_backend("broken", broken)
+    monkeypatch.setattr(solvers, "candidates", lambda *args, **kwargs: ["broken", "heuristic"])
+    g = tsp_utils.board_to_graph([("L", "B", 2), ("L", "K", 3), ("B", "K", 4)])
+    try:
+        with pytest.raises(ValueError):
+            solvers.solve(g)
+        with pytest.raises(ValueError):
+            solvers.SolverSession().solve(g)
+    finally:
+        del solvers.BACKENDS["broken"]
+
+
+@pytest.mark.skipif(not solvers.is_available("ilp"), reason="gurobipy is not installed or not licensed")
+def test_closing_a_session_frees_its_ilp_model(monkeypatch):
+    monkeypatch.setattr(solvers, "candidates", lambda *args, **kwargs: ["ilp"])
+    g = tsp_utils.board_to_graph([("L", "B", 2), ("L", "K", 3), ("B", "K", 4), ("L", "A", 1), ("A", "B", 5), ("A", "K", 2)])
+    with solvers.SolverSession() as session:
+        coins = session.solve(g)[1]
+        ilp = session.ilp
+        assert ilp.env is not None
+    assert coins == solvers.solve(g)[1]
+    assert session.ilp is None and ilp.env is None and ilp.model is None
+    session.close()  # closing twice is harmless
+
+
+@pytest.mark.skipif(not solvers.is_available("ilp"), reason="gurobipy is not installed or not licensed")
+def test_an_ilp_session_without_an_optimal_solution_falls_through(monkeypatch, caplog):
+    monkeypatch.setattr(solvers, "candidates", lambda *args, **kwargs: ["ilp", "dp"])
+    triples = [("L", "B", 2), ("L", "K", 3), ("B", "K", 4), ("L", "A", 1), ("A", "B", 5), ("A", "K", 2)]
+    with solvers.SolverSession() as session:
+        session.solve(tsp_utils.board_to_graph(triples))
+        assert session.last_backend == "ilp"
+        session.ilp.model.Params.TimeLimit = 0  # the next re-optimization stops before it is proven optimal
+        g = tsp_utils.board_to_graph(triples[:-1] + [("A", "K", 9)])
+        with caplog.at_level(logging.WARNING, logger=solvers.__name__):
+            tour, coins = session.solve(g)
+        assert session.last_backend == "dp" and session.ilp.tour is None
+        assert coins == solvers.BACKENDS["dp"]["solve"](g, ["L"], False)[1]
+    assert any("ilp unavailable" in record.message for record in caplog.records)